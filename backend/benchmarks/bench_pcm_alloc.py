@@ -0,0 +1,126 @@
+"""
+PCM 转换路径内存分配基准
+用 tracemalloc 统计单个分片从上传数据到可发送 PCM 的峰值内存，
+对比旧路径（readframes / tobytes / 浮点质量检测 副本）与零拷贝路径
+
+用法:
+    cd backend
+    python benchmarks/bench_pcm_alloc.py [--seconds 1.5] [--repeat 50]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from audio.format_detect import FORMAT_PCM, FORMAT_WAV  # noqa: E402
+from audio.improved_converter import AudioProcessor  # noqa: E402
+from audio.resampler import resample  # noqa: E402
+
+TARGET_RATE = 16000
+# (名称, 采样率, 声道数, 格式)
+CASES = [
+    ("wav 16k mono", 16000, 1, FORMAT_WAV),
+    ("wav 48k stereo", 48000, 2, FORMAT_WAV),
+    ("raw pcm 16k", 16000, 1, FORMAT_PCM),
+]
+
+
+def _speech(rate: int, seconds: float, channels: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    n = int(rate * seconds)
+    t = np.arange(n) / rate
+    mono = np.sin(2 * np.pi * 220 * t) * 8000 + rng.normal(0, 300, n)
+    return np.repeat(mono, channels).astype(np.int16)
+
+
+def _wav_bytes(samples: np.ndarray, rate: int, channels: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _legacy_decode(data: bytes, audio_format: str) -> bytes:
+    """旧路径：readframes 复制、mean 生成 float64、tobytes 序列化、浮点质量检测"""
+    if audio_format == FORMAT_WAV:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            frame_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+        samples = np.frombuffer(frames, dtype="<i2")
+        if channels > 1:
+            usable = len(samples) - len(samples) % channels
+            samples = samples[:usable].reshape(-1, channels).mean(axis=1).astype(np.int16)
+    else:
+        frame_rate = TARGET_RATE
+        samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2")
+    if frame_rate != TARGET_RATE:
+        samples = np.clip(np.rint(resample(samples, frame_rate, TARGET_RATE)), -32768, 32767).astype(np.int16)
+    else:
+        samples = np.asarray(samples, dtype=np.int16)
+    pcm_data = samples.tobytes()
+
+    float_audio = samples.astype(np.float32) / 32767.0
+    np.max(np.abs(float_audio))
+    np.sqrt(np.mean(float_audio ** 2))
+    return pcm_data
+
+
+def _measure(fn, repeat: int):
+    """返回 (峰值新增内存, 平均耗时)"""
+    fn()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    del result
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return peak, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PCM 转换路径内存分配基准")
+    parser.add_argument("--seconds", type=float, default=1.5, help="分片时长（与 MediaRecorder 分片一致）")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    processor = AudioProcessor(silence_fallback_tone=True)
+    # 基准中不输出逐次解码日志
+    devnull = open(os.devnull, "w")
+
+    print(f"{'路径':<16}{'输出PCM':>10}{'旧峰值':>12}{'新峰值':>12}{'旧耗时':>10}{'新耗时':>10}")
+    for name, rate, channels, audio_format in CASES:
+        samples = _speech(rate, args.seconds, channels)
+        data = _wav_bytes(samples, rate, channels) if audio_format == FORMAT_WAV else samples.tobytes()
+        output_size = int(TARGET_RATE * args.seconds) * 2
+
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            legacy_peak, legacy_time = _measure(lambda: _legacy_decode(data, audio_format), args.repeat)
+            lean_peak, lean_time = _measure(lambda: processor.decode(data, audio_format), args.repeat)
+        finally:
+            sys.stdout = stdout
+
+        print(f"{name:<16}{output_size / 1024:>8.1f}KB{legacy_peak / 1024:>10.1f}KB{lean_peak / 1024:>10.1f}KB"
+              f"{legacy_time * 1000:>8.2f}ms{lean_time * 1000:>8.2f}ms")
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+重采样基准测试
+对比多相 FIR 重采样器与旧的抽取 / pydub set_frame_rate / librosa 路径的耗时与质量
+
+用法:
+    cd backend
+    python benchmarks/bench_resampler.py [--seconds 10] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from audio.resampler import PolyphaseResampler, design_filter_bank, resample  # noqa: E402
+
+TARGET_RATE = 16000
+SOURCE_RATES = [48000, 44100, 22050, 8000]
+# 会话流式重采样时每个分片的时长（与 MediaRecorder 分片一致）
+STREAM_CHUNK_SECONDS = 1.5
+
+
+def _tone(rate: int, seconds: float, freq: float, amplitude: float = 10000.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * freq * t) * amplitude).astype(np.int16)
+
+
+def _stride_decimate(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """旧的“PCM直接解析”路径：按步长抽取，无抗混叠滤波"""
+    step = max(1, src_rate // dst_rate)
+    return samples[::step].astype(np.float32)
+
+
+def _polyphase_stream(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    resampler = PolyphaseResampler(src_rate, dst_rate)
+    chunk = int(src_rate * STREAM_CHUNK_SECONDS)
+    parts = [resampler.process(samples[i:i + chunk]) for i in range(0, len(samples), chunk)]
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
+
+
+def _pydub_set_frame_rate(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    from pydub import AudioSegment
+    segment = AudioSegment(samples.tobytes(), frame_rate=src_rate, sample_width=2, channels=1)
+    converted = segment.set_frame_rate(dst_rate)
+    return np.array(converted.get_array_of_samples(), dtype=np.float32)
+
+
+def _librosa_resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    import librosa
+    return librosa.resample(samples.astype(np.float32), orig_sr=src_rate, target_sr=dst_rate)
+
+
+def _available_methods():
+    methods = [
+        ("stride (旧)", _stride_decimate),
+        ("polyphase", resample),
+        ("polyphase 流式", _polyphase_stream),
+    ]
+    try:
+        import pydub  # noqa: F401
+        methods.append(("pydub set_frame_rate", _pydub_set_frame_rate))
+    except ImportError:
+        print("⚠️ 未安装 pydub，跳过 set_frame_rate 对比")
+    try:
+        import librosa  # noqa: F401
+        methods.append(("librosa", _librosa_resample))
+    except ImportError:
+        print("⚠️ 未安装 librosa，跳过 librosa 对比")
+    return methods
+
+
+def _passband_error_db(output: np.ndarray, dst_rate: int, freq: float, amplitude: float) -> float:
+    """440Hz 正弦经重采样后与理想信号的误差（相对满幅, dB）"""
+    n = len(output)
+    reference = np.sin(2 * np.pi * freq * np.arange(n) / dst_rate) * amplitude
+    edge = min(n // 10, 400)
+    error = output[edge:n - edge] - reference[edge:n - edge]
+    rms = np.sqrt(np.mean(error ** 2)) + 1e-9
+    return 20 * np.log10(rms / 32768)
+
+
+def _alias_level_db(output: np.ndarray, amplitude: float) -> float:
+    """高于目标奈奎斯特频率的正弦经重采样后的残留能量（相对输入, dB），越低越好"""
+    rms = np.sqrt(np.mean(output.astype(np.float64) ** 2)) + 1e-9
+    return 20 * np.log10(rms / (amplitude / np.sqrt(2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重采样基准测试")
+    parser.add_argument("--seconds", type=float, default=10.0, help="测试音频时长（秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方法重复次数，取最小耗时")
+    args = parser.parse_args()
+
+    methods = _available_methods()
+    amplitude = 10000.0
+
+    print(f"目标采样率 {TARGET_RATE}Hz，音频时长 {args.seconds}s，重复 {args.repeat} 次")
+    print(f"{'源采样率':>8}  {'方法':<22}{'耗时(ms)':>10}{'实时倍数':>10}{'通带误差(dB)':>14}{'混叠残留(dB)':>14}")
+
+    for src_rate in SOURCE_RATES:
+        # 预热滤波器组缓存，单独报告设计耗时
+        design_filter_bank.cache_clear()
+        start = time.perf_counter()
+        design_filter_bank(src_rate, TARGET_RATE)
+        design_ms = (time.perf_counter() - start) * 1000
+
+        clean = _tone(src_rate, args.seconds, 440.0, amplitude)
+        # 混叠测试音：位于 8kHz 以上、源奈奎斯特频率以下
+        alias_freq = 10000.0 if src_rate > 20000 else None
+        alias = _tone(src_rate, args.seconds, alias_freq, amplitude) if alias_freq else None
+
+        for name, method in methods:
+            timings = []
+            output = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                output = method(clean, src_rate, TARGET_RATE)
+                timings.append(time.perf_counter() - start)
+            best_ms = min(timings) * 1000
+            realtime = args.seconds / (best_ms / 1000) if best_ms > 0 else float("inf")
+            passband = _passband_error_db(np.asarray(output, dtype=np.float64), TARGET_RATE, 440.0, amplitude)
+            alias_db = _alias_level_db(method(alias, src_rate, TARGET_RATE), amplitude) if alias is not None else None
+            alias_text = f"{alias_db:14.1f}" if alias_db is not None else f"{'-':>14}"
+            print(f"{src_rate:>8}  {name:<22}{best_ms:10.2f}{realtime:9.0f}x{passband:14.1f}{alias_text}")
+
+        print(f"{src_rate:>8}  {'(滤波器组设计, 缓存后为0)':<22}{design_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+/api/translate 端到端压测
+以固定并发回放 WAV / WebM 录音分片，统计吞吐量与 p50/p95/p99 延迟，
+并汇总响应中 Server-Timing 头给出的各阶段耗时
+
+配合 tools/mock_makawai_server.py 使用，不访问付费上游:
+    cd backend
+    python tools/mock_makawai_server.py --port 8765 &
+    MAKAWAI_WS_URL=ws://127.0.0.1:8765 MAKAWAI_API_KEY=test python src/improved_index.py &
+    python benchmarks/bench_translate_load.py --concurrency 16 --requests 500
+    # 回放真实录音: --audio-dir 目录下的 *.wav / *.webm / *.ogg / *.mp3
+
+结果缓存: 默认每个请求带 no_cache=true，服务端既不读也不写结果缓存，
+任何格式（包括 WebM/Ogg 分片）的重复回放都会经过解码与上游；--allow-cache 测试缓存命中的表现
+
+准入控制: 压测请求不带 session_id，默认都属于 bulk 类别（--priority 可改为 interactive），
+且全部来自同一 IP、共用一个客户端名额：服务端同时处理 ADMISSION_MAX_ACTIVE 个请求，
+该客户端最多再排队 ADMISSION_MAX_QUEUE_PER_CLIENT 个（默认 8 + 4），并发高于两者之和时
+多出的请求立即收到 429。测上游/连接池容量时应在服务端调大这两个值，或把并发控制在其内
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import subprocess
+import sys
+import time
+import wave
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    print("⚠️ 压测需要 httpx: pip install httpx")
+    sys.exit(1)
+
+SAMPLE_RATE = 16000
+_CONTENT_TYPES = {".wav": "audio/wav", ".webm": "audio/webm", ".ogg": "audio/ogg", ".mp3": "audio/mpeg"}
+
+
+def _speech_like(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """带音节包络与停顿的合成语音（谐波 + 噪声），能通过服务端 VAD"""
+    n = int(SAMPLE_RATE * seconds)
+    t = np.arange(n) / SAMPLE_RATE
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 3.0 * t + rng.uniform(0, np.pi)), 0, None) ** 0.5
+    signal = voiced * envelope * 6000 + rng.normal(0, 200, n)
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def _wav_bytes(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _webm_bytes(wav_data: bytes) -> Optional[bytes]:
+    """用 ffmpeg 把 WAV 编码为 Opus/WebM（与 MediaRecorder 输出一致）"""
+    if not shutil.which("ffmpeg"):
+        return None
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "wav", "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", "32k", "-f", "webm", "pipe:1"],
+        input=wav_data, capture_output=True, check=False,
+    )
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+def _load_corpus(args: argparse.Namespace) -> List[Tuple[str, bytes, str]]:
+    """返回 [(文件名, 数据, Content-Type)]"""
+    if args.audio_dir:
+        corpus = []
+        for name in sorted(os.listdir(args.audio_dir)):
+            ext = os.path.splitext(name)[1].lower()
+            if ext in _CONTENT_TYPES:
+                with open(os.path.join(args.audio_dir, name), "rb") as f:
+                    corpus.append((name, f.read(), _CONTENT_TYPES[ext]))
+        if not corpus:
+            raise SystemExit(f"❌ {args.audio_dir} 中没有可用的音频文件")
+        return corpus
+
+    rng = np.random.default_rng(args.seed)
+    corpus = []
+    for i in range(args.variants):
+        wav_data = _wav_bytes(_speech_like(args.chunk_seconds, rng))
+        if args.format == "webm":
+            webm_data = _webm_bytes(wav_data)
+            if webm_data is None:
+                raise SystemExit("❌ 生成 WebM 需要 ffmpeg (libopus)")
+            corpus.append((f"chunk{i}.webm", webm_data, "audio/webm"))
+        else:
+            corpus.append((f"chunk{i}.wav", wav_data, "audio/wav"))
+    return corpus
+
+
+def _parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            try:
+                stages[name] = float(params[4:])
+            except ValueError:
+                pass
+    return stages
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: "Counter[str]" = Counter()
+        self.stage_totals: Dict[str, float] = defaultdict(float)
+        self.stage_counts: "Counter[str]" = Counter()
+        self.bytes_sent = 0
+
+    def record(self, latency: float, status: str, timing: Dict[str, float], size: int):
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+        self.bytes_sent += size
+        for stage, ms in timing.items():
+            self.stage_totals[stage] += ms
+            self.stage_counts[stage] += 1
+
+
+async def _worker(client, args, corpus, counter, deadline, result: LoadResult):
+    while True:
+        request_id = next(counter)
+        if args.requests and request_id >= args.requests:
+            return
+        if deadline and time.perf_counter() >= deadline:
+            return
+        name, data, content_type = corpus[request_id % len(corpus)]
+        form = {"source_lang": args.source_lang, "target_lang": args.target_lang}
+        if not args.allow_cache:
+            form["no_cache"] = "true"
+        if args.priority:
+            form["priority"] = args.priority
+
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                "/api/translate",
+                files={"audio_chunk": (name, data, content_type)},
+                data=form,
+            )
+            status = str(response.status_code)
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            if response.status_code == 200 and body.get("cached"):
+                status = "200 (cached)"
+            elif response.status_code == 200 and body.get("skipped"):
+                status = f"200 ({body['skipped']})"
+            timing = _parse_server_timing(response.headers.get("server-timing"))
+        except httpx.HTTPError as e:
+            status, timing = type(e).__name__, {}
+        result.record(time.perf_counter() - start, status, timing, len(data))
+
+
+def _percentile(values: np.ndarray, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if len(values) else 0.0
+
+
+def _print_report(result: LoadResult, elapsed: float, args: argparse.Namespace):
+    latencies = np.array(result.latencies)
+    total = len(latencies)
+    print(f"\n请求数 {total}，并发 {args.concurrency}，耗时 {elapsed:.2f}s")
+    print(f"吞吐量 {total / elapsed:.1f} req/s，上传 {result.bytes_sent / elapsed / 1024:.1f} KiB/s")
+    print(f"延迟(ms) p50 {_percentile(latencies, 50):.1f} | p95 {_percentile(latencies, 95):.1f} | "
+          f"p99 {_percentile(latencies, 99):.1f} | max {latencies.max() * 1000 if total else 0:.1f}")
+    print("状态分布: " + ", ".join(f"{status} x{count}" for status, count in result.statuses.most_common()))
+    if result.statuses.get("429"):
+        print("⚠️ 出现 429：所有压测请求共用一个客户端排队名额，"
+              "请调大服务端 ADMISSION_MAX_ACTIVE / ADMISSION_MAX_QUEUE_PER_CLIENT 或降低 --concurrency")
+    if result.stage_counts:
+        print("Server-Timing 阶段平均耗时(ms):")
+        for stage, count in result.stage_counts.items():
+            print(f"  {stage:<18}{result.stage_totals[stage] / count:10.1f}  ({count} 次)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="/api/translate 端到端压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="请求总数，0 表示按 --duration 运行")
+    parser.add_argument("--duration", type=float, default=0.0, help="运行时长（秒）")
+    parser.add_argument("--audio-dir", help="回放目录中的真实录音分片")
+    parser.add_argument("--format", choices=["wav", "webm"], default="wav", help="合成分片的格式")
+    parser.add_argument("--chunk-seconds", type=float, default=1.5, help="合成分片时长（与 MediaRecorder 分片一致）")
+    parser.add_argument("--variants", type=int, default=8, help="合成分片的种类数")
+    parser.add_argument("--allow-cache", action="store_true", help="不带 no_cache，允许命中结果缓存")
+    parser.add_argument("--priority", choices=["interactive", "bulk"], help="调度类别，默认由服务端按 bulk 处理")
+    parser.add_argument("--source-lang", default="zh")
+    parser.add_argument("--target-lang", default="en")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.requests and not args.duration:
+        parser.error("--requests 与 --duration 至少指定一个")
+
+    corpus = _load_corpus(args)
+    print(f"🎯 {args.url}/api/translate，{len(corpus)} 种分片，平均 {np.mean([len(c[1]) for c in corpus]) / 1024:.1f} KiB")
+
+    result = LoadResult()
+    counter = iter(range(1 << 62))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration if args.duration else None
+        await asyncio.gather(*[
+            _worker(client, args, corpus, counter, deadline, result) for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    _print_report(result, elapsed, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
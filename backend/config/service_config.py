@@ -0,0 +1,146 @@
+"""
+服务运行参数配置
+- 所有参数均可通过同名环境变量覆盖
+- 密钥类配置请放在 api_config.py 中
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠️ 配置项 {name}={value!r} 不是整数，使用默认值 {default}")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ 配置项 {name}={value!r} 不是数字，使用默认值 {default}")
+        return default
+
+
+# 监听地址与 worker 进程数；SERVICE_WORKERS > 1 为生产模式（多进程，不自动重载）
+SERVICE_HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = _env_int("SERVICE_PORT", 8000)
+SERVICE_WORKERS = _env_int("SERVICE_WORKERS", 1)
+# 多 worker 模式下每个语言对的上游连接总配额，按 worker 平均分配（不能少于 worker 数，否则拒绝启动）；
+# 0 表示每个 worker 各用 POOL_MAX_SIZE
+UPSTREAM_MAX_CONNECTIONS = _env_int("UPSTREAM_MAX_CONNECTIONS", 0)
+# worker 间共享的本机目录（槽位锁、状态快照、合成音频），空字符串表示 /dev/shm/makawai-translate-<端口>
+WORKER_SHARED_DIR = os.getenv("WORKER_SHARED_DIR", "")
+# worker 发布状态快照的间隔（秒）
+WORKER_PUBLISH_INTERVAL = _env_float("WORKER_PUBLISH_INTERVAL", 2.0)
+
+# 支持的语言（逗号分隔）：请求中的语言不在列表内时返回 400，不为其建立上游连接，指标中归为 "other"
+SUPPORTED_LANGUAGES = [lang.strip() for lang in os.getenv("SUPPORTED_LANGUAGES", "zh,en,ja,ko,ru,fr,de,es,pt,it").split(",")
+                       if lang.strip()]
+
+# 上游连接池：每个语言对 (source_lang, target_lang) 独立计数
+POOL_MIN_SIZE = _env_int("POOL_MIN_SIZE", 0)
+POOL_MAX_SIZE = _env_int("POOL_MAX_SIZE", 4)
+# 空闲连接超过该秒数后被回收（不低于 POOL_MIN_SIZE）
+POOL_IDLE_TIMEOUT = _env_float("POOL_IDLE_TIMEOUT", 120.0)
+# 等待可用连接的最长秒数
+POOL_ACQUIRE_TIMEOUT = _env_float("POOL_ACQUIRE_TIMEOUT", 15.0)
+# 单条上游连接上同时在途的请求数；1 为逐次收发，大于 1 时启用流水线客户端
+UPSTREAM_PIPELINE_DEPTH = _env_int("UPSTREAM_PIPELINE_DEPTH", 1)
+# 流水线模式下用于匹配响应的序号字段名（上游响应不带该字段时按发送顺序匹配）
+UPSTREAM_CORRELATION_FIELD = os.getenv("UPSTREAM_CORRELATION_FIELD", "seq")
+# /api/translate 分帧流式发送：PCM 按 960 采样切帧经 send_audio_stream 发送，同时接收结果（独占连接）
+UPSTREAM_STREAMING = os.getenv("UPSTREAM_STREAMING", "false").lower() in ("1", "true", "yes")
+# 流式发送的速度：0 不限速，1.0 按实时速度，2.0 为两倍实时速度
+UPSTREAM_STREAM_PACE = _env_float("UPSTREAM_STREAM_PACE", 0.0)
+# 上游连接后台保活：ping 间隔、pong 等待超时、连续失败多少次判定为不健康
+KEEPALIVE_INTERVAL = _env_float("KEEPALIVE_INTERVAL", 15.0)
+KEEPALIVE_TIMEOUT = _env_float("KEEPALIVE_TIMEOUT", 5.0)
+KEEPALIVE_MAX_FAILURES = _env_int("KEEPALIVE_MAX_FAILURES", 2)
+# 上游熔断：连续建连失败多少次后打开，打开后的退避时间从 BASE 起指数增长至 MAX，并加 JITTER 比例的随机抖动
+BREAKER_FAILURE_THRESHOLD = _env_int("BREAKER_FAILURE_THRESHOLD", 3)
+BREAKER_BASE_BACKOFF = _env_float("BREAKER_BASE_BACKOFF", 1.0)
+BREAKER_MAX_BACKOFF = _env_float("BREAKER_MAX_BACKOFF", 60.0)
+BREAKER_JITTER = _env_float("BREAKER_JITTER", 0.5)
+# 准入控制：同时处理的请求数（0 表示不限制）、排队总数、单个客户端（会话或 IP）的排队数、最长排队秒数
+ADMISSION_MAX_ACTIVE = _env_int("ADMISSION_MAX_ACTIVE", 8)
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 32)
+ADMISSION_MAX_QUEUE_PER_CLIENT = _env_int("ADMISSION_MAX_QUEUE_PER_CLIENT", 4)
+ADMISSION_MAX_WAIT = _env_float("ADMISSION_MAX_WAIT", 5.0)
+# 优先级调度：interactive（实时麦克风分片）与 bulk（调试上传、脚本、批量、长音频）按权重分配名额；
+# ADMISSION_MAX_WAIT 为 interactive 的最长排队秒数，bulk 使用 ADMISSION_BULK_MAX_WAIT
+SCHEDULER_INTERACTIVE_WEIGHT = _env_float("SCHEDULER_INTERACTIVE_WEIGHT", 8.0)
+SCHEDULER_BULK_WEIGHT = _env_float("SCHEDULER_BULK_WEIGHT", 1.0)
+ADMISSION_BULK_MAX_WAIT = _env_float("ADMISSION_BULK_MAX_WAIT", 60.0)
+# bulk 类别最多占用的排队位置（不超过 ADMISSION_MAX_QUEUE），其余位置留给 interactive，批量积压不会让实时分片收到 429
+ADMISSION_BULK_MAX_QUEUE = _env_int("ADMISSION_BULK_MAX_QUEUE", 24)
+# /ws/translate：每个语言对同时进行的实时流数量（每条流录音期间独占一条上游连接），
+# 实际上限不超过每个 worker 的连接数减一，至少给 HTTP 接口保留一条连接；只有一条连接时（例如多 worker 平分
+# UPSTREAM_MAX_CONNECTIONS 后）不接受实时流
+WS_MAX_STREAMS = _env_int("WS_MAX_STREAMS", 2)
+# 录音分片时长建议：上下限与默认值（毫秒），固定开销占分片时长的目标比例
+CHUNK_MIN_MS = _env_int("CHUNK_MIN_MS", 500)
+CHUNK_MAX_MS = _env_int("CHUNK_MAX_MS", 4000)
+CHUNK_DEFAULT_MS = _env_int("CHUNK_DEFAULT_MS", 1500)
+CHUNK_OVERHEAD_RATIO = _env_float("CHUNK_OVERHEAD_RATIO", 0.25)
+# /api/translate/batch：单次最多上传的文件数，同时处理（解码 + 上游请求）的条目数
+BATCH_MAX_ITEMS = _env_int("BATCH_MAX_ITEMS", 50)
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", 4)
+# /api/translate/long：片段目标/最大时长（秒）、视为语句边界的最短静音（秒）、同时翻译的片段数
+LONG_AUDIO_SEGMENT_SECONDS = _env_float("LONG_AUDIO_SEGMENT_SECONDS", 10.0)
+LONG_AUDIO_MAX_SEGMENT_SECONDS = _env_float("LONG_AUDIO_MAX_SEGMENT_SECONDS", 15.0)
+LONG_AUDIO_MIN_GAP_SECONDS = _env_float("LONG_AUDIO_MIN_GAP_SECONDS", 0.3)
+LONG_AUDIO_CONCURRENCY = _env_int("LONG_AUDIO_CONCURRENCY", 4)
+# 解码后 PCM 临时文件所在目录，空字符串表示系统临时目录
+LONG_AUDIO_SPOOL_DIR = os.getenv("LONG_AUDIO_SPOOL_DIR", "")
+
+# 音频解码执行器：process（进程池，默认）或 thread（线程池）
+DECODE_EXECUTOR = os.getenv("DECODE_EXECUTOR", "process")
+# 解码工作者数量，0 表示按 CPU 核数自动选择（最多 4）
+DECODE_WORKERS = _env_int("DECODE_WORKERS", 0)
+# 除正在解码的任务外，最多允许排队的任务数
+DECODE_QUEUE_DEPTH = _env_int("DECODE_QUEUE_DEPTH", 16)
+
+# 会话级流式解码器（常驻 ffmpeg 进程）
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+STREAM_DECODER_MAX_SESSIONS = _env_int("STREAM_DECODER_MAX_SESSIONS", 64)
+# 会话超过该秒数无新分片即关闭解码器
+STREAM_DECODER_IDLE_TIMEOUT = _env_float("STREAM_DECODER_IDLE_TIMEOUT", 30.0)
+
+# 无容器裸 PCM（16-bit 单声道）上传时假定的采样率，服务端重采样到 16kHz
+RAW_PCM_SAMPLE_RATE = _env_int("RAW_PCM_SAMPLE_RATE", 16000)
+
+# 服务端语音活动检测：裁剪首尾静音，整段静音的分片不发送到上游
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+# 帧 RMS 高于该值（dBFS）视为语音
+VAD_THRESHOLD_DB = _env_float("VAD_THRESHOLD_DB", -40.0)
+# 语音结束后继续保留的帧数（每帧 960 采样点 = 60ms）
+VAD_HANGOVER_FRAMES = _env_int("VAD_HANGOVER_FRAMES", 3)
+
+# 翻译结果缓存：相同音频 + 语言对直接返回上次结果
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = _env_int("RESULT_CACHE_MAX_ENTRIES", 1024)
+RESULT_CACHE_MAX_BYTES = _env_int("RESULT_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+RESULT_CACHE_TTL = _env_float("RESULT_CACHE_TTL", 600.0)
+# 持久化 SQLite 文件路径，留空则只缓存在内存中
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")
+
+# 翻译结果的合成音频短期存储（/api/audio/{result_id}）
+RESULT_AUDIO_TTL = _env_float("RESULT_AUDIO_TTL", 120.0)
+RESULT_AUDIO_MAX_ENTRIES = _env_int("RESULT_AUDIO_MAX_ENTRIES", 256)
+RESULT_AUDIO_MAX_BYTES = _env_int("RESULT_AUDIO_MAX_BYTES", 32 * 1024 * 1024)
+# 上游返回无容器的裸 PCM 时按此采样率加 WAV 头
+RESULT_AUDIO_SAMPLE_RATE = _env_int("RESULT_AUDIO_SAMPLE_RATE", 16000)
+
+# 管理接口令牌（/admin/*）；留空时只允许本机访问
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# 单次按需采样的最长时间（秒）
+PROFILER_MAX_SECONDS = _env_float("PROFILER_MAX_SECONDS", 60.0)
+# 栈采样间隔（秒）
+PROFILER_INTERVAL = _env_float("PROFILER_INTERVAL", 0.005)
@@ -0,0 +1,149 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，暂不尝试连接上游"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"上游熔断中，{retry_after:.1f} 秒后重试")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    上游熔断器（closed / open / half-open）
+    - closed：正常放行，连续失败 failure_threshold 次后打开
+    - open：直接拒绝，等待时间按打开次数指数增长（base_backoff * 2^n，上限 max_backoff）并加随机抖动，
+      避免所有实例同时重连
+    - half-open：等待结束后只放行一次探测，成功则关闭，失败则再次打开
+    - 打开期间由后台任务调用 probe 探测恢复，请求无需排队等待重连
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: float = 0.5,
+        probe: Optional[Callable[[], Awaitable[bool]]] = None,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # 抖动比例：实际等待时间在 [backoff * (1 - jitter), backoff] 内均匀分布
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.probe = probe
+        self.state = self.CLOSED
+        self.failures = 0
+        # 连续打开次数，决定下次的退避时间
+        self.consecutive_opens = 0
+        self.opened_until = 0.0
+        self.total_opens = 0
+        self.rejected = 0
+        self._half_open_busy = False
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def retry_after(self) -> float:
+        """距离允许下一次探测的秒数"""
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def allow(self):
+        """调用上游前检查，熔断中抛出 CircuitOpenError"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self.opened_until - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(remaining)
+            self.state = self.HALF_OPEN
+            self._half_open_busy = False
+            print("🟡 熔断器半开，放行一次探测")
+        # half-open：同一时刻只放行一次探测
+        if self._half_open_busy:
+            self.rejected += 1
+            raise CircuitOpenError(self.base_backoff)
+        self._half_open_busy = True
+
+    def release(self):
+        """已放行的调用被取消（既未成功也未失败）"""
+        self._half_open_busy = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print("🟢 上游已恢复，熔断器关闭")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.consecutive_opens = 0
+        self._half_open_busy = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self._trip()
+
+    def _trip(self):
+        self.consecutive_opens += 1
+        self.total_opens += 1
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.consecutive_opens - 1))
+        delay = random.uniform(backoff * (1 - self.jitter), backoff)
+        self.opened_until = time.monotonic() + delay
+        self.state = self.OPEN
+        self._half_open_busy = False
+        print(f"🔴 熔断器打开（连续失败 {self.failures} 次），{delay:.1f} 秒后探测")
+        self._schedule_probe()
+
+    def _schedule_probe(self):
+        if self.probe is None or (self._probe_task and not self._probe_task.done()):
+            return
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+        except RuntimeError:
+            # 没有运行中的事件循环：由下一个请求在半开状态下探测
+            self._probe_task = None
+
+    async def _probe_loop(self):
+        while self.state != self.CLOSED:
+            await asyncio.sleep(max(self.retry_after(), 0.05))
+            if self.state == self.CLOSED:
+                return
+            try:
+                if await self.probe():
+                    self.record_success()
+                elif self.state != self.CLOSED and self.retry_after() <= 0:
+                    # 探测失败却没有改变熔断器状态（例如未真正尝试连接）：按失败处理重新退避，避免空转
+                    self.failures += 1
+                    self._trip()
+            except CircuitOpenError:
+                # 探测名额被请求占用，等待其结果
+                pass
+            except Exception as e:
+                print(f"⚠️ 熔断探测出错: {e}")
+
+    async def close(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "consecutive_opens": self.consecutive_opens,
+            "total_opens": self.total_opens,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 2),
+        }
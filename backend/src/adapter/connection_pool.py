@@ -0,0 +1,458 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from adapter.circuit_breaker import CircuitBreaker, CircuitOpenError
+from adapter.improved_makawai_adapter import ImprovedMakawaiClient
+
+
+PoolKey = Tuple[str, str]
+
+
+class PoolTimeoutError(Exception):
+    """等待可用连接超时"""
+
+
+class PoolConnectError(Exception):
+    """无法建立新的上游连接"""
+
+
+class UnsupportedLanguageError(ValueError):
+    """语言对不在支持列表中，不为其建立连接"""
+
+
+class _PoolBucket:
+    """单个语言对的连接集合"""
+
+    def __init__(self, key: PoolKey):
+        self.key = key
+        # 空闲连接: (client, 进入空闲的时间)，右端为最近归还
+        self.idle: Deque[Tuple[ImprovedMakawaiClient, float]] = deque()
+        # 总连接数，包含已借出和正在建立中的连接
+        self.size = 0
+        # 已借出的连接数
+        self.in_use = 0
+        # 已借出连接 -> 占用的在途槽位数（流水线模式下一条连接可同时借给多个请求）
+        self.borrowers: Dict[ImprovedMakawaiClient, int] = {}
+        # 独占借出的连接（流式会话），占满全部槽位
+        self.exclusive: Set[ImprovedMakawaiClient] = set()
+        # 借出期间被判定需要丢弃的连接，最后一个借用者归还后关闭
+        self.retiring: Set[ImprovedMakawaiClient] = set()
+        self.waiting = 0
+        # 累计计数：新建连接、复用前检查失败被丢弃的连接、建立失败次数
+        self.opened = 0
+        self.stale = 0
+        self.connect_failures = 0
+        self.condition = asyncio.Condition()
+
+
+class MakawaiConnectionPool:
+    """
+    Makawai上游连接池
+    - 按 (source_lang, target_lang) 分组管理连接，切换语言对无需重连
+    - 每组连接数受 min_size / max_size 约束
+    - 借出(acquire)/归还(release)语义；pipeline_depth 为 1 时同一连接同一时刻只服务一个请求，
+      大于 1 时（流水线客户端）同一连接最多同时借给 pipeline_depth 个请求：优先使用空闲连接或新建连接，
+      连接数已满（或熔断中不能新建）时才共享负载最低的在用连接，避免请求在一条连接上排队
+    - 后台任务回收超时空闲连接
+    - 可选的熔断器（breaker）统一控制新建连接：上游不可用时直接抛出 CircuitOpenError，
+      由熔断器按指数退避在后台探测恢复
+    - 配置 languages 时只接受其中的语言对，其余抛出 UnsupportedLanguageError，
+      客户端输入不能无限制地创建连接组
+    """
+
+    def __init__(
+        self,
+        min_size: int = 0,
+        max_size: int = 4,
+        idle_timeout: float = 120.0,
+        acquire_timeout: float = 15.0,
+        client_factory: Callable[[], ImprovedMakawaiClient] = ImprovedMakawaiClient,
+        pipeline_depth: int = 1,
+        breaker: Optional[CircuitBreaker] = None,
+        languages: Optional[Iterable[str]] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size 必须大于等于 1")
+        if pipeline_depth < 1:
+            raise ValueError("pipeline_depth 必须大于等于 1")
+        self.pipeline_depth = pipeline_depth
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._client_factory = client_factory
+        self.breaker = breaker
+        self.languages = frozenset(languages) if languages is not None else None
+        if breaker is not None and breaker.probe is None:
+            breaker.probe = self.probe
+        self._buckets: Dict[PoolKey, _PoolBucket] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def supports(self, source_lang: str, target_lang: str) -> bool:
+        """语言对是否允许建立连接"""
+        return self.languages is None or (source_lang in self.languages and target_lang in self.languages)
+
+    def _bucket(self, source_lang: str, target_lang: str) -> _PoolBucket:
+        key = (source_lang, target_lang)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _PoolBucket(key)
+            self._buckets[key] = bucket
+        return bucket
+
+    async def start(self):
+        """启动空闲连接回收任务"""
+        self._closed = False
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def warmup(self, source_lang: str = "zh", target_lang: str = "en") -> bool:
+        """预先建立连接，至少保证一条可用连接"""
+        if not self.supports(source_lang, target_lang):
+            return False
+        bucket = self._bucket(source_lang, target_lang)
+        target = max(1, self.min_size)
+        while len(bucket.idle) < target and bucket.size < self.max_size:
+            try:
+                client = await self.acquire(source_lang, target_lang)
+            except (PoolConnectError, PoolTimeoutError, CircuitOpenError):
+                return False
+            await self.release(client)
+        return len(bucket.idle) > 0
+
+    async def probe(self) -> bool:
+        """
+        熔断器的恢复探测：经熔断器放行后为最近使用的语言对新建一条连接
+        不复用空闲连接，也不受 max_size 限制，只有真正连上上游才算恢复；
+        成功的连接放入连接池（已满时关闭）
+        """
+        if self._closed:
+            return False
+        source_lang, target_lang = next(reversed(self._buckets), ("zh", "en"))
+        bucket = self._bucket(source_lang, target_lang)
+        if self.breaker is not None:
+            self.breaker.allow()
+        client = self._client_factory()
+        try:
+            connected = await client.connect(source_lang, target_lang)
+        except Exception as e:
+            print(f"💥 熔断探测建立连接异常: {e}")
+            connected = False
+        except BaseException:
+            if self.breaker is not None:
+                self.breaker.release()
+            await client.close()
+            raise
+
+        if self.breaker is not None:
+            if connected:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        if not connected:
+            bucket.connect_failures += 1
+            await client.close()
+            return False
+
+        async with bucket.condition:
+            keep = not self._closed and bucket.size < self.max_size
+            if keep:
+                bucket.size += 1
+                bucket.opened += 1
+                bucket.idle.append((client, time.monotonic()))
+                bucket.condition.notify()
+        if not keep:
+            await client.close()
+        return True
+
+    async def acquire(
+        self,
+        source_lang: str,
+        target_lang: str,
+        timeout: Optional[float] = None,
+        exclusive: bool = False,
+    ) -> ImprovedMakawaiClient:
+        """
+        借出一条可用连接，必要时新建
+        exclusive=True 时独占整条连接（流式发送/接收），不与其他请求共享
+        """
+        if self._closed:
+            raise PoolConnectError("连接池已关闭")
+        if not self.supports(source_lang, target_lang):
+            raise UnsupportedLanguageError(f"不支持的语言对: {source_lang}→{target_lang}")
+
+        bucket = self._bucket(source_lang, target_lang)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.acquire_timeout if timeout is None else timeout)
+
+        while True:
+            candidate: Optional[ImprovedMakawaiClient] = None
+            async with bucket.condition:
+                while candidate is None:
+                    if bucket.idle:
+                        candidate, _ = bucket.idle.pop()
+                        self._lend(bucket, candidate, exclusive)
+                        break
+                    shared = None if exclusive else self._shareable(bucket)
+                    if bucket.size < self.max_size:
+                        try:
+                            if self.breaker is not None:
+                                self.breaker.allow()
+                        except CircuitOpenError:
+                            # 熔断中不新建连接：有可共享的在用连接时继续使用，否则直接失败，不排队等待重连
+                            if shared is None:
+                                raise
+                        else:
+                            # 先占位，连接在锁外建立
+                            bucket.size += 1
+                            break
+                    if shared is not None:
+                        # 连接数已满：追加到负载最低的已建立、经过验证的在用连接上
+                        bucket.borrowers[shared] += 1
+                        return shared
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"等待 {source_lang}→{target_lang} 连接超时")
+                    bucket.waiting += 1
+                    try:
+                        await asyncio.wait_for(bucket.condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        raise PoolTimeoutError(f"等待 {source_lang}→{target_lang} 连接超时")
+                    finally:
+                        bucket.waiting -= 1
+
+            if candidate is None:
+                return await self._open_connection(bucket, exclusive)
+
+            # 复用前只检查缓存的连接状态，保活由后台 ConnectionSupervisor 负责
+            if candidate.is_connected() and candidate.healthy:
+                return candidate
+
+            print(f"⚠️ 连接池 {source_lang}→{target_lang}: 空闲连接已失效，丢弃")
+            bucket.stale += 1
+            await self.release(candidate, discard=True)
+
+    def _shareable(self, bucket: _PoolBucket) -> Optional[ImprovedMakawaiClient]:
+        """流水线模式下负载最低、仍有空闲槽位的在用连接"""
+        if self.pipeline_depth <= 1:
+            return None
+        best = None
+        for client, load in bucket.borrowers.items():
+            if load >= self.pipeline_depth or client in bucket.retiring or not client.healthy or not client.is_connected():
+                continue
+            if best is None or load < bucket.borrowers[best]:
+                best = client
+        return best
+
+    def _lend(self, bucket: _PoolBucket, client: ImprovedMakawaiClient, exclusive: bool):
+        bucket.in_use += 1
+        bucket.borrowers[client] = self.pipeline_depth if exclusive else 1
+        if exclusive:
+            bucket.exclusive.add(client)
+
+    async def _open_connection(self, bucket: _PoolBucket, exclusive: bool = False) -> ImprovedMakawaiClient:
+        source_lang, target_lang = bucket.key
+        client = self._client_factory()
+        try:
+            connected = await client.connect(source_lang, target_lang)
+        except Exception as e:
+            print(f"💥 连接池建立连接异常: {e}")
+            connected = False
+        except BaseException:
+            # 请求被取消：释放占位并唤醒等待者
+            if self.breaker is not None:
+                self.breaker.release()
+            bucket.size -= 1
+            asyncio.create_task(self._notify(bucket))
+            await client.close()
+            raise
+
+        async with bucket.condition:
+            if connected:
+                self._lend(bucket, client, exclusive)
+                bucket.opened += 1
+            else:
+                bucket.size -= 1
+                bucket.connect_failures += 1
+                bucket.condition.notify()
+
+        if self.breaker is not None:
+            if connected:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        if not connected:
+            raise PoolConnectError(f"无法建立 {source_lang}→{target_lang} 连接")
+
+        print(f"🔗 连接池 {source_lang}→{target_lang}: 新建连接 (共 {bucket.size} 条)")
+        return client
+
+    async def _notify(self, bucket: _PoolBucket):
+        async with bucket.condition:
+            bucket.condition.notify()
+
+    async def release(self, client: ImprovedMakawaiClient, discard: bool = False):
+        """归还连接；discard=True 或连接已断开时直接关闭（共享中的连接待全部借用者归还后关闭）"""
+        bucket = self._bucket(client.source_lang, client.target_lang)
+
+        async with bucket.condition:
+            if client in bucket.exclusive:
+                bucket.exclusive.discard(client)
+                slots = self.pipeline_depth
+            else:
+                slots = 1
+            remaining = bucket.borrowers.get(client, slots) - slots
+            if discard:
+                bucket.retiring.add(client)
+            if remaining > 0:
+                # 仍有其他请求在使用该连接
+                bucket.borrowers[client] = remaining
+                bucket.condition.notify()
+                return
+
+            bucket.borrowers.pop(client, None)
+            bucket.in_use -= 1
+            retiring = client in bucket.retiring
+            bucket.retiring.discard(client)
+            keep = not retiring and not self._closed and client.healthy and client.is_connected()
+            if keep:
+                bucket.idle.append((client, time.monotonic()))
+            else:
+                bucket.size -= 1
+            bucket.condition.notify()
+
+        if not keep:
+            await client.close()
+
+    @asynccontextmanager
+    async def connection(
+        self,
+        source_lang: str,
+        target_lang: str,
+        timeout: Optional[float] = None,
+        exclusive: bool = False,
+    ):
+        """借出连接的上下文管理器，出现异常时丢弃该连接"""
+        client = await self.acquire(source_lang, target_lang, timeout, exclusive)
+        discard = False
+        try:
+            yield client
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            await self.release(client, discard=discard)
+
+    async def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while not self._closed:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"⚠️ 连接池回收任务出错: {e}")
+
+    async def evict_idle(self) -> int:
+        """回收超时或已断开的空闲连接，返回回收数量"""
+        now = time.monotonic()
+        evicted: List[ImprovedMakawaiClient] = []
+
+        for bucket in list(self._buckets.values()):
+            async with bucket.condition:
+                kept: Deque[Tuple[ImprovedMakawaiClient, float]] = deque()
+                # 从最早归还的连接开始检查
+                for client, idle_since in bucket.idle:
+                    expired = now - idle_since > self.idle_timeout and bucket.size > self.min_size
+                    if expired or not client.is_connected():
+                        bucket.size -= 1
+                        evicted.append(client)
+                    else:
+                        kept.append((client, idle_since))
+                bucket.idle = kept
+                if evicted:
+                    bucket.condition.notify_all()
+
+        for client in evicted:
+            await client.close()
+        if evicted:
+            print(f"🧹 连接池回收空闲连接 {len(evicted)} 条")
+        return len(evicted)
+
+    async def close(self):
+        """关闭连接池及全部空闲连接"""
+        self._closed = True
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+        if self.breaker is not None:
+            await self.breaker.close()
+
+        for bucket in list(self._buckets.values()):
+            async with bucket.condition:
+                idle = [client for client, _ in bucket.idle]
+                bucket.idle.clear()
+                bucket.size -= len(idle)
+                bucket.condition.notify_all()
+            for client in idle:
+                await client.close()
+
+    def connections(self) -> List[ImprovedMakawaiClient]:
+        """当前全部连接（空闲 + 已借出），供后台保活检测"""
+        clients: List[ImprovedMakawaiClient] = []
+        for bucket in self._buckets.values():
+            clients.extend(client for client, _ in bucket.idle)
+            clients.extend(bucket.borrowers)
+        return clients
+
+    async def discard_idle(self, client: ImprovedMakawaiClient) -> bool:
+        """若连接空闲则移出连接池并关闭；已借出的连接在归还时处理"""
+        bucket = self._bucket(client.source_lang, client.target_lang)
+        async with bucket.condition:
+            for entry in bucket.idle:
+                if entry[0] is client:
+                    bucket.idle.remove(entry)
+                    bucket.size -= 1
+                    bucket.condition.notify()
+                    break
+            else:
+                return False
+        await client.close()
+        return True
+
+    def connected_count(self) -> int:
+        """当前处于连接状态的连接数"""
+        count = 0
+        for bucket in self._buckets.values():
+            count += sum(1 for client, _ in bucket.idle if client.is_connected())
+            count += bucket.in_use
+        return count
+
+    def stats(self) -> dict:
+        """连接池状态，用于健康检查与状态接口"""
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle_timeout": self.idle_timeout,
+            "pipeline_depth": self.pipeline_depth,
+            "pools": {
+                f"{source}->{target}": {
+                    "size": bucket.size,
+                    "idle": len(bucket.idle),
+                    "in_use": bucket.in_use,
+                    "in_flight": sum(bucket.borrowers.values()),
+                    "waiting": bucket.waiting,
+                    "opened": bucket.opened,
+                    "stale": bucket.stale,
+                    "connect_failures": bucket.connect_failures,
+                }
+                for (source, target), bucket in self._buckets.items()
+            },
+        }
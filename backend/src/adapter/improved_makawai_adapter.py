@@ -1,11 +1,61 @@
 import websockets
 import json
 import asyncio
+import os
 import traceback
 import time
 import ssl
 import base64
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Tuple
+
+
+# websockets 14 起 connect() 改为新实现：请求头参数由 extra_headers 改名为 additional_headers
+_HEADERS_KWARG = "extra_headers" if int(websockets.__version__.split(".")[0]) < 14 else "additional_headers"
+
+
+def _upstream_settings() -> Tuple[str, str]:
+    """
+    上游地址与密钥：环境变量 MAKAWAI_WS_URL / MAKAWAI_API_KEY 优先，
+    否则读取 config/api_config.py（便于指向本地模拟服务做压测）
+    """
+    url = os.getenv("MAKAWAI_WS_URL")
+    api_key = os.getenv("MAKAWAI_API_KEY")
+    if not url or api_key is None:
+        from config.api_config import MAKAWAI_WS_URL, MAKAWAI_API_KEY
+        url = url or MAKAWAI_WS_URL
+        api_key = MAKAWAI_API_KEY if api_key is None else api_key
+    return str(url).strip(), api_key
+
+
+def _ws_is_open(ws) -> bool:
+    """兼容新旧两种连接对象的打开状态判断"""
+    if hasattr(ws, "open"):
+        return bool(ws.open)
+    state = getattr(ws, "state", None)
+    return state is not None and state.name == "OPEN"
+
+
+async def paced_frames(
+    pcm_bytes,
+    frame_size: int = 960,
+    sample_rate: int = 16000,
+    pace: float = 0.0,
+) -> AsyncIterator[memoryview]:
+    """
+    把 16-bit PCM 切成 frame_size 采样的帧（零拷贝切片）
+    pace > 0 时按 pace 倍实时速度输出（1.0 为实时），0 表示不限速
+    """
+    view = memoryview(pcm_bytes).cast("B")
+    frame_bytes = frame_size * 2
+    frame_seconds = frame_size / sample_rate / pace if pace > 0 else 0.0
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for index, offset in enumerate(range(0, len(view), frame_bytes)):
+        if frame_seconds:
+            delay = start + index * frame_seconds - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield view[offset:offset + frame_bytes]
 
 
 class ImprovedMakawaiClient:
@@ -20,51 +70,55 @@ class ImprovedMakawaiClient:
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.last_activity_time = 0
         self.is_processing = False
+        # 连续连接失败次数，仅用于日志；重连节奏由连接池的熔断器控制
         self.connection_attempts = 0
-        self.max_retries = 3
         self.ssl_context = ssl.create_default_context()
+        # 当前连接对应的语言对，连接池按此分组
+        self.source_lang: Optional[str] = None
+        self.target_lang: Optional[str] = None
+        # 后台保活检测的结果，请求路径只读取这些缓存状态
+        self.healthy = True
+        self.rtt: Optional[float] = None
+        self.last_pong_time = 0.0
+        self.consecutive_ping_failures = 0
         
     async def connect(self, source_lang: str = "zh", target_lang: str = "en") -> bool:
         """建立WebSocket连接"""
-        from config.api_config import MAKAWAI_WS_URL, MAKAWAI_API_KEY
-        
-        # 防止无限重连
-        if self.connection_attempts >= self.max_retries:
-            print(f"DEBUG: 达到最大重连次数 {self.max_retries}")
-            return False
-            
         try:
             # 清理旧连接
             if self.ws:
                 await self.close()
             
             # 构建连接URL
-            base_url = str(MAKAWAI_WS_URL).strip()
+            base_url, api_key = _upstream_settings()
             url = f"{base_url}?source_lang={source_lang}&target_lang={target_lang}"
             
             headers = {
-                "Authorization": f"Bearer {MAKAWAI_API_KEY}",
+                "Authorization": f"Bearer {api_key}",
                 "User-Agent": "VoiceTranslationClient/1.0"
             }
             
             print(f"DEBUG: 连接到 {url}")
             
-            # 建立连接
-            self.ws = await websockets.connect(
-                url, 
-                additional_headers=headers,
-                ssl=self.ssl_context,
-                timeout=10.0
-            )
+            # 建立连接（ssl 参数只能用于 wss:// 地址）
+            connect_kwargs = {_HEADERS_KWARG: headers, "open_timeout": 10.0}
+            if base_url.startswith("wss://"):
+                connect_kwargs["ssl"] = self.ssl_context
+            self.ws = await websockets.connect(url, **connect_kwargs)
             
             print("DEBUG: WebSocket连接建立成功")
+            self.source_lang = source_lang
+            self.target_lang = target_lang
             self.connection_attempts = 0  # 重置重连计数
             self.last_activity_time = time.time()
+            self.healthy = True
+            self.consecutive_ping_failures = 0
+            self.last_pong_time = time.time()
             return True
             
         except Exception as e:
             self.connection_attempts += 1
-            print(f"DEBUG: 连接失败 (尝试 {self.connection_attempts}/{self.max_retries}): {e}")
+            print(f"DEBUG: 连接失败 (连续第 {self.connection_attempts} 次): {e}")
             print(f"DEBUG: 详细错误: {traceback.format_exc()}")
             return False
     
@@ -81,21 +135,24 @@ class ImprovedMakawaiClient:
             self.last_activity_time = time.time()
             
             print("DEBUG: 开始发送音频流...")
+            chunks = 0
+            total_bytes = 0
             
             async for audio_chunk in audio_generator:
-                if not self.ws or not hasattr(self.ws, 'open') or not self.ws.open:
+                if not self.ws or not _ws_is_open(self.ws):
                     raise Exception("WebSocket连接已断开")
                 
                 # 发送音频数据
                 await self.ws.send(audio_chunk)
-                print(f"DEBUG: 发送音频块: {len(audio_chunk)} 字节")
+                chunks += 1
+                total_bytes += len(audio_chunk)
                 
                 # 保持活跃状态
                 self.last_activity_time = time.time()
                 
             # 发送结束标记
             await self.ws.send(b"")
-            print("DEBUG: 音频流发送完成")
+            print(f"DEBUG: 音频流发送完成: {chunks} 块, {total_bytes} 字节")
             
         except Exception as e:
             print(f"DEBUG: 音频流发送失败: {e}")
@@ -127,7 +184,102 @@ class ImprovedMakawaiClient:
         finally:
             self.is_processing = False
     
-    async def receive_result(self) -> Dict[str, Any]:
+    async def send_request(self, pcm_bytes: bytes, timeout: float = 30.0) -> Awaitable[Dict[str, Any]]:
+        """
+        发送一段音频，返回等待其翻译结果的可等待对象
+        逐次模式下即 send_audio + receive_result；流水线客户端会重写此方法
+        """
+        await self.send_audio(pcm_bytes)
+        return self.receive_result(timeout=timeout)
+    
+    async def stream_request(
+        self,
+        pcm_bytes,
+        frame_size: int = 960,
+        sample_rate: int = 16000,
+        pace: float = 0.0,
+        timeout: float = 30.0,
+    ) -> Dict[str, Any]:
+        """
+        分帧流式发送一段音频，发送的同时接收结果，上游可在整段到达前开始识别
+        - 帧通过 send_audio_stream 发送，最后发送空消息作为结束标记
+        - 上游可先返回 is_final=false 的中间结果，收到最终结果（或错误/超时）后返回
+        - timeout 为整段音频的总时限，上游持续返回中间结果也不会延长
+        - 返回的结果附带 interim_results（中间结果数）与 first_result_latency（首个结果的延迟，秒）
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        interim = 0
+        first_result_latency = None
+        final_result = None
+        async for result in self.stream_results(pcm_bytes, frame_size, sample_rate, pace, timeout):
+            if first_result_latency is None and result.get("status") == "success":
+                first_result_latency = loop.time() - started
+            if not result["is_final"]:
+                interim += 1
+                continue
+            final_result = result
+        final_result["interim_results"] = interim
+        final_result["first_result_latency"] = first_result_latency
+        return final_result
+
+    async def stream_results(
+        self,
+        pcm_bytes,
+        frame_size: int = 960,
+        sample_rate: int = 16000,
+        pace: float = 0.0,
+        timeout: float = 30.0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        分帧流式发送一段音频，并逐条产出上游消息
+        - 每条结果带 is_final：上游 is_final=false 的成功结果为中间结果，其余（最终结果、错误、超时）为最终结果
+        - 产出最终结果并等待发送完成后结束；发送失败时抛出异常
+        - timeout 是从开始发送算起的总时限而不是单条消息的等待时间：到期时产出 timeout 最终结果并停止发送，
+          上游持续返回中间结果也无法无限期占用连接；超时后连接上可能有迟到的消息，应丢弃该连接
+        - 调用方提前退出时停止发送，此时连接上可能还有未读的消息，应丢弃该连接
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        sender = asyncio.create_task(
+            self.send_audio_stream(paced_frames(pcm_bytes, frame_size, sample_rate, pace))
+        )
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    print("DEBUG: 流式结果超过总时限")
+                    result = self._status_result("timeout", "翻译服务超时")
+                else:
+                    receiver = asyncio.create_task(self.receive_result(timeout=remaining))
+                    if not sender.done():
+                        await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+                    if not receiver.done() and sender.exception() is not None:
+                        receiver.cancel()
+                        raise sender.exception()
+                    result = await receiver
+                raw = result.get("raw_response")
+                result["is_final"] = not (
+                    result.get("status") == "success" and isinstance(raw, dict) and raw.get("is_final") is False
+                )
+                if not result["is_final"]:
+                    print(f"DEBUG: 收到中间结果: '{result.get('translation', '')}'")
+                yield result
+                if result["status"] == "timeout":
+                    # 超时后不再等待发送完成，由 finally 取消发送
+                    return
+                if result["is_final"]:
+                    await sender
+                    return
+        finally:
+            if not sender.done():
+                sender.cancel()
+                try:
+                    await sender
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    async def receive_result(self, timeout: float = 30.0) -> Dict[str, Any]:
         """接收翻译结果"""
         if not self.ws:
             return {"status": "error", "error_message": "WebSocket未连接"}
@@ -136,80 +288,69 @@ class ImprovedMakawaiClient:
             print("DEBUG: 等待翻译结果...")
             
             # 设置超时
-            message = await asyncio.wait_for(self.ws.recv(), timeout=30.0)
-            print(f"DEBUG: 收到响应: {message[:100]}...")
-            
-            # 解析响应
-            try:
-                result = json.loads(message)
-                print(f"DEBUG: 解析结果: {result}")
-                
-                # 处理业务错误
-                if result.get('result') == 'failed':
-                    return {
-                        "status": "error",
-                        "error_message": result.get('err_msg', '未知错误'),
-                        "translation": "",
-                        "original": ""
-                    }
-                
-                # 提取翻译文本
-                translation = result.get('translated_text', '').strip()
-                original = result.get('original_text', '').strip()
-                
-                # 解码音频数据（如果存在）
-                audio_bytes = None
-                if 'audio_data' in result:
-                    try:
-                        audio_bytes = base64.b64decode(result['audio_data'])
-                        print(f"DEBUG: 解码音频数据: {len(audio_bytes)} 字节")
-                    except Exception as e:
-                        print(f"DEBUG: 音频解码失败: {e}")
-                
-                return {
-                    "status": "success",
-                    "translation": translation,
-                    "original": original,
-                    "audio_bytes": audio_bytes,
-                    "raw_response": result
-                }
-                
-            except json.JSONDecodeError as e:
-                print(f"DEBUG: JSON解析失败: {e}")
-                return {
-                    "status": "error", 
-                    "error_message": f"响应格式错误: {str(e)}",
-                    "translation": "",
-                    "original": ""
-                }
+            message = await asyncio.wait_for(self.ws.recv(), timeout=timeout)
+            return self._parse_message(message)
                 
         except asyncio.TimeoutError:
             print("DEBUG: 接收超时")
-            return {
-                "status": "timeout",
-                "error_message": "翻译服务超时",
-                "translation": "",
-                "original": ""
-            }
+            return self._status_result("timeout", "翻译服务超时")
         except websockets.exceptions.ConnectionClosed:
             print("DEBUG: 连接已关闭")
-            return {
-                "status": "closed",
-                "error_message": "连接已关闭",
-                "translation": "",
-                "original": ""
-            }
+            return self._status_result("closed", "连接已关闭")
         except Exception as e:
             print(f"DEBUG: 接收错误: {e}")
-            return {
-                "status": "error",
-                "error_message": str(e),
-                "translation": "",
-                "original": ""
-            }
+            return self._status_result("error", str(e))
         finally:
             self.is_processing = False
     
+    @staticmethod
+    def _status_result(status: str, error_message: str) -> Dict[str, Any]:
+        return {
+            "status": status,
+            "error_message": error_message,
+            "translation": "",
+            "original": ""
+        }
+    
+    def _parse_message(self, message) -> Dict[str, Any]:
+        """解析上游消息为统一的结果字典"""
+        print(f"DEBUG: 收到响应: {message[:100]}...")
+        
+        # 解析响应
+        try:
+            result = json.loads(message)
+        except json.JSONDecodeError as e:
+            print(f"DEBUG: JSON解析失败: {e}")
+            return self._status_result("error", f"响应格式错误: {str(e)}")
+        # base64 音频解码后不再保留在原始响应中，避免随结果字典复制和打印
+        audio_data = result.pop('audio_data', None) if isinstance(result, dict) else None
+        print(f"DEBUG: 解析结果: {result}")
+        
+        # 处理业务错误
+        if result.get('result') == 'failed':
+            return self._status_result("error", result.get('err_msg', '未知错误'))
+        
+        # 提取翻译文本
+        translation = result.get('translated_text', '').strip()
+        original = result.get('original_text', '').strip()
+        
+        # 解码音频数据（如果存在）
+        audio_bytes = None
+        if audio_data:
+            try:
+                audio_bytes = base64.b64decode(audio_data)
+                print(f"DEBUG: 解码音频数据: {len(audio_bytes)} 字节")
+            except Exception as e:
+                print(f"DEBUG: 音频解码失败: {e}")
+        
+        return {
+            "status": "success",
+            "translation": translation,
+            "original": original,
+            "audio_bytes": audio_bytes,
+            "raw_response": result
+        }
+    
     async def ping_server(self) -> bool:
         """Ping服务器检查连接状态"""
         if not self.ws:
@@ -223,13 +364,40 @@ class ImprovedMakawaiClient:
             print(f"DEBUG: Ping失败: {e}")
             return False
     
+    async def measure_rtt(self, timeout: float = 5.0) -> Optional[float]:
+        """发送 ping 并等待 pong，返回往返时间（秒），失败返回 None"""
+        if not self.ws:
+            return None
+        try:
+            start = time.perf_counter()
+            pong_waiter = await self.ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=timeout)
+            return time.perf_counter() - start
+        except Exception as e:
+            print(f"DEBUG: Ping失败: {e}")
+            return None
+    
+    async def keepalive(self, timeout: float = 5.0, max_failures: int = 2) -> bool:
+        """保活检测：更新 RTT 与健康状态，连续失败 max_failures 次后标记为不健康"""
+        rtt = await self.measure_rtt(timeout)
+        if rtt is None:
+            self.consecutive_ping_failures += 1
+            if self.consecutive_ping_failures >= max_failures or not self.is_connected():
+                self.healthy = False
+        else:
+            self.rtt = rtt
+            self.last_pong_time = time.time()
+            self.consecutive_ping_failures = 0
+            self.healthy = True
+        return self.healthy
+    
     def is_connected(self) -> bool:
         """检查连接状态"""
         if not self.ws:
             return False
             
         try:
-            return hasattr(self.ws, 'open') and self.ws.open
+            return _ws_is_open(self.ws)
         except Exception:
             return False
     
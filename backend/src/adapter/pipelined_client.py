@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional
+
+import websockets
+
+from adapter.improved_makawai_adapter import ImprovedMakawaiClient
+
+
+class PipelinedMakawaiClient(ImprovedMakawaiClient):
+    """
+    流水线模式的Makawai客户端
+    - 同一连接上可同时有多个音频分片在途，不必等上一个结果返回
+    - 独立的读取任务接收上游消息并分发给等待中的请求：
+      响应带序号字段（correlation_field）时按序号匹配，否则按发送顺序（FIFO）匹配
+    - FIFO 模式下某个请求超时后无法确定迟到的响应属于谁，连接标记为失步，
+      不再借出，待在途请求结束后由连接池关闭
+    """
+
+    def __init__(self, max_in_flight: int = 4, correlation_field: Optional[str] = "seq"):
+        super().__init__()
+        self.max_in_flight = max_in_flight
+        self.correlation_field = correlation_field
+        # 序号 -> 等待结果的 future，按发送顺序排列
+        self._pending: "OrderedDict[int, asyncio.Future]" = OrderedDict()
+        self._next_seq = 0
+        self._send_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        # 没有在途请求时收到的消息（流式发送的结果），供 receive_result 读取
+        self._unsolicited: asyncio.Queue = asyncio.Queue(maxsize=256)
+        self._desynced = False
+        # 上游响应是否携带序号；携带时超时的请求不影响后续匹配
+        self._correlated_seen = False
+
+    async def connect(self, source_lang: str = "zh", target_lang: str = "en") -> bool:
+        connected = await super().connect(source_lang, target_lang)
+        if connected:
+            self._next_seq = 0
+            self._desynced = False
+            self._correlated_seen = False
+            self._reader_task = asyncio.create_task(self._read_loop(self.ws))
+        return connected
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def is_connected(self) -> bool:
+        return not self._desynced and super().is_connected()
+
+    async def send_request(self, pcm_bytes: bytes, timeout: float = 30.0) -> Awaitable[Dict[str, Any]]:
+        """发送音频并登记等待者，发送完成即返回，不等待结果"""
+        if not self.ws:
+            raise Exception("WebSocket未连接")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # 登记与发送在同一把锁内完成，保证登记顺序与上游收到的顺序一致
+        async with self._send_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending[seq] = future
+            try:
+                await self.ws.send(pcm_bytes)
+            except BaseException:
+                self._pending.pop(seq, None)
+                raise
+        self.last_activity_time = time.time()
+        print(f"DEBUG: 流水线发送音频 #{seq}: {len(pcm_bytes)} 字节 (在途 {len(self._pending)})")
+        return self._wait_result(seq, future, timeout)
+
+    async def _wait_result(self, seq: int, future: asyncio.Future, timeout: float) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"DEBUG: 流水线请求 #{seq} 接收超时")
+            if self._pending.get(seq) is future:
+                if self._correlated_seen:
+                    # 按序号匹配时直接放弃该请求，迟到的响应会被丢弃
+                    self._pending.pop(seq, None)
+                else:
+                    # FIFO 匹配下，迟到的响应会错配给后续请求
+                    self._desynced = True
+            return self._status_result("timeout", "翻译服务超时")
+
+    async def receive_result(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """读取流式发送（send_audio_stream）产生的结果"""
+        if not self.ws and self._unsolicited.empty():
+            return {"status": "error", "error_message": "WebSocket未连接"}
+        try:
+            return await asyncio.wait_for(self._unsolicited.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return self._status_result("timeout", "翻译服务超时")
+
+    async def _read_loop(self, ws):
+        """读取上游消息并分发给对应的等待者"""
+        try:
+            async for message in ws:
+                result = self._parse_message(message)
+                future = self._match(result)
+                if future is None:
+                    self._put_unsolicited(result)
+                elif not future.done():
+                    future.set_result(result)
+        except websockets.exceptions.ConnectionClosed:
+            print("DEBUG: 连接已关闭")
+        except Exception as e:
+            print(f"DEBUG: 流水线读取错误: {e}")
+        finally:
+            self._fail_pending("closed", "连接已关闭")
+
+    def _match(self, result: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """按序号（若响应携带）或发送顺序找到对应的等待者"""
+        raw = result.get("raw_response")
+        if self.correlation_field and isinstance(raw, dict) and self.correlation_field in raw:
+            try:
+                seq = int(raw[self.correlation_field])
+            except (TypeError, ValueError):
+                seq = None
+            if seq is not None:
+                self._correlated_seen = True
+                future = self._pending.pop(seq, None)
+                if future is None:
+                    # 已超时放弃的请求的迟到响应
+                    print(f"DEBUG: 丢弃迟到的响应 #{seq}")
+                    return asyncio.get_running_loop().create_future()
+                return future
+        if not self._pending:
+            return None
+        _, future = self._pending.popitem(last=False)
+        return future
+
+    def _put_unsolicited(self, result: Dict[str, Any]):
+        try:
+            self._unsolicited.put_nowait(result)
+        except asyncio.QueueFull:
+            print("DEBUG: 未被读取的上游消息过多，丢弃")
+
+    def _fail_pending(self, status: str, error_message: str):
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result(self._status_result(status, error_message))
+        self._put_unsolicited(self._status_result(status, error_message))
+
+    async def close(self):
+        reader, self._reader_task = self._reader_task, None
+        await super().close()
+        if reader:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending("closed", "连接已关闭")
+
+
+def make_pipelined_factory(max_in_flight: int, correlation_field: Optional[str] = "seq"):
+    """连接池使用的客户端工厂"""
+    def factory() -> PipelinedMakawaiClient:
+        return PipelinedMakawaiClient(max_in_flight=max_in_flight, correlation_field=correlation_field)
+    return factory
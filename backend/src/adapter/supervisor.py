@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from adapter.connection_pool import MakawaiConnectionPool
+from adapter.improved_makawai_adapter import ImprovedMakawaiClient
+
+
+class ConnectionSupervisor:
+    """
+    上游连接保活监督
+    - 按固定间隔对连接池中的全部连接并发 ping，记录 RTT 与健康状态
+    - 不健康的空闲连接立即关闭并在后台补建，已借出的连接在归还时丢弃
+    - 请求路径只读取缓存的健康状态，不再为每个请求额外 ping 一次
+    """
+
+    def __init__(
+        self,
+        pool: MakawaiConnectionPool,
+        interval: float = 15.0,
+        ping_timeout: float = 5.0,
+        max_failures: int = 2,
+    ):
+        self.pool = pool
+        self.interval = interval
+        self.ping_timeout = ping_timeout
+        self.max_failures = max_failures
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.reconnects = 0
+        self.last_round_time: Optional[float] = None
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_all()
+            except Exception as e:
+                print(f"⚠️ 连接保活检测出错: {e}")
+
+    async def check_all(self) -> int:
+        """检测一轮，返回被判定为不健康的连接数"""
+        clients = self.pool.connections()
+        results = await asyncio.gather(
+            *(client.keepalive(self.ping_timeout, self.max_failures) for client in clients),
+            return_exceptions=True,
+        )
+        self.rounds += 1
+        self.last_round_time = time.time()
+
+        unhealthy = [client for client, ok in zip(clients, results) if ok is not True]
+        lost: Set[Tuple[str, str]] = set()
+        for client in unhealthy:
+            client.healthy = False
+            key = (client.source_lang, client.target_lang)
+            if await self.pool.discard_idle(client):
+                lost.add(key)
+            print(f"💔 连接 {key[0]}→{key[1]} 不健康（连续 {client.consecutive_ping_failures} 次 ping 失败）")
+
+        # 断开的空闲连接由连接池回收，这里在后台补建被关闭的连接
+        lost.update(await self._evict_disconnected())
+        for source_lang, target_lang in lost:
+            if await self.pool.warmup(source_lang, target_lang):
+                self.reconnects += 1
+                print(f"🔁 已在后台重建 {source_lang}→{target_lang} 连接")
+        return len(unhealthy)
+
+    async def _evict_disconnected(self) -> Set[Tuple[str, str]]:
+        keys = {(client.source_lang, client.target_lang)
+                for client in self.pool.connections() if not client.is_connected()}
+        if keys:
+            await self.pool.evict_idle()
+        return keys
+
+    def stats(self) -> dict:
+        """各语言对连接的健康状态与 RTT"""
+        pairs: Dict[str, Dict[str, object]] = {}
+        clients: List[ImprovedMakawaiClient] = self.pool.connections()
+        for client in clients:
+            entry = pairs.setdefault(f"{client.source_lang}->{client.target_lang}",
+                                     {"healthy": 0, "unhealthy": 0, "rtt_ms": []})
+            entry["healthy" if client.healthy and client.is_connected() else "unhealthy"] += 1
+            if client.rtt is not None:
+                entry["rtt_ms"].append(round(client.rtt * 1000, 1))
+        return {
+            "interval": self.interval,
+            "rounds": self.rounds,
+            "reconnects": self.reconnects,
+            "last_round_time": self.last_round_time,
+            "pairs": pairs,
+        }
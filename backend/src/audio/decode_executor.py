@@ -0,0 +1,184 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+from audio.pcm_buffer import PcmData
+
+
+class DecodeQueueFullError(Exception):
+    """解码队列已满"""
+
+
+# 工作进程内的音频处理器实例（每个进程一个）
+_worker_processor = None
+
+
+def _init_worker(processor_options: dict):
+    """工作进程初始化：创建进程内的 AudioProcessor"""
+    global _worker_processor
+    from audio.improved_converter import AudioProcessor
+    _worker_processor = AudioProcessor(**processor_options)
+
+
+def _decode_to_shared_memory(data: bytes, audio_format: str) -> Tuple[Optional[str], int, bool, Optional[str]]:
+    """
+    在工作进程中解码，PCM 写入共享内存后只返回共享内存名称
+    避免把整段 PCM 通过 pickle 传回主进程
+    """
+    pcm_bytes, success, fallback = _worker_processor.decode_with_fallback(data, audio_format)
+    if not pcm_bytes:
+        return None, 0, success, fallback
+
+    shm = shared_memory.SharedMemory(create=True, size=len(pcm_bytes))
+    try:
+        shm.buf[:len(pcm_bytes)] = pcm_bytes
+        name = shm.name
+    finally:
+        shm.close()
+    # 共享内存的生命周期交给主进程管理（主进程读取后 unlink）
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return name, len(pcm_bytes), success, fallback
+
+
+def _collect_shared_memory(name: str, size: int) -> bytes:
+    """主进程读取并释放共享内存"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _discard_shared_memory(future: concurrent.futures.Future):
+    """调用方已放弃结果时释放共享内存"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    name, size, _, _ = future.result()
+    if name:
+        try:
+            _collect_shared_memory(name, size)
+        except FileNotFoundError:
+            pass
+
+
+class DecodeExecutor:
+    """
+    音频解码执行器
+    - 将音频解码移出事件循环，在进程池（或线程池）中执行
+    - 排队请求数受 queue_depth 限制，超出时立即拒绝
+    - 进程模式下 PCM 经共享内存返回
+    """
+
+    def __init__(
+        self,
+        mode: str = "process",
+        workers: Optional[int] = None,
+        queue_depth: int = 16,
+        processor_options: Optional[dict] = None,
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"不支持的解码执行模式: {mode}")
+        self.mode = mode
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.queue_depth = max(0, queue_depth)
+        # 传给 AudioProcessor 的构造参数
+        self.processor_options = dict(processor_options or {})
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self._thread_processor = None
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # 解码后被替换为测试音的次数（按原因）
+        self._fallback_tones: Dict[str, int] = {}
+
+    def start(self):
+        """创建执行器"""
+        if self._executor is not None:
+            return
+        if self.mode == "process":
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.processor_options,),
+            )
+        else:
+            from audio.improved_converter import AudioProcessor
+            self._thread_processor = AudioProcessor(**self.processor_options)
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="audio-decode",
+            )
+        print(f"🧵 解码执行器已启动: {self.mode} x {self.workers}, 队列深度 {self.queue_depth}")
+
+    def shutdown(self):
+        """关闭执行器，丢弃尚未开始的任务"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def decode(self, data: bytes, audio_format: str) -> Tuple[PcmData, bool]:
+        """
+        异步解码已识别格式的音频，返回值与 AudioProcessor.decode 相同
+        线程模式下 PCM 为解码结果的零拷贝视图；进程模式下从共享内存复制一次
+        """
+        if self._executor is None:
+            self.start()
+
+        # 正在执行 + 排队中的任务数受限
+        if self._pending >= self.workers + self.queue_depth:
+            self._rejected += 1
+            raise DecodeQueueFullError(f"解码队列已满 ({self._pending} 个任务)")
+
+        self._pending += 1
+        try:
+            if self.mode == "thread":
+                loop = asyncio.get_running_loop()
+                pcm_bytes, success, fallback = await loop.run_in_executor(
+                    self._executor, self._thread_processor.decode_with_fallback, data, audio_format
+                )
+            else:
+                pcm_bytes, success, fallback = await self._decode_in_process(data, audio_format)
+            self._completed += 1
+            if fallback:
+                self._fallback_tones[fallback] = self._fallback_tones.get(fallback, 0) + 1
+            return pcm_bytes, success
+        except DecodeQueueFullError:
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+    async def _decode_in_process(self, data: bytes, audio_format: str) -> Tuple[bytes, bool, Optional[str]]:
+        future = self._executor.submit(_decode_to_shared_memory, data, audio_format)
+        try:
+            name, size, success, fallback = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # 请求被取消，解码完成后仍需释放共享内存
+            future.add_done_callback(_discard_shared_memory)
+            raise
+
+        if not name:
+            return b"", success, fallback
+        return _collect_shared_memory(name, size), success, fallback
+
+    def stats(self) -> dict:
+        """执行器状态"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "pending": self._pending,
+            "queued": max(0, self._pending - self.workers),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "fallback_tones": dict(self._fallback_tones),
+        }
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+
+
+FORMAT_WAV = "wav"
+FORMAT_WEBM = "webm"
+FORMAT_OGG = "ogg"
+FORMAT_MP3 = "mp3"
+FORMAT_FLAC = "flac"
+FORMAT_MP4 = "mp4"
+FORMAT_PCM = "pcm"
+# MediaRecorder 的续传分片：声明为 WebM 但没有 EBML 头，只能由会话级流式解码器处理
+FORMAT_WEBM_CONTINUATION = "webm-continuation"
+FORMAT_UNKNOWN = "unknown"
+
+# 可交给解码器的格式（不含续传分片与未知格式）
+DECODABLE_FORMATS = (FORMAT_WAV, FORMAT_WEBM, FORMAT_OGG, FORMAT_MP3, FORMAT_FLAC, FORMAT_MP4, FORMAT_PCM)
+
+# 没有容器头时，按 Content-Type 判断
+_PCM_CONTENT_TYPES = {
+    "audio/l16", "audio/pcm", "audio/x-pcm", "audio/raw", "audio/x-raw",
+    "application/octet-stream",
+}
+_WEBM_CONTENT_TYPES = {"audio/webm", "video/webm", "audio/x-matroska", "video/x-matroska"}
+
+
+def _normalize_content_type(content_type: Optional[str]) -> str:
+    if not content_type:
+        return ""
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def _is_mp3_frame(header: bytes) -> bool:
+    """MPEG 音频帧同步字：11 位全 1，且 layer 不为保留值（排除 ADTS AAC）"""
+    if len(header) < 2 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return False
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    return version != 0x01 and layer != 0x00
+
+
+def detect_format(data: bytes, content_type: Optional[str] = None) -> str:
+    """根据文件头魔数（必要时结合 Content-Type）识别音频格式"""
+    header = bytes(data[:12])
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return FORMAT_WAV
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return FORMAT_WEBM
+    if header[:4] == b"OggS":
+        return FORMAT_OGG
+    if header[:4] == b"fLaC":
+        return FORMAT_FLAC
+    if header[:3] == b"ID3" or _is_mp3_frame(header):
+        return FORMAT_MP3
+    if header[4:8] == b"ftyp":
+        return FORMAT_MP4
+
+    mime = _normalize_content_type(content_type)
+    if mime in _WEBM_CONTENT_TYPES:
+        return FORMAT_WEBM_CONTINUATION
+    if mime in _PCM_CONTENT_TYPES:
+        return FORMAT_PCM
+    return FORMAT_UNKNOWN
+
+
+class FormatStats:
+    """按格式统计上传流量"""
+
+    def __init__(self):
+        self.requests: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def record(self, audio_format: str, size: int):
+        self.requests[audio_format] = self.requests.get(audio_format, 0) + 1
+        self.bytes[audio_format] = self.bytes.get(audio_format, 0) + size
+
+    def stats(self) -> dict:
+        return {
+            audio_format: {"requests": count, "bytes": self.bytes.get(audio_format, 0)}
+            for audio_format, count in sorted(self.requests.items())
+        }
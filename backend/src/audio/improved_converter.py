@@ -1,139 +1,182 @@
-import librosa
 import numpy as np
+import importlib
 import io
 import base64
-from pydub import AudioSegment
+import shutil
+import time
+import wave
+from functools import lru_cache
+from types import ModuleType
+from typing import Dict, Optional
+
+from audio.format_detect import DECODABLE_FORMATS, FORMAT_PCM, FORMAT_WAV, detect_format
+from audio.pcm_buffer import downmix_into, pcm_memoryview, pcm_quality, pcm_view, widen_into
+from audio.resampler import resample, resample_int16, to_int16
+
+
+# 按需加载的解码依赖及其导入耗时（秒）；librosa 会连带导入 numba/scipy，只在缺少 ffmpeg 时才需要
+_lazy_import_times: Dict[str, float] = {}
+
+
+@lru_cache(maxsize=None)
+def _lazy_import(name: str) -> ModuleType:
+    """首次使用时才导入重量级解码依赖，并记录导入耗时"""
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _lazy_import_times[name] = time.perf_counter() - start
+    print(f"DEBUG: 按需加载 {name}，用时 {_lazy_import_times[name] * 1000:.1f}ms")
+    return module
+
+
+def lazy_import_times() -> Dict[str, float]:
+    """本进程中已按需加载的解码依赖及导入耗时（秒）"""
+    return dict(_lazy_import_times)
+
+
+@lru_cache(maxsize=1)
+def _ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None or shutil.which("avconv") is not None
 
 
 class AudioProcessor:
-    def __init__(self):
+    def __init__(self, raw_sample_rate: int = 16000, silence_fallback_tone: bool = True):
         self.sample_rate = 16000
         # 帧大小通常由业务逻辑决定，这里保留你的设置
         self.frame_size = 960
+        # 无容器的裸 PCM 数据按此采样率解释
+        self.raw_sample_rate = raw_sample_rate
+        # 过短/无声音频是否替换为测试音；启用服务端 VAD 时应关闭，由 VAD 丢弃静音
+        self.silence_fallback_tone = silence_fallback_tone
+
+    def webm_to_pcm(self, webm_bytes: bytes, content_type: Optional[str] = None) -> tuple:
+        """将 WebM/OGG/MP3/WAV/FLAC/裸PCM 等格式转换为 16kHz 单声道 PCM（先识别格式再解码）"""
+        print(f"DEBUG: 收到音频数据，大小: {len(webm_bytes)} 字节")
+        return self.decode(webm_bytes, detect_format(webm_bytes, content_type))
+
+    def decode(self, data: bytes, audio_format: str) -> tuple:
+        """
+        按已识别的格式直接选择一个解码器，不做逐个尝试
+        返回的 PCM 为 int16 数组的零拷贝 memoryview（len() 为字节数），可直接交给 send_audio
+        """
+        pcm_data, success, _ = self.decode_with_fallback(data, audio_format)
+        return pcm_data, success
+
+    def decode_with_fallback(self, data: bytes, audio_format: str) -> tuple:
+        """
+        与 decode 相同，额外返回替换为测试音的原因：
+        None（未替换）/ "too_short" / "silent"
+        """
+        if audio_format not in DECODABLE_FORMATS:
+            print(f"DEBUG: 不支持的音频格式: {audio_format}")
+            return b"", False, None
 
-    def webm_to_pcm(self, webm_bytes: bytes) -> tuple:
-        """使用 pydub 将 WebM/MP3/WAV 等格式转换为 16kHz 单声道 PCM"""
         try:
-            print(f"DEBUG: 收到音频数据，大小: {len(webm_bytes)} 字节")
-            
-            # 首先尝试直接作为PCM数据处理（最常见的情况）
-            if len(webm_bytes) >= 100:
-                try:
-                    # 尝试将数据作为16-bit PCM直接解析
-                    audio_array = np.frombuffer(webm_bytes[:min(len(webm_bytes), 6400)], dtype=np.int16)
-                    if len(audio_array) > 0:
-                        float_audio = audio_array.astype(np.float32) / 32767.0
-                        # 检查是否为有效的音频信号
-                        max_amp = np.max(np.abs(float_audio))
-                        rms = np.sqrt(np.mean(float_audio ** 2))
-                        
-                        print(f"DEBUG: PCM直接解析 - 最大振幅: {max_amp:.4f}, RMS: {rms:.4f}")
-                        
-                        if max_amp > 0.001 and rms > 0.0001 and len(audio_array) >= 160:
-                            # 有效PCM数据，进行重采样到16kHz
-                            target_len = min(len(audio_array), 16000)  # 1秒的采样点
-                            if len(audio_array) > target_len:
-                                step = len(audio_array) // target_len
-                                resampled = audio_array[::step][:target_len]
-                            else:
-                                resampled = audio_array
-                            
-                            pcm_data = resampled.astype(np.int16).tobytes()
-                            print(f"DEBUG: PCM直接处理成功 - 输出大小: {len(pcm_data)} 字节")
-                            return pcm_data, True
-                except Exception as pcm_error:
-                    print(f"DEBUG: PCM直接解析失败: {pcm_error}")
-
-            # 1. 尝试使用 pydub 加载音频
-            # pydub 的 AudioSegment.from_file 非常强大，能自动识别多种格式
-            try:
-                audio = AudioSegment.from_file(io.BytesIO(webm_bytes))
-            except Exception as e:
-                print(f"DEBUG: pydub 无法直接识别格式: {e}，尝试强制按 webm/ogg 解析")
-                # 针对某些浏览器生成的无头 WebM，尝试指定格式
-                try:
-                    audio = AudioSegment.from_file(io.BytesIO(webm_bytes), format="webm")
-                except:
-                    audio = AudioSegment.from_file(io.BytesIO(webm_bytes), format="ogg")
-
-            # 2. 统一转换为：单声道(1)、16000Hz 采样率
-            audio = audio.set_frame_rate(self.sample_rate).set_channels(1)
-
-            # 3. 提取原始采样数据 (Raw Samples)
-            # pydub 内部存储的是整型，这里直接获取
-            samples = np.array(audio.get_array_of_samples())
-
-            # 4. 数据转换与归一化检查
-            # 如果是 16-bit 音频，samples 的 dtype 会是 int16
-            if audio.sample_width == 2:
-                # 已经是 int16，直接转 bytes
-                pcm_data = samples.astype(np.int16).tobytes()
+            if audio_format == FORMAT_PCM:
+                samples = self._decode_raw_pcm(data)
+            elif audio_format == FORMAT_WAV:
+                samples = self._decode_wav(data)
             else:
-                # 兼容处理：如果是其他位深，先归一化再转 int16
-                float_samples = samples.astype(np.float32) / (2 ** (8 * audio.sample_width - 1))
-                pcm_data = (float_samples * 32767).astype(np.int16).tobytes()
+                samples = self._decode_container(data, audio_format)
+        except Exception as e:
+            print(f"DEBUG: {audio_format} 解码失败: {e}")
+            return b"", False, None
+
+        pcm_data = pcm_memoryview(samples)
+        print(f"DEBUG: {audio_format} 解码成功 - 时长: {len(samples) / self.sample_rate:.2f}s, PCM大小: {len(pcm_data)} 字节")
 
-            print(f"DEBUG: 转换成功 - 时长: {audio.duration_seconds:.2f}s, PCM大小: {len(pcm_data)} 字节")
+        if not self.silence_fallback_tone:
+            return pcm_data, True, None
 
-            # 详细音频质量评估
-            if len(pcm_data) < 320:  # 少于 10ms
-                print(f"DEBUG: 音频太短 ({len(pcm_data)//2} 采样点)，生成测试音频")
-                return self._generate_default_test_audio(), True
+        # 详细音频质量评估
+        if len(pcm_data) < 320:  # 少于 10ms
+            print(f"DEBUG: 音频太短 ({len(pcm_data)//2} 采样点)，生成测试音频")
+            return self._generate_default_test_audio(), True, "too_short"
+        
+        # 检查音频能量（一次遍历，不生成浮点副本）
+        try:
+            peak, rms = pcm_quality(samples)
+            max_amplitude = peak / 32767.0
+            rms_energy = rms / 32767.0
             
-            # 检查音频能量
-            try:
-                audio_array = np.frombuffer(pcm_data, dtype=np.int16)
-                float_audio = audio_array.astype(np.float32) / 32767.0
-                max_amplitude = np.max(np.abs(float_audio))
-                rms_energy = np.sqrt(np.mean(float_audio ** 2))
-                
-                print(f"DEBUG: 音频质量 - 最大振幅: {max_amplitude:.4f}, RMS能量: {rms_energy:.4f}")
+            print(f"DEBUG: 音频质量 - 最大振幅: {max_amplitude:.4f}, RMS能量: {rms_energy:.4f}")
+            
+            # 如果音频几乎无声，可能是无效数据
+            if max_amplitude < 0.01 and rms_energy < 0.001:
+                print("DEBUG: 检测到几乎无声的音频，可能是无效数据，生成测试音频")
+                return self._generate_default_test_audio(), True, "silent"
                 
-                # 如果音频几乎无声，可能是无效数据
-                if max_amplitude < 0.01 and rms_energy < 0.001:
-                    print("DEBUG: 检测到几乎无声的音频，可能是无效数据，生成测试音频")
-                    return self._generate_default_test_audio(), True
-                    
-            except Exception as quality_error:
-                print(f"DEBUG: 音频质量检测失败: {quality_error}")
+        except Exception as quality_error:
+            print(f"DEBUG: 音频质量检测失败: {quality_error}")
 
-            return pcm_data, True
+        return pcm_data, True, None
 
-        except Exception as e:
-            print(f"DEBUG: pydub 转换严重失败: {e}")
-            print("DEBUG: 尝试备用处理方法...")
-            
-            # 备用方法1: 尝试使用librosa
-            try:
-                import librosa
-                print("DEBUG: 尝试使用librosa处理音频")
-                audio_data, sample_rate = librosa.load(io.BytesIO(webm_bytes), sr=self.sample_rate, mono=True)
-                if len(audio_data) >= 160:  # 至少10ms
-                    pcm_data = (audio_data * 32767).astype(np.int16)
-                    print(f"DEBUG: librosa处理成功 - 采样点数: {len(audio_data)}")
-                    return pcm_data.tobytes(), True
-            except Exception as librosa_error:
-                print(f"DEBUG: librosa处理失败: {librosa_error}")
-            
-            # 备用方法2: 基础PCM处理
-            try:
-                print("DEBUG: 尝试基础PCM处理")
-                if len(webm_bytes) >= 100:
-                    # 假设是16-bit PCM数据
-                    audio_array = np.frombuffer(webm_bytes[:min(len(webm_bytes), 3200)], dtype=np.int16)
-                    if len(audio_array) > 0:
-                        float_audio = audio_array.astype(np.float32) / 32767.0
-                        if np.max(np.abs(float_audio)) > 0.001:  # 检查是否有有效音频信号
-                            resampled = float_audio[::max(1, len(float_audio) // 320)][:320]
-                            pcm_data = (resampled * 32767).astype(np.int16)
-                            print(f"DEBUG: 基础PCM处理成功 - 输出大小: {len(pcm_data)*2} 字节")
-                            return pcm_data.tobytes(), True
-            except Exception as pcm_error:
-                print(f"DEBUG: 基础PCM处理失败: {pcm_error}")
-            
-            # 最后的防线：生成测试音频
-            print("DEBUG: 所有方法都失败，生成测试音频")
-            return self._generate_default_test_audio(), True
+    def _decode_raw_pcm(self, data: bytes) -> np.ndarray:
+        """裸 16-bit 单声道 PCM：按 raw_sample_rate 解释并重采样（采样率一致时直接引用上传数据）"""
+        return self._resample_to_target(pcm_view(data), self.raw_sample_rate)
+
+    def _decode_wav(self, data: bytes) -> np.ndarray:
+        """
+        WAV 用标准库解析头部，不启动 ffmpeg
+        采样数据不经 readframes 复制：16-bit 直接引用上传数据，其他位宽/多声道写入预分配的 int16 数组
+        """
+        header = io.BytesIO(data)
+        try:
+            with wave.open(header, "rb") as wav:
+                channels = wav.getnchannels()
+                sample_width = wav.getsampwidth()
+                frame_rate = wav.getframerate()
+                frame_count = wav.getnframes()
+                # 解析完头部后文件位置停在 data 块的起点
+                offset = header.tell()
+        except wave.Error as e:
+            # 浮点/扩展格式的 WAV 交给通用解码器
+            print(f"DEBUG: wave 模块无法解析 ({e})，改用通用解码器")
+            return self._decode_container(data, FORMAT_WAV)
+
+        if sample_width not in (1, 2, 4):
+            return self._decode_container(data, FORMAT_WAV)
+        # 录制中断的文件 data 块可能比头部声明的短
+        count = min(frame_count * channels, (len(data) - offset) // sample_width)
+        if sample_width == 2:
+            samples = pcm_view(data, offset, count)
+        else:
+            # 8-bit WAV 为无符号数
+            samples = widen_into(data, sample_width, offset, count)
+
+        if channels > 1:
+            samples = downmix_into(samples, channels)
+        return self._resample_to_target(samples, frame_rate)
+
+    def _decode_container(self, data: bytes, audio_format: str) -> np.ndarray:
+        """WebM/OGG/MP3/FLAC/MP4 等容器格式：按指定格式解码一次"""
+        if not _ffmpeg_available():
+            # 没有 ffmpeg 时由 librosa(soundfile) 解码
+            print("DEBUG: 未找到 ffmpeg，使用librosa处理音频")
+            librosa = _lazy_import("librosa")
+            audio_data, sample_rate = librosa.load(io.BytesIO(data), sr=None, mono=True)
+            audio_data *= 32767
+            return to_int16(resample(audio_data, sample_rate, self.sample_rate), inplace=True)
+
+        pydub = _lazy_import("pydub")
+        audio = pydub.AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+
+        # 统一转换为单声道，采样率在提取采样后统一重采样
+        audio = audio.set_channels(1)
+
+        # 其他位深先由 pydub 转换为 16-bit
+        if audio.sample_width != 2:
+            audio = audio.set_sample_width(2)
+
+        # 直接引用解码后的原始采样，不经 get_array_of_samples 复制
+        int16_samples = pcm_view(audio.raw_data)
+
+        return self._resample_to_target(int16_samples, audio.frame_rate)
+
+    def _resample_to_target(self, samples: np.ndarray, source_rate: int) -> np.ndarray:
+        """将 int16 采样重采样到目标采样率（多相FIR，滤波器组按采样率对缓存）"""
+        if source_rate != self.sample_rate:
+            print(f"DEBUG: 重采样 {source_rate}Hz → {self.sample_rate}Hz")
+        return resample_int16(samples, source_rate, self.sample_rate)
 
     def _generate_default_test_audio(self) -> bytes:
         """生成 1 秒的测试音 (440Hz 正弦波)"""
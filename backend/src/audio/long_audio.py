@@ -0,0 +1,260 @@
+import asyncio
+import shutil
+import tempfile
+import wave
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
+
+from audio.format_detect import FORMAT_PCM, FORMAT_WAV
+from audio.pcm_buffer import downmix_into, pcm_view, widen_into
+from audio.resampler import PolyphaseResampler, to_int16
+from audio.vad import EnergyVAD
+
+
+# 读取上传文件与 ffmpeg 输出的块大小（字节）
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class LongAudioError(Exception):
+    """长音频无法解码"""
+
+
+class PcmSpool:
+    """
+    解码输出的 16-bit PCM 依次写入临时文件，读取时以 np.memmap 映射
+    常驻内存只取决于正在处理的块，与音频时长无关
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile(prefix="long_audio_", suffix=".pcm", dir=directory or None)
+        self.samples = 0
+        self._map: Optional[np.memmap] = None
+
+    def write(self, samples: np.ndarray):
+        if len(samples) == 0:
+            return
+        self._file.write(np.ascontiguousarray(samples, dtype="<i2").data)
+        self.samples += len(samples)
+
+    def map(self) -> np.ndarray:
+        """只读映射全部采样；没有采样时返回空数组（空文件无法 mmap）"""
+        if self.samples == 0:
+            return np.zeros(0, dtype="<i2")
+        if self._map is None:
+            self._file.flush()
+            self._map = np.memmap(self._file, dtype="<i2", mode="r", shape=(self.samples,))
+        return self._map
+
+    def close(self):
+        self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LongAudioDecoder:
+    """
+    长音频的流式解码：按块读取上传文件，解码为 16kHz 单声道 PCM 写入 PcmSpool
+    - WAV / 裸 PCM 在线程中按块解析、混音、流式重采样，不启动 ffmpeg
+    - 其他容器格式经 ffmpeg 管道边写边读
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        raw_sample_rate: int = 16000,
+        ffmpeg_binary: str = "ffmpeg",
+        block_seconds: float = 1.0,
+    ):
+        self.sample_rate = sample_rate
+        self.raw_sample_rate = raw_sample_rate
+        self.ffmpeg_binary = ffmpeg_binary
+        self.block_seconds = block_seconds
+
+    async def decode(self, source: BinaryIO, audio_format: str, spool: PcmSpool):
+        """把 source（已定位到文件开头）解码写入 spool"""
+        loop = asyncio.get_running_loop()
+        if audio_format == FORMAT_WAV:
+            try:
+                await loop.run_in_executor(None, self._decode_wav, source, spool)
+                return
+            except LongAudioError as e:
+                if spool.samples:
+                    raise
+                # 浮点/扩展格式的 WAV 交给 ffmpeg
+                print(f"DEBUG: wave 模块无法解析 ({e})，改用 ffmpeg")
+                source.seek(0)
+            await self._decode_ffmpeg(source, spool)
+        elif audio_format == FORMAT_PCM:
+            await loop.run_in_executor(None, self._decode_raw, source, spool)
+        else:
+            await self._decode_ffmpeg(source, spool)
+
+    def _decode_wav(self, source: BinaryIO, spool: PcmSpool):
+        try:
+            wav = wave.open(source, "rb")
+        except (wave.Error, EOFError) as e:
+            raise LongAudioError(f"无法解析 WAV 头: {e}")
+        with wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            frame_rate = wav.getframerate()
+            if sample_width not in (1, 2, 4):
+                raise LongAudioError(f"不支持的采样位宽: {sample_width}")
+            resampler = PolyphaseResampler(frame_rate, self.sample_rate)
+            block_frames = max(1, int(frame_rate * self.block_seconds))
+            while True:
+                frames = wav.readframes(block_frames)
+                if not frames:
+                    break
+                if sample_width == 2:
+                    samples = pcm_view(frames)
+                else:
+                    samples = widen_into(frames, sample_width, count=len(frames) // sample_width)
+                if channels > 1:
+                    samples = downmix_into(samples, channels)
+                self._write_resampled(resampler, samples, spool)
+            self._flush_resampler(resampler, spool)
+
+    def _decode_raw(self, source: BinaryIO, spool: PcmSpool):
+        resampler = PolyphaseResampler(self.raw_sample_rate, self.sample_rate)
+        block_bytes = max(2, int(self.raw_sample_rate * self.block_seconds) * 2)
+        carry = b""
+        while True:
+            data = source.read(block_bytes)
+            if not data:
+                break
+            data = carry + data
+            usable = len(data) - len(data) % 2
+            carry = data[usable:]
+            self._write_resampled(resampler, pcm_view(data, count=usable // 2), spool)
+        self._flush_resampler(resampler, spool)
+
+    def _write_resampled(self, resampler: PolyphaseResampler, samples: np.ndarray, spool: PcmSpool):
+        if resampler.src_rate == resampler.dst_rate:
+            spool.write(samples)
+        else:
+            spool.write(to_int16(resampler.process(samples), inplace=True))
+
+    def _flush_resampler(self, resampler: PolyphaseResampler, spool: PcmSpool):
+        if resampler.src_rate != resampler.dst_rate:
+            spool.write(to_int16(resampler.flush(), inplace=True))
+
+    async def _decode_ffmpeg(self, source: BinaryIO, spool: PcmSpool):
+        binary = shutil.which(self.ffmpeg_binary)
+        if binary is None:
+            raise LongAudioError(f"找不到 ffmpeg: {self.ffmpeg_binary}")
+        loop = asyncio.get_running_loop()
+        proc = await asyncio.create_subprocess_exec(
+            binary,
+            "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", "1", "-ar", str(self.sample_rate),
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+        async def _feed():
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(None, source.read, READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+
+        feeder = asyncio.create_task(_feed())
+        carry = b""
+        try:
+            while True:
+                data = await proc.stdout.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                data = carry + data
+                usable = len(data) - len(data) % 2
+                carry = data[usable:]
+                spool.write(pcm_view(data, count=usable // 2))
+            await feeder
+            if await proc.wait() != 0:
+                raise LongAudioError(f"ffmpeg 解码失败 (exit {proc.returncode})")
+        finally:
+            feeder.cancel()
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+
+def plan_segments(
+    samples: np.ndarray,
+    vad: EnergyVAD,
+    sample_rate: int = 16000,
+    target_seconds: float = 10.0,
+    max_seconds: float = 15.0,
+    min_gap_seconds: float = 0.3,
+    block_frames: int = 1024,
+) -> List[Tuple[int, int]]:
+    """
+    按静音边界把整段 PCM 切分为上游友好的片段，返回 [起始采样, 结束采样) 列表
+    - 逐块计算帧能量，只保留每帧一个能量值，不整段复制采样
+    - 长于 min_gap_seconds 的静音视为语句边界，相邻语句合并到不超过 target_seconds
+    - 单句超过 max_seconds 时在后半段能量最低的帧处切开
+    - 整段静音的部分不产生片段
+    """
+    frame_size = vad.frame_size
+    total = len(samples)
+    if total == 0:
+        return []
+    step = block_frames * frame_size
+    energy = np.concatenate([vad.frame_energy(samples[start:start + step]) for start in range(0, total, step)])
+    active, _ = vad.apply_hangover(vad.is_speech(energy))
+
+    # 活动帧的连续区间
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return []
+
+    frame_seconds = frame_size / sample_rate
+    min_gap = max(1, int(round(min_gap_seconds / frame_seconds)))
+    target = max(1, int(target_seconds / frame_seconds))
+    max_frames = max(target, int(max_seconds / frame_seconds))
+
+    # 间隔短于 min_gap 的区间属于同一句
+    utterances: List[List[int]] = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if utterances and start - utterances[-1][1] < min_gap:
+            utterances[-1][1] = end
+        else:
+            utterances.append([start, end])
+
+    # 相邻语句合并到不超过 target
+    packed: List[List[int]] = []
+    for start, end in utterances:
+        if packed and end - packed[-1][0] <= target:
+            packed[-1][1] = end
+        else:
+            packed.append([start, end])
+
+    segments: List[Tuple[int, int]] = []
+    for start, end in packed:
+        start = max(0, start - vad.padding_frames)
+        while end - start > max_frames:
+            window = energy[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+    return [(start * frame_size, min(end * frame_size, total)) for start, end in segments]
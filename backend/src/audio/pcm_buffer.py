@@ -0,0 +1,87 @@
+import math
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+
+# 字节类 PCM 数据：bytes，或指向 int16 数组的零拷贝 memoryview
+PcmData = Union[bytes, bytearray, memoryview]
+
+# 质量统计的分块大小（采样点），临时缓冲只占一块的 int32
+QUALITY_BLOCK = 4096
+
+
+def pcm_view(data: PcmData, offset: int = 0, count: Optional[int] = None) -> np.ndarray:
+    """把字节类数据零拷贝地解释为 16-bit 小端采样，忽略末尾不完整的字节"""
+    available = (memoryview(data).nbytes - offset) // 2
+    if count is None or count > available:
+        count = max(0, available)
+    return np.frombuffer(data, dtype="<i2", count=count, offset=offset)
+
+
+def pcm_memoryview(samples: np.ndarray) -> memoryview:
+    """
+    int16 采样的零拷贝字节视图
+    可直接用于 websocket 发送、哈希与写入共享内存，len() 为字节数
+    """
+    samples = np.ascontiguousarray(samples, dtype=np.int16)
+    return memoryview(samples).cast("B")
+
+
+def pcm_quality(samples: np.ndarray, block: int = QUALITY_BLOCK) -> Tuple[int, float]:
+    """
+    一次遍历计算峰值与 RMS（int16 量纲）
+    平方按块写入复用的 int32 缓冲（int16 的平方不会溢出），不生成整段的浮点副本
+    """
+    total_samples = len(samples)
+    if total_samples == 0:
+        return 0, 0.0
+    scratch = np.empty(min(block, total_samples), dtype=np.int32)
+    peak = 0
+    square_sum = 0
+    for start in range(0, total_samples, block):
+        chunk = samples[start:start + block]
+        squares = scratch[:len(chunk)]
+        np.multiply(chunk, chunk, out=squares, dtype=np.int32)
+        square_sum += int(squares.sum(dtype=np.int64))
+        peak = max(peak, int(chunk.max()), -int(chunk.min()))
+    return peak, math.sqrt(square_sum / total_samples)
+
+
+def downmix_into(frames: np.ndarray, channels: int, out: Optional[np.ndarray] = None,
+                 block: int = QUALITY_BLOCK) -> np.ndarray:
+    """交错多声道 int16 采样取平均写入预分配的单声道数组"""
+    usable = len(frames) - len(frames) % channels
+    interleaved = frames[:usable].reshape(-1, channels)
+    if out is None:
+        out = np.empty(len(interleaved), dtype=np.int16)
+    # 按块用 int32 累加避免溢出，临时缓冲只占一块
+    scratch = np.empty(min(block, len(interleaved)), dtype=np.int32)
+    for start in range(0, len(interleaved), block):
+        chunk = interleaved[start:start + block]
+        mixed = scratch[:len(chunk)]
+        np.sum(chunk, axis=1, dtype=np.int32, out=mixed)
+        np.floor_divide(mixed, channels, out=mixed)
+        np.copyto(out[start:start + len(chunk)], mixed, casting="unsafe")
+    return out
+
+
+def widen_into(frames: PcmData, sample_width: int, offset: int = 0, count: Optional[int] = None,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+    """8-bit（无符号）或 32-bit 采样转换为 int16，写入预分配数组"""
+    if sample_width == 1:
+        source = np.frombuffer(frames, dtype=np.uint8, offset=offset,
+                               count=-1 if count is None else count)
+        if out is None:
+            out = np.empty(len(source), dtype=np.int16)
+        np.subtract(source, 128, out=out, dtype=np.int16, casting="unsafe")
+        np.left_shift(out, 8, out=out)
+        return out
+    if sample_width == 4:
+        source = np.frombuffer(frames, dtype="<i4", offset=offset,
+                               count=-1 if count is None else count)
+        if out is None:
+            out = np.empty(len(source), dtype=np.int16)
+        np.right_shift(source, 16, out=out, casting="unsafe")
+        return out
+    raise ValueError(f"不支持的采样位宽: {sample_width}")
@@ -0,0 +1,166 @@
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 每个相位的过零点数（越大过渡带越陡，计算量越大）
+ZERO_CROSSINGS = 16
+# 截止频率相对目标奈奎斯特频率的比例，留出过渡带
+ROLLOFF = 0.94
+KAISER_BETA = 8.6
+
+
+@lru_cache(maxsize=32)
+def design_filter_bank(src_rate: int, dst_rate: int) -> Tuple[int, int, np.ndarray, int]:
+    """
+    设计多相滤波器组（按 (src_rate, dst_rate) 缓存）
+    返回 (up, down, bank, delay)：
+    - bank[p, k] = h[p + k * up]，形状为 (up, 每相抽头数)
+    - delay 为原型滤波器在上采样域的群延迟
+    """
+    if src_rate <= 0 or dst_rate <= 0:
+        raise ValueError(f"无效的采样率: {src_rate} -> {dst_rate}")
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+
+    # 原型低通滤波器运行在 src_rate * up 的上采样域
+    factor = max(up, down)
+    cutoff = 0.5 * ROLLOFF / factor
+    half_length = ZERO_CROSSINGS * factor
+    n = np.arange(-half_length, half_length + 1, dtype=np.float64)
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(len(n), KAISER_BETA)
+    # 直流增益归一化为 up，补偿插零带来的幅度损失
+    h *= up / h.sum()
+
+    taps = -(-len(h) // up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[:len(h)] = h
+    bank = padded.reshape(taps, up).T.astype(np.float32)
+    bank.setflags(write=False)
+    return up, down, bank, half_length
+
+
+class PolyphaseResampler:
+    """
+    向量化多相 FIR 重采样器
+    - 滤波器组按采样率对缓存，多个实例共享
+    - 流式模式：process() 可连续调用，滤波器状态跨分片保留，flush() 输出尾部
+    - 输出与输入时间对齐（已补偿滤波器延迟）
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up, self.down, self.bank, self.delay = design_filter_bank(src_rate, dst_rate)
+        self.taps = self.bank.shape[1]
+        # 窗口按时间正序排列，滤波器系数相应反转
+        self._reversed_bank = np.ascontiguousarray(self.bank[:, ::-1])
+        self.reset()
+
+    def reset(self):
+        """清空流式状态"""
+        # 缓冲区前置 taps-1 个零作为历史，_base 为缓冲区首个采样点的绝对序号
+        self._buffer = np.zeros(self.taps - 1, dtype=np.float32)
+        self._base = -(self.taps - 1)
+        # 下一个输出点在上采样域中的位置（含延迟补偿）
+        self._position = self.delay
+        self._samples_in = 0
+        self._samples_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """输入一个分片，返回可以确定的输出采样（float32）"""
+        samples = np.asarray(samples)
+        if samples.size == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.up == self.down:
+            self._samples_in += samples.size
+            self._samples_out += samples.size
+            return samples.astype(np.float32, copy=False)
+
+        # 历史与新分片直接写入同一块新缓冲，输入在赋值时转换为 float32，不生成中间副本
+        buffer = np.empty(len(self._buffer) + samples.size, dtype=np.float32)
+        buffer[:len(self._buffer)] = self._buffer
+        buffer[len(self._buffer):] = samples
+        self._buffer = buffer
+        self._samples_in += samples.size
+        return self._drain(limit=None)
+
+    def flush(self) -> np.ndarray:
+        """结束流，输出剩余采样，使总输出长度为 ceil(输入长度 * dst / src)"""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        expected = -(-self._samples_in * self.up // self.down)
+        remaining = expected - self._samples_out
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        # 补零直至可以计算出全部剩余输出
+        last_position = self._position + (remaining - 1) * self.down
+        needed = last_position // self.up + 1 - (self._base + len(self._buffer))
+        if needed > 0:
+            self._buffer = np.concatenate((self._buffer, np.zeros(needed, dtype=np.float32)))
+        return self._drain(limit=remaining)
+
+    def _drain(self, limit) -> np.ndarray:
+        available_end = self._base + len(self._buffer)  # 绝对序号（不含）
+        # 满足 position // up < available_end 的输出点数
+        count = (available_end * self.up - 1 - self._position) // self.down + 1
+        count = max(0, count)
+        if limit is not None:
+            count = min(count, limit)
+        if count == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        # 同一相位的输出点以 up 为周期出现，其输入窗口起点间隔为 down，
+        # 可直接在滑动窗口视图上做跨步切片 + 矩阵向量乘，无需逐点收集
+        output = np.empty(count, dtype=np.float32)
+        windows = sliding_window_view(self._buffer, self.taps)
+        for residue in range(min(self.up, count)):
+            position = self._position + residue * self.down
+            phase = position % self.up
+            start = position // self.up - self._base - (self.taps - 1)
+            n = len(range(residue, count, self.up))
+            frames = windows[start:start + (n - 1) * self.down + 1:self.down]
+            output[residue::self.up] = frames @ self._reversed_bank[phase]
+        self._position += count * self.down
+        self._samples_out += count
+
+        # 只保留下一个输出点所需的历史
+        keep_from = self._position // self.up - (self.taps - 1) - self._base
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._base += keep_from
+        return output
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """一次性重采样，返回 float32，输出长度为 ceil(len * dst / src)"""
+    if src_rate == dst_rate:
+        return np.asarray(samples).astype(np.float32, copy=False)
+    resampler = PolyphaseResampler(src_rate, dst_rate)
+    head = resampler.process(samples)
+    tail = resampler.flush()
+    return np.concatenate((head, tail)) if tail.size else head
+
+
+def to_int16(samples: np.ndarray, inplace: bool = False) -> np.ndarray:
+    """
+    float32 采样（int16 量纲）四舍五入并限幅为 int16
+    inplace=True 时在输入数组上完成取整与限幅（输入为临时数组时使用），只分配输出
+    """
+    work = samples if inplace else np.rint(samples)
+    if inplace:
+        np.rint(work, out=work)
+    np.clip(work, -32768, 32767, out=work)
+    out = np.empty(work.shape, dtype=np.int16)
+    np.copyto(out, work, casting="unsafe")
+    return out
+
+
+def resample_int16(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """int16 采样重采样为 int16；采样率相同时原样返回（不复制）"""
+    if src_rate == dst_rate:
+        return np.asarray(samples, dtype=np.int16)
+    return to_int16(resample(samples, src_rate, dst_rate), inplace=True)
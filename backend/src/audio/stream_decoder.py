@@ -0,0 +1,287 @@
+import asyncio
+import shutil
+import time
+from typing import Dict, Optional
+
+
+class StreamDecoderError(Exception):
+    """流式解码器不可用或已失效"""
+
+
+class StreamingWebmDecoder:
+    """
+    单个录音会话的增量解码器
+    - 会话内保持一个 ffmpeg 进程，按顺序写入 MediaRecorder 分片
+    - 只有首个分片带 EBML 头，后续分片作为同一字节流的延续被正确解码
+    - 每次 feed 只返回新解码出的 16kHz 单声道 PCM
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        sample_rate: int = 16000,
+        input_format: str = "webm",
+        ffmpeg_binary: str = "ffmpeg",
+    ):
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.input_format = input_format
+        self.ffmpeg_binary = ffmpeg_binary
+        self.next_index = 0
+        self.last_activity_time = time.monotonic()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._buffer = bytearray()
+        self._data_event = asyncio.Event()
+        # 保证同一会话的分片按顺序写入
+        self.order = asyncio.Condition()
+
+    async def start(self):
+        """启动常驻 ffmpeg 进程"""
+        if self._proc is not None:
+            return
+        binary = shutil.which(self.ffmpeg_binary)
+        if binary is None:
+            raise StreamDecoderError(f"找不到 ffmpeg: {self.ffmpeg_binary}")
+
+        # 关闭探测缓冲，数据到达即解码输出
+        self._proc = await asyncio.create_subprocess_exec(
+            binary,
+            "-hide_banner", "-loglevel", "error",
+            "-fflags", "nobuffer", "-probesize", "4096", "-analyzeduration", "0",
+            "-f", self.input_format, "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", "1", "-ar", str(self.sample_rate),
+            "-flush_packets", "1",
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+        print(f"DEBUG: 会话 {self.session_id} 流式解码器已启动 (pid={self._proc.pid})")
+
+    async def _read_loop(self):
+        while True:
+            data = await self._proc.stdout.read(8192)
+            if not data:
+                break
+            self._buffer.extend(data)
+            self._data_event.set()
+        self._data_event.set()
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def feed(self, chunk: bytes, settle: float = 0.05, max_wait: float = 0.5) -> bytes:
+        """
+        写入一个分片并返回新解码出的 PCM
+        等待输出，直到连续 settle 秒无新数据或总等待超过 max_wait
+        """
+        if not self.is_alive():
+            raise StreamDecoderError(f"会话 {self.session_id} 的解码器已退出")
+
+        self.last_activity_time = time.monotonic()
+        self.bytes_in += len(chunk)
+        try:
+            self._proc.stdin.write(chunk)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise StreamDecoderError(f"写入解码器失败: {e}")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+        seen = len(self._buffer)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._reader_task.done():
+                break
+            # 还没有输出时等到截止时间，有输出后只等待 settle
+            wait = remaining if seen == 0 else min(settle, remaining)
+            self._data_event.clear()
+            try:
+                await asyncio.wait_for(self._data_event.wait(), wait)
+            except asyncio.TimeoutError:
+                if seen:
+                    break
+            if len(self._buffer) == seen and seen:
+                break
+            seen = len(self._buffer)
+
+        return self._take()
+
+    async def finish(self, timeout: float = 2.0) -> bytes:
+        """结束输入流，返回解码器中剩余的 PCM"""
+        if self._proc is None:
+            return b""
+        try:
+            if self._proc.stdin and not self._proc.stdin.is_closing():
+                self._proc.stdin.close()
+            await asyncio.wait_for(self._reader_task, timeout)
+        except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+            pass
+        remaining = self._take()
+        await self.close()
+        return remaining
+
+    def _take(self) -> bytes:
+        # 保证按采样点对齐（16-bit）
+        usable = len(self._buffer) - (len(self._buffer) % 2)
+        pcm = bytes(self._buffer[:usable])
+        del self._buffer[:usable]
+        self.bytes_out += len(pcm)
+        return pcm
+
+    async def close(self):
+        """终止 ffmpeg 进程"""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+        print(f"DEBUG: 会话 {self.session_id} 流式解码器已关闭 (输入 {self.bytes_in} 字节, 输出 {self.bytes_out} 字节)")
+
+
+class StreamDecoderRegistry:
+    """
+    会话级流式解码器管理
+    - 按 session_id 复用解码器
+    - 分片按 chunk_index 顺序写入，乱序到达时短暂等待前序分片；
+      等待超时后跳过缺失的分片，之后迟到的分片直接丢弃（乱序写入会破坏 WebM 字节流）
+    - 回收长时间无活动的会话
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        max_sessions: int = 64,
+        idle_timeout: float = 30.0,
+        ffmpeg_binary: str = "ffmpeg",
+        order_timeout: float = 2.0,
+    ):
+        self.sample_rate = sample_rate
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.ffmpeg_binary = ffmpeg_binary
+        self.order_timeout = order_timeout
+        self._sessions: Dict[str, StreamingWebmDecoder] = {}
+        self._create_lock = asyncio.Lock()
+        self._reaper_task: Optional[asyncio.Task] = None
+        # 迟到而被丢弃的分片数
+        self.dropped_chunks = 0
+
+    def available(self) -> bool:
+        """ffmpeg 是否可用"""
+        return shutil.which(self.ffmpeg_binary) is not None
+
+    async def start(self):
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def _get_or_create(self, session_id: str, input_format: str) -> StreamingWebmDecoder:
+        async with self._create_lock:
+            decoder = self._sessions.get(session_id)
+            if decoder is not None and decoder.is_alive():
+                return decoder
+            if decoder is not None:
+                await self.close_session(session_id)
+
+            if len(self._sessions) >= self.max_sessions:
+                await self._evict_oldest()
+
+            decoder = StreamingWebmDecoder(
+                session_id,
+                sample_rate=self.sample_rate,
+                input_format=input_format,
+                ffmpeg_binary=self.ffmpeg_binary,
+            )
+            await decoder.start()
+            self._sessions[session_id] = decoder
+            return decoder
+
+    async def decode_chunk(
+        self,
+        session_id: str,
+        chunk: bytes,
+        chunk_index: Optional[int] = None,
+        final: bool = False,
+        input_format: str = "webm",
+    ) -> bytes:
+        """
+        解码会话中的一个分片，返回新增 PCM；final=True 时结束会话
+        input_format 只在会话首个分片创建解码器时生效
+        chunk_index 小于已写入位置的分片（等待超时后才到达）不再写入，返回空 PCM
+        """
+        decoder = await self._get_or_create(session_id, input_format)
+
+        async with decoder.order:
+            if chunk_index is not None and chunk_index > decoder.next_index:
+                try:
+                    await asyncio.wait_for(
+                        decoder.order.wait_for(lambda: decoder.next_index >= chunk_index),
+                        self.order_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    print(f"DEBUG: 会话 {session_id} 等待分片 {decoder.next_index} 超时，继续处理 {chunk_index}")
+
+            stale = chunk_index is not None and chunk_index < decoder.next_index
+            if stale:
+                self.dropped_chunks += 1
+                print(f"DEBUG: 会话 {session_id} 分片 {chunk_index} 迟到（已写入至 {decoder.next_index - 1}），丢弃")
+            try:
+                pcm = b"" if stale else await decoder.feed(chunk)
+                if final:
+                    pcm += await decoder.finish()
+            finally:
+                if chunk_index is not None:
+                    decoder.next_index = max(decoder.next_index, chunk_index + 1)
+                else:
+                    decoder.next_index += 1
+                decoder.order.notify_all()
+
+        if final:
+            self._sessions.pop(session_id, None)
+        return pcm
+
+    async def close_session(self, session_id: str):
+        decoder = self._sessions.pop(session_id, None)
+        if decoder is not None:
+            await decoder.close()
+
+    async def _evict_oldest(self):
+        oldest = min(self._sessions.values(), key=lambda d: d.last_activity_time)
+        print(f"DEBUG: 流式解码会话已满，回收会话 {oldest.session_id}")
+        await self.close_session(oldest.session_id)
+
+    async def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for session_id, decoder in list(self._sessions.items()):
+                if now - decoder.last_activity_time > self.idle_timeout or not decoder.is_alive():
+                    await self.close_session(session_id)
+
+    async def close(self):
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        for session_id in list(self._sessions):
+            await self.close_session(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "ffmpeg_available": self.available(),
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "dropped_chunks": self.dropped_chunks,
+        }
@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    基于帧能量的语音活动检测（向量化）
+    - 按 frame_size 分帧，帧 RMS（dBFS）高于阈值视为语音帧
+    - 语音结束后保留 hangover_frames 帧，避免截断尾音
+    - 语音起点前保留 padding_frames 帧，避免截断起音
+    """
+
+    def __init__(
+        self,
+        frame_size: int = 960,
+        threshold_db: float = -40.0,
+        hangover_frames: int = 3,
+        padding_frames: int = 1,
+    ):
+        self.frame_size = frame_size
+        self.threshold_db = threshold_db
+        self.hangover_frames = hangover_frames
+        self.padding_frames = padding_frames
+        # 阈值换算为帧内平方和，避免逐帧开方/取对数
+        self._energy_threshold = (32768.0 * 10 ** (threshold_db / 20)) ** 2 * frame_size
+
+    def frame_energy(self, samples: np.ndarray) -> np.ndarray:
+        """每帧的平方和（最后一个不完整帧补零）"""
+        n_frames = -(-len(samples) // self.frame_size)
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float64)
+        padded = np.zeros(n_frames * self.frame_size, dtype=np.float32)
+        padded[:len(samples)] = samples
+        frames = padded.reshape(n_frames, self.frame_size)
+        return np.einsum("ij,ij->i", frames, frames, dtype=np.float64)
+
+    def speech_frames(self, samples: np.ndarray) -> np.ndarray:
+        """每帧是否超过能量阈值"""
+        return self.is_speech(self.frame_energy(samples))
+
+    def is_speech(self, energy: np.ndarray) -> np.ndarray:
+        """由帧能量（frame_energy 的结果）判断每帧是否为语音"""
+        return energy > self._energy_threshold
+
+    def apply_hangover(self, speech: np.ndarray, carried: int = 0) -> Tuple[np.ndarray, int]:
+        """
+        语音帧之后的 hangover_frames 帧仍视为活动帧
+        carried 为上一分片末尾剩余的 hangover 帧数，返回 (活动帧, 本分片末尾剩余帧数)
+        """
+        n = len(speech)
+        if n == 0:
+            return speech, carried
+        indices = np.arange(n)
+        # 每帧距最近一次语音帧的帧数（之前没有语音帧时视为无穷远）
+        last_speech = np.where(speech, indices, -1)
+        last_speech = np.maximum.accumulate(last_speech)
+        since = np.where(last_speech >= 0, indices - last_speech, np.iinfo(np.int64).max)
+        active = since <= self.hangover_frames
+        # 上一分片遗留的 hangover 覆盖本分片开头
+        if carried > 0:
+            active[:min(carried, n)] = True
+
+        remaining = max(0, carried - n)
+        if speech.any():
+            remaining = max(remaining, self.hangover_frames - int(since[-1]))
+        return active, remaining
+
+    def active_bounds(self, active: np.ndarray, keep_leading: bool) -> Optional[Tuple[int, int]]:
+        """活动区间 [起始帧, 结束帧)，无活动帧时返回 None"""
+        active_indices = np.flatnonzero(active)
+        if active_indices.size == 0:
+            return None
+        first = 0 if keep_leading else max(0, int(active_indices[0]) - self.padding_frames)
+        last = int(active_indices[-1]) + 1
+        return first, last
+
+    def trim(self, samples: np.ndarray) -> np.ndarray:
+        """去掉首尾静音；整段静音返回空数组"""
+        active, _ = self.apply_hangover(self.speech_frames(samples))
+        bounds = self.active_bounds(active, keep_leading=False)
+        if bounds is None:
+            return samples[:0]
+        first, last = bounds
+        return samples[first * self.frame_size:last * self.frame_size]
+
+
+class StreamingVAD:
+    """
+    单个会话的流式 VAD
+    - hangover 状态跨分片保留：上一分片以语音结尾时，本分片开头不裁剪
+    """
+
+    def __init__(self, vad: EnergyVAD):
+        self.vad = vad
+        self.hangover_left = 0
+        self.in_speech = False
+        self.last_activity_time = time.monotonic()
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """返回本分片中需要发送的部分；整段静音返回空数组"""
+        self.last_activity_time = time.monotonic()
+        speech = self.vad.speech_frames(samples)
+        active, self.hangover_left = self.vad.apply_hangover(speech, self.hangover_left)
+        bounds = self.vad.active_bounds(active, keep_leading=self.in_speech)
+        self.in_speech = bool(active[-1]) if len(active) else self.in_speech
+        if bounds is None:
+            return samples[:0]
+        first, last = bounds
+        return samples[first * self.vad.frame_size:last * self.vad.frame_size]
+
+
+class VadSessions:
+    """按会话保存流式 VAD 状态（LRU + 空闲超时）"""
+
+    def __init__(self, vad: EnergyVAD, max_sessions: int = 1024, idle_timeout: float = 60.0):
+        self.vad = vad
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, StreamingVAD]" = OrderedDict()
+
+    def get(self, session_id: str) -> StreamingVAD:
+        now = time.monotonic()
+        # 顺带清理超时会话（最久未使用的在前）
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_activity_time <= self.idle_timeout and len(self._sessions) < self.max_sessions:
+                break
+            self._sessions.pop(oldest_id)
+
+        state = self._sessions.pop(session_id, None) or StreamingVAD(self.vad)
+        self._sessions[session_id] = state
+        return state
+
+    def drop(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class VadStats:
+    """VAD 裁剪统计"""
+
+    def __init__(self):
+        self.samples_in = 0
+        self.samples_out = 0
+        self.chunks_in = 0
+        self.chunks_dropped = 0
+
+    def record(self, samples_in: int, samples_out: int):
+        self.chunks_in += 1
+        self.samples_in += samples_in
+        self.samples_out += samples_out
+        if samples_out == 0:
+            self.chunks_dropped += 1
+
+    def trimmed_percent(self) -> float:
+        if self.samples_in == 0:
+            return 0.0
+        return 100.0 * (self.samples_in - self.samples_out) / self.samples_in
+
+    def stats(self) -> dict:
+        return {
+            "chunks_in": self.chunks_in,
+            "chunks_dropped": self.chunks_dropped,
+            "samples_in": self.samples_in,
+            "samples_out": self.samples_out,
+            "trimmed_percent": round(self.trimmed_percent(), 2),
+        }
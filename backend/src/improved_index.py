@@ -1,74 +1,224 @@
 import asyncio
 import sys
 import os
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-import uvicorn
+from contextlib import AsyncExitStack, asynccontextmanager
 import traceback
-from typing import Optional
+import json
+import math
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
 
 # 确保路径正确
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# 导入改进的模块
-from audio.improved_converter import AudioProcessor
-from adapter.improved_makawai_adapter import MakawaiClient
+# 启动耗时报告：先逐个计时导入重量级依赖，之后的 import 语句直接命中模块缓存
+from service.startup import StartupReport
+startup_report = StartupReport()
+for _module in ("numpy", "fastapi", "uvicorn", "websockets"):
+    startup_report.timed_import(_module)
 
-# 全局实例
-makawai_client: Optional[MakawaiClient] = None
-audio_processor = AudioProcessor()
-_request_lock: Optional[asyncio.Lock] = None
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+import uvicorn
 
-def get_request_lock():
-    """获取请求锁"""
-    global _request_lock
-    if _request_lock is None:
-        _request_lock = asyncio.Lock()
-    return _request_lock
+# 导入改进的模块
+from audio.improved_converter import AudioProcessor, lazy_import_times
+from audio.decode_executor import DecodeExecutor, DecodeQueueFullError
+from audio.stream_decoder import StreamDecoderError, StreamDecoderRegistry
+from audio.resampler import PolyphaseResampler, to_int16
+from audio.pcm_buffer import PcmData, pcm_memoryview, pcm_view
+from audio.vad import EnergyVAD, VadSessions, VadStats
+from audio.long_audio import LongAudioDecoder, LongAudioError, PcmSpool, plan_segments
+from audio.format_detect import (
+    DECODABLE_FORMATS, FORMAT_OGG, FORMAT_UNKNOWN, FORMAT_WEBM, FORMAT_WEBM_CONTINUATION,
+    FormatStats, detect_format,
+)
+from service.result_cache import TranslationResultCache
+from service.audio_store import AudioNotFoundError, ResultAudioStore, UnsupportedTranscodeError
+from service import metrics
+from service.profiler import OnDemandProfiler, ProfilerBusyError
+from service.worker_cluster import WorkerCluster, default_cluster_dir
+from service.chunk_duration import ChunkDurationController
+from service.admission import AdmissionController, AdmissionRejectedError, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from adapter.circuit_breaker import CircuitBreaker, CircuitOpenError
+from adapter.connection_pool import MakawaiConnectionPool, PoolConnectError, PoolTimeoutError, UnsupportedLanguageError
+from adapter.improved_makawai_adapter import ImprovedMakawaiClient
+from adapter.pipelined_client import make_pipelined_factory
+from adapter.supervisor import ConnectionSupervisor
+from config import service_config
+startup_report.mark("imports")
+
+# 全局实例（多 worker 模式下每个 worker 进程各自持有一份）
+worker_cluster = WorkerCluster(
+    workers=service_config.SERVICE_WORKERS,
+    directory=service_config.WORKER_SHARED_DIR or default_cluster_dir(service_config.SERVICE_PORT),
+    publish_interval=service_config.WORKER_PUBLISH_INTERVAL,
+)
+# 启用 VAD 时静音由 VAD 丢弃，不再替换为测试音
+_processor_options = {
+    "raw_sample_rate": service_config.RAW_PCM_SAMPLE_RATE,
+    "silence_fallback_tone": not service_config.VAD_ENABLED,
+}
+audio_processor = AudioProcessor(**_processor_options)
+format_stats = FormatStats()
+# 可由会话级流式解码器处理的格式
+_STREAMABLE_FORMATS = (FORMAT_WEBM, FORMAT_WEBM_CONTINUATION, FORMAT_OGG)
+# 指标的语言标签只保留支持的语言，其余记为 "other"
+metrics.set_known_languages(service_config.SUPPORTED_LANGUAGES)
+connection_pool = MakawaiConnectionPool(
+    min_size=service_config.POOL_MIN_SIZE,
+    max_size=service_config.POOL_MAX_SIZE,
+    idle_timeout=service_config.POOL_IDLE_TIMEOUT,
+    acquire_timeout=service_config.POOL_ACQUIRE_TIMEOUT,
+    client_factory=(
+        make_pipelined_factory(service_config.UPSTREAM_PIPELINE_DEPTH, service_config.UPSTREAM_CORRELATION_FIELD or None)
+        if service_config.UPSTREAM_PIPELINE_DEPTH > 1 else ImprovedMakawaiClient
+    ),
+    pipeline_depth=service_config.UPSTREAM_PIPELINE_DEPTH,
+    breaker=CircuitBreaker(
+        failure_threshold=service_config.BREAKER_FAILURE_THRESHOLD,
+        base_backoff=service_config.BREAKER_BASE_BACKOFF,
+        max_backoff=service_config.BREAKER_MAX_BACKOFF,
+        jitter=service_config.BREAKER_JITTER,
+    ),
+    languages=service_config.SUPPORTED_LANGUAGES,
+)
+connection_supervisor = ConnectionSupervisor(
+    connection_pool,
+    interval=service_config.KEEPALIVE_INTERVAL,
+    ping_timeout=service_config.KEEPALIVE_TIMEOUT,
+    max_failures=service_config.KEEPALIVE_MAX_FAILURES,
+)
+decode_executor = DecodeExecutor(
+    mode=service_config.DECODE_EXECUTOR,
+    workers=service_config.DECODE_WORKERS or None,
+    queue_depth=service_config.DECODE_QUEUE_DEPTH,
+    processor_options=_processor_options,
+)
+stream_decoders = StreamDecoderRegistry(
+    sample_rate=audio_processor.sample_rate,
+    max_sessions=service_config.STREAM_DECODER_MAX_SESSIONS,
+    idle_timeout=service_config.STREAM_DECODER_IDLE_TIMEOUT,
+    ffmpeg_binary=service_config.FFMPEG_BINARY,
+)
+voice_detector = EnergyVAD(
+    frame_size=audio_processor.frame_size,
+    threshold_db=service_config.VAD_THRESHOLD_DB,
+    hangover_frames=service_config.VAD_HANGOVER_FRAMES,
+)
+vad_sessions = VadSessions(voice_detector, idle_timeout=service_config.STREAM_DECODER_IDLE_TIMEOUT * 2)
+vad_stats = VadStats()
+result_cache = TranslationResultCache(
+    max_entries=service_config.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=service_config.RESULT_CACHE_MAX_BYTES,
+    ttl=service_config.RESULT_CACHE_TTL,
+    persist_path=service_config.RESULT_CACHE_PATH,
+)
+audio_store = ResultAudioStore(
+    ttl=service_config.RESULT_AUDIO_TTL,
+    max_entries=service_config.RESULT_AUDIO_MAX_ENTRIES,
+    max_bytes=service_config.RESULT_AUDIO_MAX_BYTES,
+    pcm_sample_rate=service_config.RESULT_AUDIO_SAMPLE_RATE,
+    # 音频可能被其他 worker 取走，多 worker 模式下写入共享目录
+    shared_dir=os.path.join(worker_cluster.directory, "audio") if worker_cluster.enabled else None,
+)
+admission = AdmissionController(
+    max_active=service_config.ADMISSION_MAX_ACTIVE,
+    max_queue=service_config.ADMISSION_MAX_QUEUE,
+    max_queue_per_client=service_config.ADMISSION_MAX_QUEUE_PER_CLIENT,
+    max_wait=service_config.ADMISSION_MAX_WAIT,
+    bulk_max_wait=service_config.ADMISSION_BULK_MAX_WAIT,
+    bulk_max_queue=service_config.ADMISSION_BULK_MAX_QUEUE,
+    interactive_weight=service_config.SCHEDULER_INTERACTIVE_WEIGHT,
+    bulk_weight=service_config.SCHEDULER_BULK_WEIGHT,
+)
+profiler = OnDemandProfiler(interval=service_config.PROFILER_INTERVAL)
+# 按近期解码、排队与上游耗时推荐录音分片时长，随每个 /api/translate 响应返回
+chunk_controller = ChunkDurationController(
+    min_ms=service_config.CHUNK_MIN_MS,
+    max_ms=service_config.CHUNK_MAX_MS,
+    default_ms=service_config.CHUNK_DEFAULT_MS,
+    overhead_ratio=service_config.CHUNK_OVERHEAD_RATIO,
+)
+long_audio_decoder = LongAudioDecoder(
+    sample_rate=audio_processor.sample_rate,
+    raw_sample_rate=service_config.RAW_PCM_SAMPLE_RATE,
+    ffmpeg_binary=service_config.FFMPEG_BINARY,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global makawai_client
-    
     print("🚀 启动语音翻译服务...")
     
-    # 初始化连接
-    max_init_retries = 3
-    for attempt in range(max_init_retries):
-        try:
-            print(f"📡 尝试连接Makawai服务 (第{attempt + 1}次)...")
-            makawai_client = MakawaiClient()
-            
-            if await makawai_client.connect(source_lang="zh", target_lang="en"):
-                print("✅ Makawai服务连接成功")
-                break
-            else:
-                print(f"❌ Makawai服务连接失败 (第{attempt + 1}次)")
-                if attempt < max_init_retries - 1:
-                    await asyncio.sleep(2)  # 等待后重试
-                    
-        except Exception as e:
-            print(f"💥 连接异常: {e}")
-            if attempt < max_init_retries - 1:
-                await asyncio.sleep(2)
+    if worker_cluster.enabled:
+        _claim_worker_resources()
+    
+    decode_executor.start()
+    await stream_decoders.start()
+    await connection_pool.start()
+    await connection_supervisor.start()
     
-    if not makawai_client or not makawai_client.is_connected():
-        print("⚠️ 警告: Makawai服务连接失败，将在收到请求时尝试重新连接")
-        makawai_client = None
+    # 预热默认语言对的连接在后台进行，服务立即开始接受请求
+    warmup_task = asyncio.create_task(_warmup_upstream())
+    
+    if worker_cluster.enabled:
+        await worker_cluster.start(_local_status)
+    
+    ready = startup_report.mark_ready()
+    print(f"✅ 服务已就绪，启动用时 {ready * 1000:.0f}ms")
     
     yield
     
     # 关闭连接
     print("🧹 正在关闭服务...")
-    if makawai_client:
-        try:
-            await makawai_client.close()
-        except Exception as e:
-            print(f"⚠️ 关闭连接时出错: {e}")
+    warmup_task.cancel()
+    try:
+        await warmup_task
+    except asyncio.CancelledError:
+        pass
+    await worker_cluster.close()
+    await connection_supervisor.close()
+    try:
+        await connection_pool.close()
+    except Exception as e:
+        print(f"⚠️ 关闭连接时出错: {e}")
+    await stream_decoders.close()
+    decode_executor.shutdown()
+    result_cache.close()
     print("👋 服务已关闭")
 
+async def _warmup_upstream():
+    """预热默认语言对的连接；失败时由熔断器按退避节奏在后台重试"""
+    print("📡 尝试连接Makawai服务...")
+    start = time.perf_counter()
+    try:
+        connected = await connection_pool.warmup(source_lang="zh", target_lang="en")
+    except Exception as e:
+        startup_report.warmup_finished("error", time.perf_counter() - start)
+        print(f"⚠️ 警告: Makawai服务预热出错: {e}")
+        return
+    startup_report.warmup_finished("connected" if connected else "failed", time.perf_counter() - start)
+    if connected:
+        print(f"✅ Makawai服务连接成功 ({startup_report.warmup_elapsed * 1000:.0f}ms)")
+    else:
+        print("⚠️ 警告: Makawai服务连接失败，将在后台重试")
+
+def _claim_worker_resources():
+    """多 worker 模式：取得槽位，按槽位分配上游连接配额与解码工作者"""
+    slot = worker_cluster.claim_slot()
+    if service_config.UPSTREAM_MAX_CONNECTIONS > 0:
+        connection_pool.max_size = worker_cluster.quota(service_config.UPSTREAM_MAX_CONNECTIONS)
+        connection_pool.min_size = min(connection_pool.min_size, connection_pool.max_size)
+    if not service_config.DECODE_WORKERS:
+        # 自动选择时按 worker 数均分 CPU 核，避免各 worker 的解码进程池争抢
+        decode_executor.workers = max(1, min(4, (os.cpu_count() or 1) // worker_cluster.workers))
+    print(f"👷 worker {slot + 1}/{worker_cluster.workers} (pid {os.getpid()}): "
+          f"每个语言对最多 {connection_pool.max_size} 条上游连接, {decode_executor.workers} 个解码工作者")
+
 # 初始化应用
 app = FastAPI(
     title="语音翻译API",
@@ -86,98 +236,799 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """为请求记录各阶段耗时，并以 Server-Timing 响应头返回"""
+    timings = metrics.begin_request_timing()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        if request.url.path.startswith("/api/translate"):
+            profiler.request_finished()
+    if timings:
+        response.headers["Server-Timing"] = metrics.server_timing_header(
+            timings, total=time.perf_counter() - start
+        )
+    return response
+
 @app.post("/api/translate")
 async def translate_audio(
+    request: Request,
     audio_chunk: UploadFile = File(...),
     source_lang: str = Form("zh"),
-    target_lang: str = Form("en")
+    target_lang: str = Form("en"),
+    session_id: Optional[str] = Form(None),
+    chunk_index: Optional[int] = Form(None),
+    final: bool = Form(False),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+    chunk_ms: Optional[int] = Form(None),
+    no_cache: bool = Form(False),
 ):
-    """音频翻译接口"""
-    global makawai_client
-    
+    """
+    音频翻译接口
+    响应中的 recommended_chunk_ms 为建议的录音分片时长；chunk_ms 为客户端本分片的实际录制时长（毫秒）
+    no_cache 为 true 时既不读取也不写入结果缓存（压测工具用它让每个请求都经过上游）
+    """
     print(f"🌐 收到翻译请求 - {source_lang} → {target_lang}")
     print(f"📁 音频文件: {audio_chunk.filename}")
     
-    async with get_request_lock():
-        try:
-            # 验证输入
-            if not audio_chunk or not audio_chunk.filename:
-                raise HTTPException(status_code=400, detail="未提供音频文件")
-            
-            # 读取音频数据
-            content = await audio_chunk.read()
-            print(f"📊 接收音频数据: {len(content)} 字节")
-            
-            if len(content) == 0:
-                raise HTTPException(status_code=400, detail="音频文件为空")
-            
-            # 音频处理
-            print("🔄 处理音频数据...")
-            pcm_bytes, success = audio_processor.webm_to_pcm(content)
-            
-            if not success:
-                raise HTTPException(status_code=400, detail="音频处理失败")
-            
-            print(f"✅ 音频处理完成: {len(pcm_bytes)} 字节PCM数据")
-            
-            # 确保连接有效
-            await _ensure_connection(source_lang, target_lang)
-            
+    # 请求结果分类，用于 translate_requests_total
+    outcome = "success"
+    start = time.perf_counter()
+    in_flight = metrics.IN_FLIGHT.labels("translate")
+    in_flight.inc()
+    try:
+        # 验证输入
+        if not audio_chunk or not audio_chunk.filename:
+            raise HTTPException(status_code=400, detail="未提供音频文件")
+        _check_languages(source_lang, target_lang)
+        
+        # 准入控制：超出排队上限或等待预算时立即返回 429；录音会话的分片默认为 interactive
+        priority_class = _priority_class(priority, x_priority, session_id)
+        async with AsyncExitStack() as slot:
+            admit = lambda: _admitted(_client_key(request, session_id), priority_class, source_lang, target_lang)
+            if not session_id:
+                # 单次上传的解码也在名额内进行
+                await slot.enter_async_context(admit())
+            pcm_bytes, skipped = await _prepare_pcm(
+                audio_chunk, source_lang, target_lang, session_id, chunk_index, final
+            )
+            if skipped == "buffered":
+                # 流式解码器尚未输出新的PCM（例如只收到了容器头）
+                outcome = "buffered"
+                return _with_chunk_hint({"status": "success", "translation": "", "original": "", "buffered": True})
+            if skipped == "silence":
+                outcome = "silence"
+                return _with_chunk_hint({"status": "success", "translation": "", "original": "", "skipped": "silence"})
+            if session_id:
+                # 会话分片是同一字节流的连续片段，无论是否被接纳都先写入会话解码器与 VAD，
+                # 否则被拒绝的分片（尤其是带 EBML 头的首个分片）会破坏整个会话；准入只限制上游翻译
+                await slot.enter_async_context(admit())
+        
+            # 相同音频 + 语言对直接返回缓存结果
+            cache_key, cached = _lookup_cached_result(pcm_bytes, source_lang, target_lang, enabled=not no_cache)
+            if cached is not None:
+                outcome = "cached"
+                return _with_chunk_hint(cached)
+        
+            response = await _request_translation(pcm_bytes, source_lang, target_lang)
+            if cache_key is not None:
+                result_cache.put(cache_key, response)
+        _observe_chunk(pcm_bytes, chunk_ms, time.perf_counter() - start)
+        return _with_chunk_hint(response)
+        
+    except HTTPException as e:
+        outcome = f"http_{e.status_code}"
+        raise
+    except Exception as e:
+        outcome = "http_500"
+        error_msg = f"翻译处理失败: {str(e)}"
+        print(f"💥 {error_msg}")
+        print(f"📋 详细错误: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        in_flight.dec()
+        metrics.REQUESTS.labels(source_lang, target_lang, outcome).inc()
+
+def _observe_chunk(pcm_bytes: PcmData, chunk_ms: Optional[int], latency: float):
+    """
+    把一次完整的上游往返计入分片时长控制器
+    分片时长优先取客户端上报的录制时长，否则按（VAD 裁剪后的）PCM 时长估计
+    """
+    if chunk_ms is not None and 0 < chunk_ms <= 60000:
+        duration = chunk_ms / 1000
+    else:
+        duration = len(pcm_bytes) / (2 * audio_processor.sample_rate)
+    stages = metrics.merge_timings(metrics.current_timings() or [])
+    
+    def _sum(*names: str) -> float:
+        return sum(stages.get(name, 0.0) for name in names)
+    
+    chunk_controller.observe(
+        duration,
+        latency,
+        decode=_sum("decode", "vad"),
+        queue=_sum("admission_wait", "acquire"),
+        upstream=_sum("upstream_send", "upstream_result", "upstream_stream"),
+    )
+
+def _with_chunk_hint(response: dict) -> dict:
+    """附加建议的分片时长（返回新字典，不修改缓存中的结果）"""
+    return {**response, "recommended_chunk_ms": chunk_controller.recommended_ms()}
+
+async def _request_translation(pcm_bytes: PcmData, source_lang: str, target_lang: str) -> dict:
+    """
+    把一段 PCM 发送给上游并等待翻译结果
+    返回成功的响应字典，错误状态抛出HTTP异常
+    """
+    # 从连接池借出对应语言对的连接（分帧流式发送时独占连接，帧不能与其他请求交错）
+    streaming = service_config.UPSTREAM_STREAMING
+    async with _upstream_connection(source_lang, target_lang, exclusive=streaming) as client:
+        if streaming:
+            print("📤 分帧流式发送音频到翻译服务...")
+            with metrics.stage_timer("upstream_stream", source_lang, target_lang):
+                result = await client.stream_request(
+                    pcm_bytes,
+                    frame_size=audio_processor.frame_size,
+                    sample_rate=audio_processor.sample_rate,
+                    pace=service_config.UPSTREAM_STREAM_PACE,
+                )
+            if result.get("first_result_latency") is not None:
+                metrics.record_stage("first_result", result["first_result_latency"], source_lang, target_lang)
+        else:
             # 发送音频数据
             print("📤 发送音频到翻译服务...")
-            await makawai_client.send_audio(pcm_bytes)
+            with metrics.stage_timer("upstream_send", source_lang, target_lang):
+                pending_result = await client.send_request(pcm_bytes)
             
-            # 接收翻译结果
+            # 接收翻译结果（流水线模式下等待期间连接可继续发送其他请求）
             print("📥 等待翻译结果...")
-            result = await makawai_client.receive_result()
+            with metrics.stage_timer("upstream_result", source_lang, target_lang):
+                result = await pending_result
+        status = result.get("status", "unknown")
+        metrics.UPSTREAM_RESULTS.labels(source_lang, target_lang, status).inc()
+        
+        # 连接已断开，或逐次/流式模式下超时（迟到的响应会错配给下一个请求）时，
+        # 在连接上下文内抛出HTTP异常，连接被丢弃；流水线客户端自行处理失步
+        if status == "closed" or (status == "timeout" and (streaming or connection_pool.pipeline_depth == 1)):
+            _process_translation_result(result)
+    
+    # 处理结果（只有成功的结果会返回，错误状态抛出HTTP异常）
+    return _process_translation_result(result)
+
+async def _prepare_pcm(
+    audio_chunk: UploadFile,
+    source_lang: str,
+    target_lang: str,
+    session_id: Optional[str],
+    chunk_index: Optional[int],
+    final: bool,
+) -> Tuple[Optional[PcmData], Optional[str]]:
+    """
+    读取上传的音频并解码、裁剪静音
+    返回 (PCM, 跳过原因)；跳过原因为 "buffered"（解码器尚未输出PCM）或 "silence"（整段静音）
+    """
+    # 读取音频数据
+    with metrics.stage_timer("upload_read", source_lang, target_lang):
+        content = await audio_chunk.read()
+    print(f"📊 接收音频数据: {len(content)} 字节")
+    
+    if len(content) == 0:
+        raise HTTPException(status_code=400, detail="音频文件为空")
+    
+    # 音频处理
+    print("🔄 处理音频数据...")
+    with metrics.stage_timer("decode", source_lang, target_lang):
+        pcm_bytes, success = await _decode_audio(
+            content, session_id, chunk_index, final, audio_chunk.content_type
+        )
+    
+    if not success:
+        raise HTTPException(status_code=400, detail="音频处理失败")
+    
+    print(f"✅ 音频处理完成: {len(pcm_bytes)} 字节PCM数据")
+    
+    if not pcm_bytes:
+        return None, "buffered"
+    
+    # 裁剪首尾静音，整段静音不发送到上游
+    with metrics.stage_timer("vad", source_lang, target_lang):
+        pcm_bytes = _apply_vad(pcm_bytes, session_id, final)
+    if not pcm_bytes:
+        print("🔇 分片为静音，跳过翻译")
+        return None, "silence"
+    return pcm_bytes, None
+
+def _lookup_cached_result(
+    pcm_bytes: PcmData, source_lang: str, target_lang: str, enabled: bool = True
+) -> Tuple[Optional[str], Optional[dict]]:
+    """查询翻译结果缓存，返回 (缓存键, 命中的响应)；缓存关闭或本请求不使用缓存（enabled=False）时缓存键为 None"""
+    if not service_config.RESULT_CACHE_ENABLED or not enabled:
+        return None, None
+    cache_key = result_cache.make_key(pcm_bytes, source_lang, target_lang)
+    cached = result_cache.get(cache_key)
+    metrics.CACHE_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+    if cached is None:
+        return cache_key, None
+    print(f"⚡ 命中翻译结果缓存: '{cached.get('translation', '')}'")
+    return cache_key, {**_without_expired_audio(cached), "cached": True}
+
+def _sse_event(event: str, data: dict) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/translate/stream")
+async def translate_audio_stream(
+    request: Request,
+    audio_chunk: UploadFile = File(...),
+    source_lang: str = Form("zh"),
+    target_lang: str = Form("en"),
+    session_id: Optional[str] = Form(None),
+    chunk_index: Optional[int] = Form(None),
+    final: bool = Form(False),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+):
+    """
+    音频翻译接口（Server-Sent Events）
+    - 先取得准入名额再读取、解码音频（与 /api/translate 一致），名额保持到流结束；
+      录音会话的分片先写入会话解码器再排队，被拒绝的分片不会破坏会话的 WebM 字节流；
+      未被接纳、上传或解码错误以普通 HTTP 错误返回（429 带 Retry-After）
+    - 音频按帧流式发送到上游，上游的每条消息到达即推送：interim 为中间结果，final 为最终结果
+    - 推送 final 或 error 事件后关闭流
+    """
+    print(f"🌐 收到流式翻译请求 - {source_lang} → {target_lang}")
+    
+    in_flight = metrics.IN_FLIGHT.labels("translate_stream")
+    in_flight.inc()
+    # 准入名额在这里取得，交给事件流在结束时释放
+    slot = AsyncExitStack()
+    finished = False
+    
+    async def finish(final_outcome: str):
+        """释放准入名额并记录请求结果（只执行一次）"""
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        try:
+            await slot.aclose()
+        finally:
+            in_flight.dec()
+            metrics.REQUESTS.labels(source_lang, target_lang, final_outcome).inc()
+    
+    try:
+        if not audio_chunk or not audio_chunk.filename:
+            raise HTTPException(status_code=400, detail="未提供音频文件")
+        _check_languages(source_lang, target_lang)
+        priority_class = _priority_class(priority, x_priority, session_id)
+        admit = lambda: _admitted(_client_key(request, session_id), priority_class, source_lang, target_lang)
+        if not session_id:
+            await slot.enter_async_context(admit())
+        pcm_bytes, skipped = await _prepare_pcm(
+            audio_chunk, source_lang, target_lang, session_id, chunk_index, final
+        )
+        if session_id and skipped is None:
+            # 会话分片先写入会话解码器再排队（与 /api/translate 一致）
+            await slot.enter_async_context(admit())
+    except HTTPException as e:
+        await finish(f"http_{e.status_code}")
+        raise
+    except Exception as e:
+        await finish("http_500")
+        error_msg = f"翻译处理失败: {str(e)}"
+        print(f"💥 {error_msg}")
+        print(f"📋 详细错误: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+    except BaseException:
+        # 排队或解码期间客户端断开
+        await finish("disconnected")
+        raise
+    
+    async def events():
+        outcome = "success"
+        try:
+            if skipped is not None:
+                outcome = skipped
+                yield _sse_event("final", {
+                    "status": "success", "translation": "", "original": "", "is_final": True, "skipped": skipped,
+                })
+                return
+            
+            cache_key, cached = _lookup_cached_result(pcm_bytes, source_lang, target_lang)
+            if cached is not None:
+                outcome = "cached"
+                yield _sse_event("final", {**cached, "is_final": True})
+                return
             
-            # 处理结果
-            return _process_translation_result(result)
+            # 一段音频的多条消息必须依次读取，始终独占连接；
+            # 客户端中途断开或连接失步时连接在上下文内因异常被丢弃
+            async with _upstream_connection(source_lang, target_lang, exclusive=True) as client:
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                interim = 0
+                with metrics.stage_timer("upstream_stream", source_lang, target_lang):
+                    async for result in client.stream_results(
+                        pcm_bytes,
+                        frame_size=audio_processor.frame_size,
+                        sample_rate=audio_processor.sample_rate,
+                        pace=service_config.UPSTREAM_STREAM_PACE,
+                    ):
+                        status = result.get("status", "unknown")
+                        if interim == 0 and status == "success":
+                            metrics.record_stage("first_result", loop.time() - started, source_lang, target_lang)
+                        if not result["is_final"]:
+                            interim += 1
+                            yield _sse_event("interim", {
+                                "translation": result.get("translation", ""),
+                                "original": result.get("original", ""),
+                                "is_final": False,
+                            })
+                            continue
+                        
+                        metrics.UPSTREAM_RESULTS.labels(source_lang, target_lang, status).inc()
+                        if status in ("closed", "timeout"):
+                            # 超时后迟到的消息会错配给下一个请求，在连接上下文内抛出以丢弃连接
+                            _process_translation_result(result)
+
+            # 上游业务错误不影响连接，出上下文（连接已归还）后再处理
+            response = _process_translation_result(result)
+            if cache_key is not None:
+                result_cache.put(cache_key, response)
+            yield _sse_event("final", {**response, "is_final": True, "interim_results": interim})
             
-        except HTTPException:
+        except HTTPException as e:
+            outcome = f"http_{e.status_code}"
+            error = {"status": "error", "status_code": e.status_code, "detail": e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            yield _sse_event("error", error)
+        except (asyncio.CancelledError, GeneratorExit):
+            # 客户端中途断开
+            outcome = "disconnected"
             raise
         except Exception as e:
-            error_msg = f"翻译处理失败: {str(e)}"
-            print(f"💥 {error_msg}")
+            outcome = "http_500"
+            print(f"💥 流式翻译失败: {e}")
             print(f"📋 详细错误: {traceback.format_exc()}")
-            raise HTTPException(status_code=500, detail=error_msg)
+            yield _sse_event("error", {"status": "error", "status_code": 500, "detail": f"翻译处理失败: {str(e)}"})
+        finally:
+            await finish(outcome)
+    
+    # 客户端在事件流开始前断开时生成器不会执行，由响应结束后的后台任务兜底释放名额
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finish, "disconnected"),
+    )
 
-async def _ensure_connection(source_lang: str, target_lang: str):
-    """确保WebSocket连接有效"""
-    global makawai_client
+def _parse_batch_languages(
+    languages: Optional[str], count: int, source_lang: str, target_lang: str
+) -> List[Tuple[str, str]]:
+    """
+    解析批量请求的逐条语言对
+    languages 为 JSON 数组，每项为 null 或 {"source_lang": ..., "target_lang": ...}，缺省的字段使用请求级默认值
+    """
+    if not languages:
+        _check_languages(source_lang, target_lang)
+        return [(source_lang, target_lang)] * count
+    try:
+        items = json.loads(languages)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"languages 不是合法的JSON: {e}")
+    if not isinstance(items, list) or len(items) != count:
+        raise HTTPException(status_code=400, detail=f"languages 必须是长度为 {count} 的数组")
+    pairs = []
+    for index, item in enumerate(items):
+        if item is None:
+            item = {}
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail=f"languages[{index}] 必须是对象或 null")
+        pair = (str(item.get("source_lang") or source_lang), str(item.get("target_lang") or target_lang))
+        _check_languages(*pair, field=f"languages[{index}]")
+        pairs.append(pair)
+    return pairs
+
+async def _translate_batch_item(
+    index: int,
+    audio_chunk: UploadFile,
+    source_lang: str,
+    target_lang: str,
+    semaphore: asyncio.Semaphore,
+    client_key: str,
+    priority_class: str,
+) -> dict:
+    """处理批量请求中的一条音频，失败时返回错误条目而不是抛出异常"""
+    item = {"index": index, "filename": audio_chunk.filename, "source_lang": source_lang, "target_lang": target_lang}
+    outcome = "success"
+    async with semaphore:
+        # 每个条目在自己的任务上下文中记录阶段耗时，不计入整个批量请求的 Server-Timing
+        timings = metrics.begin_request_timing()
+        start = time.perf_counter()
+        try:
+            # 每个文件都是完整音频，不关联录音会话
+            pcm_bytes, skipped = await _prepare_pcm(audio_chunk, source_lang, target_lang, None, None, True)
+            if skipped is not None:
+                outcome = skipped
+                response = {"status": "success", "translation": "", "original": "", "skipped": skipped}
+            else:
+                cache_key, response = _lookup_cached_result(pcm_bytes, source_lang, target_lang)
+                if response is not None:
+                    outcome = "cached"
+                else:
+                    async with _admitted(client_key, priority_class, source_lang, target_lang):
+                        response = await _request_translation(pcm_bytes, source_lang, target_lang)
+                    if cache_key is not None:
+                        result_cache.put(cache_key, response)
+            item.update(response)
+        except HTTPException as e:
+            outcome = f"http_{e.status_code}"
+            item.update({"status": "error", "status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            outcome = "http_500"
+            print(f"💥 批量条目 #{index} 处理失败: {e}")
+            print(f"📋 详细错误: {traceback.format_exc()}")
+            item.update({"status": "error", "status_code": 500, "detail": f"翻译处理失败: {str(e)}"})
+        finally:
+            metrics.REQUESTS.labels(source_lang, target_lang, outcome).inc()
+        timing = metrics.merge_timings(timings)
+        timing["total"] = time.perf_counter() - start
+        item["timing_ms"] = {stage: round(seconds * 1000, 1) for stage, seconds in timing.items()}
+    return item
+
+@app.post("/api/translate/batch")
+async def translate_audio_batch(
+    request: Request,
+    audio_chunks: List[UploadFile] = File(...),
+    source_lang: str = Form("zh"),
+    target_lang: str = Form("en"),
+    languages: Optional[str] = Form(None),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+):
+    """
+    批量音频翻译接口
+    - 每个文件为一段完整音频，可通过 languages 为每条指定语言对
+    - 最多 BATCH_CONCURRENCY 条同时解码并占用上游连接，结果按上传顺序返回
+    - 单条失败不影响其他条目，整体状态为 success / partial / error
+    """
+    print(f"🌐 收到批量翻译请求 - {len(audio_chunks)} 个文件")
+    if not audio_chunks:
+        raise HTTPException(status_code=400, detail="未提供音频文件")
+    if len(audio_chunks) > service_config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"单次最多上传 {service_config.BATCH_MAX_ITEMS} 个文件"
+        )
+    pairs = _parse_batch_languages(languages, len(audio_chunks), source_lang, target_lang)
+    priority_class = _priority_class(priority, x_priority)
     
-    max_retries = 3
+    concurrency = max(1, service_config.BATCH_CONCURRENCY)
+    client_key = _client_key(request)
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = metrics.IN_FLIGHT.labels("translate_batch")
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(
+            _translate_batch_item(index, audio_chunk, src, tgt, semaphore, client_key, priority_class)
+            for index, (audio_chunk, (src, tgt)) in enumerate(zip(audio_chunks, pairs))
+        ))
+    finally:
+        in_flight.dec()
     
-    for attempt in range(max_retries):
-        # 检查现有连接
-        if makawai_client and makawai_client.is_connected():
-            # 尝试ping测试
-            if await makawai_client.ping_server():
-                print("✅ 连接状态良好")
-                return
-            else:
-                print("⚠️ 连接可能已断开")
+    succeeded = sum(1 for item in results if item["status"] == "success")
+    failed = len(results) - succeeded
+    status = "success" if failed == 0 else ("error" if succeeded == 0 else "partial")
+    print(f"📦 批量翻译完成: {succeeded} 成功, {failed} 失败")
+    return {
+        "status": status,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": failed,
+        "concurrency": concurrency,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "results": results,
+    }
+
+@app.post("/api/translate/long")
+async def translate_long_audio(
+    request: Request,
+    audio_file: UploadFile = File(...),
+    source_lang: str = Form("zh"),
+    target_lang: str = Form("en"),
+    priority: Optional[str] = Form(None),
+    x_priority: Optional[str] = Header(None),
+):
+    """
+    长音频翻译接口
+    - 上传文件按块流式解码到临时文件（memmap 读取），内存占用与时长无关
+    - 按静音边界切分为片段，最多 LONG_AUDIO_CONCURRENCY 个片段通过多条上游连接并发翻译
+    - 结果按时间顺序拼接，并返回每个片段的起止时间
+    """
+    print(f"🌐 收到长音频翻译请求 - {source_lang} → {target_lang}")
+    print(f"📁 音频文件: {audio_file.filename}")
+    _check_languages(source_lang, target_lang)
+    priority_class = _priority_class(priority, x_priority)
+    
+    outcome = "success"
+    in_flight = metrics.IN_FLIGHT.labels("translate_long")
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        head = await audio_file.read(64)
+        if not head:
+            raise HTTPException(status_code=400, detail="音频文件为空")
+        await audio_file.seek(0)
+        audio_format = detect_format(head, audio_file.content_type)
+        print(f"🔍 识别音频格式: {audio_format} (Content-Type: {audio_file.content_type})")
+        if audio_format in (FORMAT_UNKNOWN, FORMAT_WEBM_CONTINUATION):
+            raise HTTPException(status_code=415, detail="不支持的音频格式")
         
-        # 重新连接
-        print(f"🔄 尝试重新连接 (第{attempt + 1}次)...")
-        try:
-            if makawai_client:
-                await makawai_client.close()
+        sample_rate = audio_processor.sample_rate
+        with PcmSpool(service_config.LONG_AUDIO_SPOOL_DIR) as spool:
+            with metrics.stage_timer("decode", source_lang, target_lang):
+                try:
+                    await long_audio_decoder.decode(audio_file.file, audio_format, spool)
+                except LongAudioError as e:
+                    raise HTTPException(status_code=400, detail=f"音频处理失败: {e}")
+            samples = spool.map()
+            duration = len(samples) / sample_rate
             
-            makawai_client = MakawaiClient()
-            if await makawai_client.connect(source_lang, target_lang):
-                print("✅ 重新连接成功")
-                return
-            else:
-                print(f"❌ 重新连接失败 (第{attempt + 1}次)")
-                
-        except Exception as e:
-            print(f"💥 重新连接异常: {e}")
+            with metrics.stage_timer("segment", source_lang, target_lang):
+                bounds = plan_segments(
+                    samples,
+                    voice_detector,
+                    sample_rate=sample_rate,
+                    target_seconds=service_config.LONG_AUDIO_SEGMENT_SECONDS,
+                    max_seconds=service_config.LONG_AUDIO_MAX_SEGMENT_SECONDS,
+                    min_gap_seconds=service_config.LONG_AUDIO_MIN_GAP_SECONDS,
+                )
+            print(f"✂️ 长音频 {duration:.1f}s 切分为 {len(bounds)} 个片段")
+            segments = await _translate_long_segments(
+                samples, bounds, source_lang, target_lang, _client_key(request), priority_class
+            )
         
-        if attempt < max_retries - 1:
-            await asyncio.sleep(1)
+        succeeded = [item for item in segments if item["status"] == "success"]
+        failed = len(segments) - len(succeeded)
+        if not segments:
+            outcome = "silence"
+        elif not succeeded:
+            outcome = "failed"
+        elif failed:
+            outcome = "partial"
+        print(f"📦 长音频翻译完成: {len(succeeded)} 成功, {failed} 失败")
+        return {
+            "status": "error" if segments and not succeeded else ("partial" if failed else "success"),
+            "translation": " ".join(item["translation"] for item in succeeded if item.get("translation")),
+            "original": " ".join(item["original"] for item in succeeded if item.get("original")),
+            "duration": round(duration, 3),
+            "total": len(segments),
+            "succeeded": len(succeeded),
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "segments": segments,
+        }
     
-    raise HTTPException(status_code=503, detail="无法连接到翻译服务")
+    except HTTPException as e:
+        outcome = f"http_{e.status_code}"
+        raise
+    except Exception as e:
+        outcome = "http_500"
+        error_msg = f"长音频翻译失败: {str(e)}"
+        print(f"💥 {error_msg}")
+        print(f"📋 详细错误: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        in_flight.dec()
+        metrics.REQUESTS.labels(source_lang, target_lang, outcome).inc()
+
+async def _translate_long_segments(
+    samples,
+    bounds: List[Tuple[int, int]],
+    source_lang: str,
+    target_lang: str,
+    client_key: str,
+    priority_class: str,
+) -> List[dict]:
+    """
+    并发翻译长音频的各个片段，结果按片段顺序返回
+    固定数量的工作协程依次领取片段，任务数与片段数无关；片段 PCM 是 memmap 的零拷贝切片
+    """
+    sample_rate = audio_processor.sample_rate
+    results: List[Optional[dict]] = [None] * len(bounds)
+    pending = iter(range(len(bounds)))
+    
+    async def _worker():
+        for index in pending:
+            start, end = bounds[index]
+            item = {"index": index, "start": round(start / sample_rate, 3), "end": round(end / sample_rate, 3)}
+            try:
+                pcm_bytes = pcm_memoryview(samples[start:end])
+                cache_key, response = _lookup_cached_result(pcm_bytes, source_lang, target_lang)
+                if response is None:
+                    async with _admitted(client_key, priority_class, source_lang, target_lang):
+                        response = await _request_translation(pcm_bytes, source_lang, target_lang)
+                    if cache_key is not None:
+                        result_cache.put(cache_key, response)
+                item.update(response)
+            except HTTPException as e:
+                item.update({"status": "error", "status_code": e.status_code, "detail": e.detail})
+            except Exception as e:
+                print(f"💥 长音频片段 #{index} 翻译失败: {e}")
+                item.update({"status": "error", "status_code": 500, "detail": f"翻译处理失败: {str(e)}"})
+            results[index] = item
+    
+    workers = min(max(1, service_config.LONG_AUDIO_CONCURRENCY), len(bounds))
+    await asyncio.gather(*(_worker() for _ in range(workers)))
+    return results
+
+async def _decode_audio(
+    content: bytes,
+    session_id: Optional[str],
+    chunk_index: Optional[int],
+    final: bool,
+    content_type: Optional[str] = None
+):
+    """
+    解码音频：先按文件头识别格式，再直接选择解码器
+    - 带会话ID的 WebM/OGG 分片走会话级流式解码器
+    - 其他格式交给解码执行器，未知格式立即拒绝
+    """
+    audio_format = detect_format(content, content_type)
+    format_stats.record(audio_format, len(content))
+    print(f"🔍 识别音频格式: {audio_format} (Content-Type: {content_type})")
+    
+    if session_id and audio_format in _STREAMABLE_FORMATS and stream_decoders.available():
+        input_format = FORMAT_WEBM if audio_format == FORMAT_WEBM_CONTINUATION else audio_format
+        try:
+            pcm_bytes = await stream_decoders.decode_chunk(
+                session_id, content, chunk_index, final, input_format=input_format
+            )
+            print(f"🎞️ 会话 {session_id} 分片 {chunk_index} 流式解码: {len(pcm_bytes)} 字节")
+            metrics.DECODER_PATH.labels("stream", audio_format).inc()
+            return pcm_bytes, True
+        except StreamDecoderError as e:
+            print(f"⚠️ 流式解码失败: {e}")
+            await stream_decoders.close_session(session_id)
+            if audio_format == FORMAT_WEBM_CONTINUATION:
+                return b"", False
+    
+    if audio_format in (FORMAT_WEBM_CONTINUATION, FORMAT_UNKNOWN):
+        metrics.DECODER_PATH.labels("rejected", audio_format).inc()
+    if audio_format == FORMAT_WEBM_CONTINUATION:
+        raise HTTPException(status_code=415, detail="缺少WebM头的续传分片需要携带 session_id")
+    if audio_format == FORMAT_UNKNOWN:
+        raise HTTPException(status_code=415, detail="不支持的音频格式")
+    
+    # 单分片解码在执行器中进行，不阻塞事件循环
+    metrics.DECODER_PATH.labels("executor", audio_format).inc()
+    try:
+        return await decode_executor.decode(content, audio_format)
+    except DecodeQueueFullError:
+        raise HTTPException(status_code=503, detail="音频处理繁忙，请稍后重试")
+
+def _apply_vad(pcm_bytes: PcmData, session_id: Optional[str], final: bool = False) -> PcmData:
+    """
+    语音活动检测：返回需要发送到上游的PCM，整段静音时返回空字节串
+    - 带会话ID时使用会话级流式VAD，hangover 状态跨分片保留
+    """
+    if not service_config.VAD_ENABLED:
+        return pcm_bytes
+    
+    samples = pcm_view(pcm_bytes)
+    if session_id:
+        voiced = vad_sessions.get(session_id).process(samples)
+        if final:
+            vad_sessions.drop(session_id)
+    else:
+        voiced = voice_detector.trim(samples)
+    vad_stats.record(len(samples), len(voiced))
+    if len(voiced) == 0:
+        metrics.VAD_SKIPPED.inc()
+    
+    if len(voiced) == len(samples):
+        return pcm_bytes
+    # 裁剪结果是原数组的切片，直接返回其字节视图
+    return pcm_memoryview(voiced)
+
+def _client_key(request: Request, session_id: Optional[str] = None) -> str:
+    """准入控制按客户端轮转：有录音会话时按会话，否则按客户端 IP"""
+    if session_id:
+        return f"session:{session_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+def _check_languages(source_lang: str, target_lang: str, field: str = "source_lang / target_lang"):
+    """语言不在 SUPPORTED_LANGUAGES 中时返回 400，不为任意输入建立上游连接组"""
+    if connection_pool.supports(source_lang, target_lang):
+        return
+    raise HTTPException(
+        status_code=400,
+        detail=f"{field} 不受支持: {source_lang}→{target_lang}，可选 {', '.join(service_config.SUPPORTED_LANGUAGES)}",
+    )
+
+def _priority_class(
+    explicit: Optional[str], header: Optional[str], session_id: Optional[str] = None
+) -> str:
+    """
+    请求的调度类别：表单字段 priority 优先，其次 X-Priority 请求头，
+    都未指定时录音会话的分片为 interactive，其余（调试上传、脚本、批量、长音频）为 bulk
+    """
+    for value in (explicit, header):
+        if value is None or value.strip() == "":
+            continue
+        value = value.strip().lower()
+        if value not in admission.classes:
+            raise HTTPException(
+                status_code=400, detail=f"priority 必须是 {' / '.join(admission.classes)} 之一"
+            )
+        return value
+    return PRIORITY_INTERACTIVE if session_id else PRIORITY_BULK
+
+@asynccontextmanager
+async def _admitted(client_key: str, priority_class: str, source_lang: str, target_lang: str):
+    """在准入名额内执行，未被接纳时映射为 429"""
+    try:
+        async with admission.admit(client_key, priority_class) as waited:
+            metrics.record_stage("admission_wait", waited, source_lang, target_lang)
+            metrics.ADMISSION_WAIT.labels(priority_class).observe(waited)
+            yield
+    except AdmissionRejectedError as e:
+        metrics.ADMISSION_REJECTED.labels(e.reason).inc()
+        print(f"🚦 请求未被接纳 ({client_key}, {priority_class}): {e.reason}")
+        raise HTTPException(
+            status_code=429,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+@asynccontextmanager
+async def _upstream_connection(source_lang: str, target_lang: str, exclusive: bool = False):
+    """从连接池借出连接，并将连接池错误映射为HTTP错误"""
+    try:
+        with metrics.stage_timer("acquire", source_lang, target_lang):
+            client = await connection_pool.acquire(source_lang, target_lang, exclusive=exclusive)
+    except PoolTimeoutError:
+        raise HTTPException(status_code=503, detail="翻译服务繁忙，请稍后重试")
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="翻译服务暂不可用，请稍后重试",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    except PoolConnectError:
+        raise HTTPException(status_code=503, detail="无法连接到翻译服务")
+    except UnsupportedLanguageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    discard = False
+    try:
+        yield client
+    except BaseException:
+        # 出错的连接状态不可信，直接丢弃
+        discard = True
+        raise
+    finally:
+        await connection_pool.release(client, discard=discard)
+
+def _store_result_audio(result: dict) -> dict:
+    """保存上游返回的合成音频，返回需要合并到响应中的字段"""
+    audio_bytes = result.get("audio_bytes")
+    result_id = audio_store.put(audio_bytes) if audio_bytes else None
+    if result_id is None:
+        return {}
+    return {"audio_available": True, "result_id": result_id, "audio_url": f"/api/audio/{result_id}"}
+
+def _without_expired_audio(response: dict) -> dict:
+    """缓存的结果比音频存储活得久，音频已过期时去掉音频字段"""
+    result_id = response.get("result_id")
+    if result_id is None or audio_store.contains(result_id):
+        return response
+    trimmed = {key: value for key, value in response.items() if key not in ("result_id", "audio_url")}
+    trimmed["audio_available"] = False
+    return trimmed
 
 def _process_translation_result(result: dict):
     """处理翻译结果"""
@@ -195,9 +1046,8 @@ def _process_translation_result(result: dict):
             "original": original
         }
         
-        # 如果有音频数据，也返回
-        if result.get("audio_bytes"):
-            response["audio_available"] = True
+        # 合成音频存入短期存储，客户端通过 audio_url 直接获取二进制音频
+        response.update(_store_result_audio(result))
         
         print(f"✅ 翻译成功: '{translation}'")
         return response
@@ -219,46 +1069,564 @@ def _process_translation_result(result: dict):
         print(f"❓ 未知状态: {status}")
         raise HTTPException(status_code=500, detail=f"未知错误状态: {status}")
 
-@app.get("/health")
-async def health_check():
-    """健康检查接口"""
-    connected = False
-    status_details = {}
-    
-    if makawai_client:
-        connected = makawai_client.is_connected()
-        status_details = {
-            "connection_attempts": getattr(makawai_client, 'connection_attempts', 0),
-            "is_processing": getattr(makawai_client, 'is_processing', False),
-            "last_activity": getattr(makawai_client, 'last_activity_time', 0)
+class _TranslationStream:
+    """
+    单个 /ws/translate 会话的上游音频流
+    - 从连接池借出一条连接，通过 send_audio_stream 持续发送PCM
+    - 并发接收上游结果，随到随推送给浏览器
+    - 每条流在录音期间独占一条上游连接，每个语言对同时进行的流数量单独限制，
+      至少给 HTTP 接口保留一条池连接；连接池只有一条连接时不接受实时流
+    """
+    
+    # 发送结束后，等待剩余结果的最长空闲时间（秒）
+    DRAIN_TIMEOUT = 5.0
+    # 接收结果的轮询间隔（秒）
+    POLL_INTERVAL = 2.0
+    # 每个语言对当前进行中的流数量
+    active: Dict[Tuple[str, str], int] = {}
+    
+    @classmethod
+    def limit(cls) -> int:
+        """每个语言对的流数量上限：不超过 WS_MAX_STREAMS，也不超过连接池上限减一（可能为 0）"""
+        return max(0, min(service_config.WS_MAX_STREAMS, connection_pool.max_size - 1))
+    
+    @classmethod
+    def reserve(cls, source_lang: str, target_lang: str) -> bool:
+        """占用一个流名额，已达上限时返回 False"""
+        key = (source_lang, target_lang)
+        if cls.active.get(key, 0) >= cls.limit():
+            return False
+        cls.active[key] = cls.active.get(key, 0) + 1
+        return True
+    
+    @classmethod
+    def unreserve(cls, source_lang: str, target_lang: str):
+        key = (source_lang, target_lang)
+        cls.active[key] = max(0, cls.active.get(key, 0) - 1)
+    
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "limit_per_pair": cls.limit(),
+            "active": {f"{source}-{target}": count for (source, target), count in cls.active.items() if count},
         }
     
+    def __init__(self, websocket: WebSocket, source_lang: str, target_lang: str, send_lock: asyncio.Lock):
+        self.websocket = websocket
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.send_lock = send_lock
+        self.audio_queue: asyncio.Queue = asyncio.Queue()
+        self.send_done = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """启动上游音频流，调用前须已通过 reserve 占用名额，名额转交给本流并在结束时归还"""
+        self.task = asyncio.create_task(self._run())
+    
+    async def push(self, pcm_bytes: bytes):
+        await self.audio_queue.put(pcm_bytes)
+    
+    async def finish(self):
+        """发送结束标记并等待剩余结果"""
+        await self.audio_queue.put(None)
+        if self.task:
+            try:
+                await self.task
+            except Exception as e:
+                print(f"⚠️ 音频流结束时出错: {e}")
+    
+    async def _audio_generator(self):
+        while True:
+            pcm_bytes = await self.audio_queue.get()
+            if pcm_bytes is None:
+                return
+            yield pcm_bytes
+    
+    async def _run(self):
+        try:
+            await self._stream()
+        finally:
+            self.unreserve(self.source_lang, self.target_lang)
+    
+    async def _stream(self):
+        try:
+            with metrics.stage_timer("acquire", self.source_lang, self.target_lang):
+                client = await connection_pool.acquire(self.source_lang, self.target_lang, exclusive=True)
+        except (PoolTimeoutError, PoolConnectError, CircuitOpenError, UnsupportedLanguageError) as e:
+            message = {"type": "error", "detail": f"无法连接到翻译服务: {e}"}
+            if isinstance(e, CircuitOpenError):
+                message["retry_after"] = max(1, math.ceil(e.retry_after))
+            await _ws_send(self.websocket, self.send_lock, message)
+            # 排空队列，避免调用方阻塞
+            while await self.audio_queue.get() is not None:
+                pass
+            return
+        
+        receiver = asyncio.create_task(self._forward_results(client))
+        try:
+            await client.send_audio_stream(self._audio_generator())
+            self.send_done.set()
+            await receiver
+        except Exception as e:
+            print(f"💥 上游音频流出错: {e}")
+            await _ws_send(self.websocket, self.send_lock, {"type": "error", "detail": f"翻译处理失败: {str(e)}"})
+        finally:
+            self.send_done.set()
+            receiver.cancel()
+            # 流结束后上游可能仍有迟到消息，连接不再复用
+            await connection_pool.release(client, discard=True)
+    
+    async def _forward_results(self, client):
+        loop = asyncio.get_running_loop()
+        last_result_time = loop.time()
+        while True:
+            result = await client.receive_result(timeout=self.POLL_INTERVAL)
+            status = result.get("status")
+            
+            if status == "timeout":
+                # 轮询超时是正常空闲，不计入上游超时
+                if self.send_done.is_set() and loop.time() - last_result_time > self.DRAIN_TIMEOUT:
+                    return
+                continue
+            
+            last_result_time = loop.time()
+            metrics.UPSTREAM_RESULTS.labels(self.source_lang, self.target_lang, status or "unknown").inc()
+            if status == "success":
+                message = {
+                    "type": "result",
+                    "status": "success",
+                    "translation": result.get("translation", ""),
+                    "original": result.get("original", ""),
+                    "audio_available": False,
+                    **_store_result_audio(result)
+                }
+                await _ws_send(self.websocket, self.send_lock, message)
+            elif status == "closed":
+                await _ws_send(self.websocket, self.send_lock, {"type": "error", "detail": "翻译服务连接中断"})
+                return
+            else:
+                error_msg = result.get("error_message", "未知错误")
+                await _ws_send(self.websocket, self.send_lock, {"type": "error", "detail": f"翻译服务错误: {error_msg}"})
+
+async def _ws_send(websocket: WebSocket, send_lock: asyncio.Lock, message: dict):
+    """向浏览器发送JSON消息，连接已断开时忽略"""
+    async with send_lock:
+        try:
+            await websocket.send_json(message)
+        except Exception:
+            pass
+
+@app.websocket("/ws/translate")
+async def translate_stream(websocket: WebSocket):
+    """
+    全双工流式翻译接口
+    - 文本消息为控制指令：{"type": "start", "source_lang": "zh", "target_lang": "en"} / {"type": "stop"}
+    - 二进制消息为录音分片（MediaRecorder 输出的 WebM）
+    - start 指令带 "format": "pcm" 与 "sample_rate" 时，二进制消息为 16-bit 单声道裸 PCM，
+      服务端用流式重采样器转换到 16kHz，滤波器状态跨分片保留
+    - 翻译结果以 {"type": "result", ...} 推送
+    """
+    await websocket.accept()
+    metrics.IN_FLIGHT.labels("ws").inc()
+    session_id = f"ws-{uuid.uuid4().hex}"
+    send_lock = asyncio.Lock()
+    source_lang, target_lang = "zh", "en"
+    stream: Optional[_TranslationStream] = None
+    # 本段录音已占用流名额但上游流尚未启动（分片还没有解码出语音）
+    stream_reserved = False
+    # 流数量已达上限时，本段录音的后续分片不再解码，直接丢弃，直到下一个 start / stop
+    stream_rejected = False
+    chunk_index = 0
+    # 裸 PCM 模式下的流式重采样器
+    resampler: Optional[PolyphaseResampler] = None
+    
+    print(f"🔌 WebSocket会话开始: {session_id}")
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            # 控制消息
+            if message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    await _ws_send(websocket, send_lock, {"type": "error", "detail": "控制消息格式错误"})
+                    continue
+                
+                action = control.get("type")
+                if action in ("start", "stop"):
+                    # 结束当前录音：取出解码器中剩余的PCM，再结束上游音频流
+                    tail = b""
+                    if chunk_index and stream_decoders.available():
+                        try:
+                            tail = await stream_decoders.decode_chunk(session_id, b"", chunk_index, final=True)
+                        except StreamDecoderError as e:
+                            print(f"⚠️ 结束流式解码失败: {e}")
+                    await stream_decoders.close_session(session_id)
+                    chunk_index = 0
+                    if resampler:
+                        tail += to_int16(resampler.flush()).tobytes()
+                        resampler = None
+                    if tail:
+                        tail = _apply_vad(tail, session_id, final=True)
+                    vad_sessions.drop(session_id)
+                    if stream:
+                        if tail:
+                            await stream.push(tail)
+                        await stream.finish()
+                        stream = None
+                    if stream_reserved:
+                        _TranslationStream.unreserve(source_lang, target_lang)
+                        stream_reserved = False
+                    stream_rejected = False
+                if action == "start":
+                    requested = (str(control.get("source_lang", source_lang)), str(control.get("target_lang", target_lang)))
+                    if not connection_pool.supports(*requested):
+                        # 保留原语言对，不为不支持的语言建立连接
+                        await _ws_send(websocket, send_lock, {"type": "error", "detail": f"不支持的语言对: {requested[0]}→{requested[1]}"})
+                        continue
+                    source_lang, target_lang = requested
+                    if control.get("format") == "pcm":
+                        try:
+                            input_rate = int(control.get("sample_rate", audio_processor.sample_rate))
+                            resampler = PolyphaseResampler(input_rate, audio_processor.sample_rate)
+                        except ValueError:
+                            await _ws_send(websocket, send_lock, {"type": "error", "detail": "无效的采样率"})
+                            continue
+                    print(f"🌐 WebSocket会话 {session_id}: {source_lang} → {target_lang}")
+                await _ws_send(websocket, send_lock, {"type": "ack", "action": action,
+                                                      "source_lang": source_lang, "target_lang": target_lang})
+                continue
+            
+            data = message.get("bytes")
+            if not data or stream_rejected:
+                continue
+            if stream is None and not stream_reserved:
+                # 解码前先占用流名额，被拒绝的录音不再占用解码器
+                if not _TranslationStream.reserve(source_lang, target_lang):
+                    stream_rejected = True
+                    await stream_decoders.close_session(session_id)
+                    vad_sessions.drop(session_id)
+                    chunk_index = 0
+                    limit = _TranslationStream.limit()
+                    print(f"🚦 WebSocket会话 {session_id}: 实时流数量已达上限 ({limit})")
+                    if limit == 0:
+                        error = {"type": "error", "detail": "实时翻译流不可用（上游连接数不足），请使用 /api/translate"}
+                    else:
+                        error = {"type": "error", "detail": "实时翻译流数量已达上限，请稍后重试", "retry_after": 1}
+                    await _ws_send(websocket, send_lock, error)
+                    continue
+                stream_reserved = True
+            
+            if resampler:
+                samples = pcm_view(data)
+                pcm_bytes, success = pcm_memoryview(to_int16(resampler.process(samples), inplace=True)), True
+            else:
+                try:
+                    pcm_bytes, success = await _decode_audio(data, session_id, chunk_index, False, "audio/webm")
+                except HTTPException as e:
+                    await _ws_send(websocket, send_lock, {"type": "error", "detail": e.detail})
+                    continue
+                chunk_index += 1
+            
+            if not success:
+                await _ws_send(websocket, send_lock, {"type": "error", "detail": "音频处理失败"})
+                continue
+            pcm_bytes = _apply_vad(pcm_bytes, session_id) if pcm_bytes else pcm_bytes
+            if not pcm_bytes:
+                continue
+            
+            if stream is None:
+                stream = _TranslationStream(websocket, source_lang, target_lang, send_lock)
+                stream.start()
+                stream_reserved = False
+            await stream.push(pcm_bytes)
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"💥 WebSocket会话异常: {e}")
+        print(f"📋 详细错误: {traceback.format_exc()}")
+    finally:
+        if stream:
+            await stream.finish()
+        if stream_reserved:
+            _TranslationStream.unreserve(source_lang, target_lang)
+        await stream_decoders.close_session(session_id)
+        vad_sessions.drop(session_id)
+        metrics.IN_FLIGHT.labels("ws").dec()
+        print(f"🔌 WebSocket会话结束: {session_id}")
+
+def _local_health() -> dict:
+    """本 worker 的健康状态"""
+    connected = connection_pool.connected_count() > 0
+    breaker = connection_pool.breaker.stats()
+    
+    if breaker["state"] == CircuitBreaker.OPEN:
+        status = "unavailable"
+    elif connected and breaker["state"] == CircuitBreaker.CLOSED:
+        status = "healthy"
+    else:
+        status = "degraded"
+    
     return {
-        "status": "healthy" if connected else "degraded",
+        "status": status,
         "makawai_connected": connected,
-        "details": status_details
+        "circuit_breaker": breaker,
+        "details": connection_pool.stats(),
+        "keepalive": connection_supervisor.stats()
     }
 
-@app.get("/api/status")
-async def service_status():
-    """详细服务状态"""
+def _cluster_health(snapshots: List[dict]) -> dict:
+    """汇总各 worker 的健康状态：全部健康为 healthy，全部不可用为 unavailable，其余为 degraded"""
+    statuses = [snapshot["health"]["status"] for snapshot in snapshots]
+    if statuses and all(status == "unavailable" for status in statuses):
+        status = "unavailable"
+    elif len(statuses) == worker_cluster.workers and all(status == "healthy" for status in statuses):
+        status = "healthy"
+    else:
+        status = "degraded"
+    return {
+        "status": status,
+        "workers": worker_cluster.workers,
+        "alive": len(snapshots),
+        "serving_slot": worker_cluster.slot,
+        "items": [
+            {
+                "slot": snapshot["slot"],
+                "pid": snapshot["pid"],
+                "age": snapshot["age"],
+                "status": snapshot["health"]["status"],
+                "makawai_connected": snapshot["health"]["makawai_connected"],
+                "circuit_breaker": snapshot["health"]["circuit_breaker"]["state"],
+            }
+            for snapshot in snapshots
+        ],
+    }
+
+@app.get("/health")
+async def health_check():
+    """健康检查接口（多 worker 模式下 status 为所有 worker 的汇总）"""
+    health = _local_health()
+    if worker_cluster.enabled:
+        health["cluster"] = _cluster_health(worker_cluster.collect())
+        health["status"] = health["cluster"]["status"]
+    return health
+
+def _collect_component_metrics():
+    """把连接池与解码执行器的内部统计同步到指标"""
+    for pair, pool_stats in connection_pool.stats()["pools"].items():
+        source, target = pair.split("->", 1)
+        metrics.POOL_CONNECTIONS_OPENED.labels(source, target).set(pool_stats["opened"])
+        metrics.POOL_STALE_DISCARDS.labels(source, target).set(pool_stats["stale"])
+        metrics.POOL_CONNECT_FAILURES.labels(source, target).set(pool_stats["connect_failures"])
+        for state in ("idle", "in_use", "waiting"):
+            metrics.POOL_CONNECTIONS.labels(source, target, state).set(pool_stats[state])
+    
+    for pair, health in connection_supervisor.stats()["pairs"].items():
+        source, target = pair.split("->", 1)
+        metrics.UPSTREAM_HEALTHY.labels(source, target, "healthy").set(health["healthy"])
+        metrics.UPSTREAM_HEALTHY.labels(source, target, "unhealthy").set(health["unhealthy"])
+        if health["rtt_ms"]:
+            metrics.UPSTREAM_RTT.labels(source, target).set(sum(health["rtt_ms"]) / len(health["rtt_ms"]) / 1000)
+    
+    breaker = connection_pool.breaker.stats()
+    for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+        metrics.UPSTREAM_BREAKER_STATE.labels(state).set(1 if breaker["state"] == state else 0)
+    metrics.UPSTREAM_BREAKER_REJECTED.labels().set(breaker["rejected"])
+    
+    admission_stats = admission.stats()
+    metrics.ADMISSION_QUEUE.labels("active").set(admission_stats["active"])
+    metrics.ADMISSION_QUEUE.labels("queued").set(admission_stats["queued"])
+    
+    executor_stats = decode_executor.stats()
+    metrics.DECODE_QUEUE.labels("running").set(executor_stats["pending"] - executor_stats["queued"])
+    metrics.DECODE_QUEUE.labels("queued").set(executor_stats["queued"])
+    for reason, count in executor_stats["fallback_tones"].items():
+        metrics.FALLBACK_TONES.labels(reason).set(count)
+
+metrics.REGISTRY.add_collector(_collect_component_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 指标"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+def _check_admin(request: Request, token: Optional[str]):
+    """管理接口鉴权：配置了 ADMIN_TOKEN 时校验令牌，否则只允许本机访问"""
+    if service_config.ADMIN_TOKEN:
+        if token != service_config.ADMIN_TOKEN:
+            raise HTTPException(status_code=403, detail="管理令牌无效")
+        return
+    host = request.client.host if request.client else ""
+    if host not in ("127.0.0.1", "::1", "localhost", "testclient"):
+        raise HTTPException(status_code=403, detail="未配置 ADMIN_TOKEN 时只允许本机访问")
+
+@app.post("/admin/profile")
+async def profile_requests(
+    request: Request,
+    seconds: float = 10.0,
+    requests: Optional[int] = None,
+    top: int = 25,
+    format: str = "json",
+    allocations: bool = True,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    按需采样分析：在 seconds 秒内（或处理完 requests 个翻译请求后）
+    对线上请求做栈采样与 tracemalloc 快照
+    - format=collapsed 返回折叠栈文本，可直接用于 flamegraph.pl / speedscope
+    """
+    _check_admin(request, x_admin_token)
+    seconds = max(0.1, min(seconds, service_config.PROFILER_MAX_SECONDS))
+    print(f"🔬 开始采样分析: 最长 {seconds}s, 请求数上限 {requests}")
+    try:
+        report = await profiler.profile(seconds, max_requests=requests, top=top, include_allocations=allocations)
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="已有正在进行的采样")
+    print(f"🔬 采样结束: {report['samples']} 次采样, {report['requests']} 个请求")
+    
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(report["collapsed"]) + "\n")
+    return report
+
+@app.get("/api/audio/{result_id}")
+async def result_audio(request: Request, result_id: str, format: Optional[str] = None):
+    """
+    翻译结果的合成音频（二进制流）
+    - 默认按上游原格式返回（裸 PCM 加 WAV 头），支持 Range 请求
+    - format=opus / mp3 时经 ffmpeg 转码后分块输出
+    """
+    try:
+        return await audio_store.response(
+            result_id,
+            range_header=request.headers.get("range"),
+            audio_format=format,
+            ffmpeg_binary=service_config.FFMPEG_BINARY,
+        )
+    except AudioNotFoundError:
+        raise HTTPException(status_code=404, detail="音频不存在或已过期")
+    except UnsupportedTranscodeError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def _local_status() -> dict:
+    """本 worker 的详细状态（也是多 worker 模式下发布的快照内容）"""
     return {
         "service": "Voice Translation API",
         "version": "2.0.0",
         "audio_processor": {
             "sample_rate": audio_processor.sample_rate,
-            "supported_formats": ["webm", "wav", "pcm"]
+            "supported_formats": list(DECODABLE_FORMATS),
+            "format_stats": format_stats.stats()
+        },
+        "decode_executor": decode_executor.stats(),
+        "stream_decoders": stream_decoders.stats(),
+        "result_cache": {
+            "enabled": service_config.RESULT_CACHE_ENABLED,
+            **result_cache.stats()
+        },
+        "result_audio": audio_store.stats(),
+        "admission": admission.stats(),
+        "chunk_duration": chunk_controller.stats(),
+        "ws_streams": _TranslationStream.stats(),
+        "vad": {
+            "enabled": service_config.VAD_ENABLED,
+            "threshold_db": voice_detector.threshold_db,
+            "hangover_frames": voice_detector.hangover_frames,
+            "active_sessions": len(vad_sessions),
+            **vad_stats.stats()
         },
-        "supported_languages": ["zh", "en", "ja", "ko", "ru", "fr", "de", "es", "pt", "it"],
-        "health": await health_check()
+        "supported_languages": service_config.SUPPORTED_LANGUAGES,
+        "startup": startup_report.stats(lazy_import_times()),
+        "health": _local_health()
     }
 
+def _cluster_status(snapshots: List[dict]) -> dict:
+    """汇总各 worker 的资源占用"""
+    def _total(getter) -> int:
+        return sum(getter(snapshot) for snapshot in snapshots)
+    
+    return {
+        "workers": worker_cluster.workers,
+        "alive": len(snapshots),
+        "serving_slot": worker_cluster.slot,
+        "totals": {
+            "upstream_connections": _total(
+                lambda snapshot: sum(pool["size"] for pool in snapshot["health"]["details"]["pools"].values())
+            ),
+            "upstream_quota_per_pair": _total(lambda snapshot: snapshot["health"]["details"]["max_size"]),
+            "decode_workers": _total(lambda snapshot: snapshot["decode_executor"]["workers"]),
+            "decode_pending": _total(lambda snapshot: snapshot["decode_executor"]["pending"]),
+            "stream_sessions": _total(lambda snapshot: snapshot["stream_decoders"]["active_sessions"]),
+            "result_cache_entries": _total(lambda snapshot: snapshot["result_cache"]["entries"]),
+            "result_audio_entries": _total(lambda snapshot: snapshot["result_audio"]["entries"]),
+            "admission_active": _total(lambda snapshot: snapshot["admission"]["active"]),
+            "admission_queued": _total(lambda snapshot: snapshot["admission"]["queued"]),
+        },
+        "items": snapshots,
+    }
+
+@app.get("/api/chunk-duration")
+async def chunk_duration():
+    """建议的录音分片时长及其依据（近期固定开销、每秒音频处理耗时、各部分平均耗时）"""
+    return chunk_controller.stats()
+
+@app.get("/api/status")
+async def service_status():
+    """详细服务状态（多 worker 模式下附带 cluster 汇总）"""
+    status = _local_status()
+    if worker_cluster.enabled:
+        snapshots = worker_cluster.collect()
+        status["health"]["cluster"] = _cluster_health(snapshots)
+        status["health"]["status"] = status["health"]["cluster"]["status"]
+        status["cluster"] = _cluster_status(snapshots)
+    return status
+
+# 全局实例、路由等模块级初始化
+startup_report.mark("app")
+
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="语音翻译服务")
+    parser.add_argument("--host", default=service_config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=service_config.SERVICE_PORT)
+    parser.add_argument(
+        "--workers", type=int, default=service_config.SERVICE_WORKERS,
+        help="worker 进程数；大于 1 时为生产模式（预先 fork 的多进程，共享监听端口，不自动重载）",
+    )
+    args = parser.parse_args()
+    
+    if args.workers > 1 and 0 < service_config.UPSTREAM_MAX_CONNECTIONS < args.workers:
+        # 在 fork 之前拒绝：否则每个 worker 仍会各占 1 条连接，实际连接数超出上游配额
+        parser.error(
+            f"UPSTREAM_MAX_CONNECTIONS={service_config.UPSTREAM_MAX_CONNECTIONS} 少于 worker 数 {args.workers}，"
+            "请调大配额或减少 worker"
+        )
+    
     print("🚀 启动语音翻译服务...")
-    uvicorn.run(
-        "improved_index:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    if args.workers > 1:
+        # worker 进程重新导入本模块，通过环境变量获得 worker 数与端口（端口决定默认共享目录）
+        os.environ["SERVICE_WORKERS"] = str(args.workers)
+        os.environ["SERVICE_PORT"] = str(args.port)
+        print(f"🏭 生产模式: {args.workers} 个 worker")
+        uvicorn.run(
+            "improved_index:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "improved_index:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info"
+        )
@@ -1,53 +1,84 @@
 import asyncio
 import sys
 import os
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 import traceback
+import math
 
 # 1. 确保路径正确（防止 ModuleNotFoundError）
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from audio.improved_converter import AudioProcessor
-from adapter.makawaiAdapter import MakawaiClient
+from adapter.circuit_breaker import CircuitBreaker, CircuitOpenError
+from adapter.connection_pool import MakawaiConnectionPool, PoolConnectError, PoolTimeoutError, UnsupportedLanguageError
+from adapter.supervisor import ConnectionSupervisor
+from service.audio_store import AudioNotFoundError, ResultAudioStore, UnsupportedTranscodeError
+from config import service_config
 
 # 全局实例
-makawai_client = None
 audio_processor = AudioProcessor()
-# 使用弱引用避免循环引用问题
-import weakref
-_request_lock = None
+# 按语言对分组的上游连接池，替代全局单连接 + 全局锁
+connection_pool = MakawaiConnectionPool(
+    min_size=service_config.POOL_MIN_SIZE,
+    max_size=service_config.POOL_MAX_SIZE,
+    idle_timeout=service_config.POOL_IDLE_TIMEOUT,
+    acquire_timeout=service_config.POOL_ACQUIRE_TIMEOUT,
+    # 上游不可用时快速失败，并按指数退避在后台探测恢复
+    breaker=CircuitBreaker(
+        failure_threshold=service_config.BREAKER_FAILURE_THRESHOLD,
+        base_backoff=service_config.BREAKER_BASE_BACKOFF,
+        max_backoff=service_config.BREAKER_MAX_BACKOFF,
+        jitter=service_config.BREAKER_JITTER,
+    ),
+    languages=service_config.SUPPORTED_LANGUAGES,
+)
+# 后台保活：定期 ping 并补建断开的连接，请求路径不再 ping
+connection_supervisor = ConnectionSupervisor(
+    connection_pool,
+    interval=service_config.KEEPALIVE_INTERVAL,
+    ping_timeout=service_config.KEEPALIVE_TIMEOUT,
+    max_failures=service_config.KEEPALIVE_MAX_FAILURES,
+)
 
-def get_request_lock():
-    global _request_lock
-    if _request_lock is None:
-        _request_lock = asyncio.Lock()
-    return _request_lock
+# 合成音频短期存储，客户端通过 audio_url 获取二进制音频
+audio_store = ResultAudioStore(
+    ttl=service_config.RESULT_AUDIO_TTL,
+    max_entries=service_config.RESULT_AUDIO_MAX_ENTRIES,
+    max_bytes=service_config.RESULT_AUDIO_MAX_BYTES,
+    pcm_sample_rate=service_config.RESULT_AUDIO_SAMPLE_RATE,
+)
+
+async def _warmup_upstream():
+    if await connection_pool.warmup(source_lang="zh", target_lang="en"):
+        print("DEBUG: Makawai 连接成功")
+    else:
+        # 即使连接失败也继续启动，熔断器会在后台按退避节奏重新连接
+        print("DEBUG: Makawai 连接失败，将在后台重新连接")
 
 # 2. 定义生命周期管理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global makawai_client
-    # 启动时：连接 API
+    # 启动时：预热连接池
     print("DEBUG: 正在启动并连接 Makawai 服务...")
+    await connection_pool.start()
+    await connection_supervisor.start()
+    # 预热在后台进行，不阻塞启动
+    warmup_task = asyncio.create_task(_warmup_upstream())
+    yield
+    # 关闭时：断开全部连接
+    warmup_task.cancel()
     try:
-        makawai_client = MakawaiClient()
-        await makawai_client.connect(source_lang="zh", target_lang="en")
-        print("DEBUG: Makawai 连接成功")
+        await warmup_task
+    except asyncio.CancelledError:
+        pass
+    await connection_supervisor.close()
+    try:
+        await connection_pool.close()
     except Exception as e:
-        print(f"DEBUG: Makawai 连接失败: {e}")
-        print(f"DEBUG: 详细错误信息: {traceback.format_exc()}")
-        # 即使连接失败也继续启动，后续请求会重新尝试连接
-        makawai_client = None
-    yield
-    # 关闭时：断开连接
-    if makawai_client and makawai_client.ws:
-        try:
-            await makawai_client.close()
-        except Exception as e:
-            print(f"DEBUG: 关闭 Makawai 连接时出错: {e}")
+        print(f"DEBUG: 关闭 Makawai 连接时出错: {e}")
     print("DEBUG: 应用已关闭")
 
 # 3. 初始化 App（只定义一次！）
@@ -68,147 +99,129 @@ async def translate_audio(
         source_lang: str = Form("zh"),
         target_lang: str = Form("en")
 ):
-    global makawai_client
-    
     # 记录请求信息
     print(f"🌐 收到翻译请求 - 源语言: {source_lang}, 目标语言: {target_lang}")
     print(f"📁 音频文件名: {audio_chunk.filename if audio_chunk else '未知'}")
-    
-    # 使用锁防止并发请求冲突
-    async with get_request_lock():
-
-        try:
-            print(f"DEBUG: 收到翻译请求 - 源语言: {source_lang}, 目标语言: {target_lang}")
-
-            # 检查文件
-            if not audio_chunk or not audio_chunk.filename:
-                raise HTTPException(status_code=400, detail="未提供音频文件")
-
-            content = await audio_chunk.read()
-            print(f"DEBUG: 接收到音频数据大小: {len(content)} 字节")
-
-            if len(content) == 0:
-                raise HTTPException(status_code=400, detail="音频文件为空")
-
-            # 音频处理 - 符合API规范
-            print("DEBUG: 开始音频处理...")
-            pcm_bytes, success = audio_processor.webm_to_pcm(content)
-            if not success:
-                raise HTTPException(status_code=400, detail="音频质量不符合要求")
-            print(f"DEBUG: 处理后PCM数据大小: {len(pcm_bytes)} 字节")
-
-            # 检查连接状态，必要时重新连接
-            connection_valid = False
-            max_retries = 3
-            retry_count = 0
-
-            while retry_count < max_retries and not connection_valid:
-                if makawai_client and makawai_client.ws:
-                    # 检查连接是否有效
-                    try:
-                        if hasattr(makawai_client.ws, 'open'):
-                            connection_valid = makawai_client.ws.open
-                        else:
-                            # 如果没有open属性，尝试发送ping来测试连接
-                            try:
-                                await makawai_client.ws.ping()
-                                connection_valid = True
-                            except:
-                                connection_valid = False
-                    except Exception as e:
-                        print(f"DEBUG: 连接状态检查失败: {e}")
-                        connection_valid = False
-
-                if not connection_valid:
-                    retry_count += 1
-                    print(f"DEBUG: Makawai 连接无效，尝试重新连接... (第{retry_count}次)")
-                    try:
-                        if makawai_client:
-                            await makawai_client.close()
-                        makawai_client = MakawaiClient()
-                        await makawai_client.connect(source_lang=source_lang, target_lang=target_lang)
-                        print("DEBUG: Makawai 重新连接成功")
-                        connection_valid = True
-                    except Exception as e:
-                        print(f"DEBUG: Makawai 重新连接失败: {e}")
-                        if retry_count >= max_retries:
-                            raise HTTPException(status_code=500, detail=f"Makawai 连接失败: {str(e)}")
-                        # 等待一段时间再重试
-                        await asyncio.sleep(1)
-
-            # 转发音频数据
-            print("DEBUG: 发送音频到 Makawai...")
+
+    try:
+        print(f"DEBUG: 收到翻译请求 - 源语言: {source_lang}, 目标语言: {target_lang}")
+
+        # 检查文件
+        if not audio_chunk or not audio_chunk.filename:
+            raise HTTPException(status_code=400, detail="未提供音频文件")
+        if not connection_pool.supports(source_lang, target_lang):
+            raise HTTPException(status_code=400, detail=f"不支持的语言对: {source_lang}→{target_lang}")
+
+        content = await audio_chunk.read()
+        print(f"DEBUG: 接收到音频数据大小: {len(content)} 字节")
+
+        if len(content) == 0:
+            raise HTTPException(status_code=400, detail="音频文件为空")
+
+        # 音频处理 - 符合API规范
+        print("DEBUG: 开始音频处理...")
+        pcm_bytes, success = audio_processor.webm_to_pcm(content, audio_chunk.content_type)
+        if not success:
+            raise HTTPException(status_code=400, detail="音频质量不符合要求")
+        print(f"DEBUG: 处理后PCM数据大小: {len(pcm_bytes)} 字节")
+
+        # 从连接池借出连接；发送失败时换一条新连接重试一次
+        max_attempts = 2
+        for attempt in range(max_attempts):
+            try:
+                client = await connection_pool.acquire(source_lang, target_lang)
+            except PoolTimeoutError:
+                raise HTTPException(status_code=503, detail="翻译服务繁忙，请稍后重试")
+            except CircuitOpenError as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail="翻译服务暂不可用，请稍后重试",
+                    headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+                )
+            except PoolConnectError as e:
+                raise HTTPException(status_code=500, detail=f"Makawai 连接失败: {str(e)}")
+            except UnsupportedLanguageError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
             try:
-                await makawai_client.send_audio(pcm_bytes)
+                print("DEBUG: 发送音频到 Makawai...")
+                await client.send_audio(pcm_bytes)
             except Exception as e:
-                print(f"DEBUG: 发送音频到Makawai失败: {e}")
-                # 如果发送失败，尝试重新连接后重试一次
-                try:
-                    if makawai_client:
-                        await makawai_client.close()
-                    makawai_client = MakawaiClient()
-                    await makawai_client.connect(source_lang=source_lang, target_lang=target_lang)
-                    print("DEBUG: 重新连接后再次尝试发送音频...")
-                    await makawai_client.send_audio(pcm_bytes)
-                except Exception as retry_e:
-                    print(f"DEBUG: 重试发送也失败: {retry_e}")
-                    raise HTTPException(status_code=500, detail=f"发送音频失败: {str(retry_e)}")
+                print(f"DEBUG: 发送音频到Makawai失败 (第{attempt + 1}次): {e}")
+                await connection_pool.release(client, discard=True)
+                if attempt + 1 >= max_attempts:
+                    raise HTTPException(status_code=500, detail=f"发送音频失败: {str(e)}")
+                continue
 
             # 获取翻译结果
-            print("DEBUG: 等待 Makawai 响应...")
-            result = await makawai_client.receive_result()
+            try:
+                print("DEBUG: 等待 Makawai 响应...")
+                result = await client.receive_result()
+            except BaseException:
+                await connection_pool.release(client, discard=True)
+                raise
+            await connection_pool.release(client, discard=result.get("status") != "success")
             print(f"DEBUG: Makawai 返回结果 -> {result}")
+            break
+
+        # 检查结果状态
+        result_status = result.get("status", "unknown")
+        if result_status == "error":
+            error_msg = result.get('error_message', result.get('translation', '未知错误'))
+            raise HTTPException(status_code=500, detail=f"翻译服务错误: {error_msg}")
+        elif result_status == "empty_result":
+            error_msg = result.get('error_message', '未检测到可翻译内容')
+            raise HTTPException(status_code=400, detail=f"音频处理失败: {error_msg}")
+        elif result_status == "timeout":
+            raise HTTPException(status_code=504, detail="翻译服务超时")
+
+        response = {
+            "status": "success",
+            "translation": result.get("translation", ""),
+            "original": result.get("original", ""),
+            # 音频不放进 JSON，改为通过 audio_url 获取
+            "history_record": {key: value for key, value in result.items() if key != "audio_bytes"}
+        }
+        result_id = audio_store.put(result["audio_bytes"]) if result.get("audio_bytes") else None
+        if result_id:
+            response["result_id"] = result_id
+            response["audio_url"] = f"/api/audio/{result_id}"
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_msg = f"翻译失败: {str(e)}"
+        print(f"DEBUG: {error_msg}")
+        print(f"DEBUG: 详细错误信息: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
 
-            # 检查结果状态
-            result_status = result.get("status", "unknown")
-            if result_status == "error":
-                error_msg = result.get('error_message', result.get('translation', '未知错误'))
-                raise HTTPException(status_code=500, detail=f"翻译服务错误: {error_msg}")
-            elif result_status == "empty_result":
-                error_msg = result.get('error_message', '未检测到可翻译内容')
-                raise HTTPException(status_code=400, detail=f"音频处理失败: {error_msg}")
-            elif result_status == "timeout":
-                raise HTTPException(status_code=504, detail="翻译服务超时")
-
-            return {
-                "status": "success",
-                "translation": result.get("translation", ""),
-                "original": result.get("original", ""),
-                "history_record": result
-            }
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            error_msg = f"翻译失败: {str(e)}"
-            print(f"DEBUG: {error_msg}")
-            print(f"DEBUG: 详细错误信息: {traceback.format_exc()}")
-            # 确保释放锁
-            raise HTTPException(status_code=500, detail=error_msg)
-        # 锁会在async with块结束时自动释放
+# 合成音频（二进制流，支持 Range，format=opus/mp3 时转码）
+@app.get("/api/audio/{result_id}")
+async def result_audio(request: Request, result_id: str, format: str = None):
+    try:
+        return await audio_store.response(
+            result_id,
+            range_header=request.headers.get("range"),
+            audio_format=format,
+            ffmpeg_binary=service_config.FFMPEG_BINARY,
+        )
+    except AudioNotFoundError:
+        raise HTTPException(status_code=404, detail="音频不存在或已过期")
+    except UnsupportedTranscodeError as e:
+        raise HTTPException(status_code=406, detail=str(e))
 
 # 健康检查端点
 @app.get("/health")
 async def health_check():
-    # 更准确的连接状态检测
-    connected = False
-    if makawai_client and makawai_client.ws:
-        try:
-            if hasattr(makawai_client.ws, 'open'):
-                connected = makawai_client.ws.open
-            else:
-                # 尝试ping测试
-                try:
-                    await makawai_client.ws.ping()
-                    connected = True
-                except:
-                    connected = False
-        except Exception:
-            connected = False
-    
+    # 连接状态以连接池为准，不再对上游发起ping
+    breaker = connection_pool.breaker.stats()
     return {
-        "status": "healthy",
-        "makawai_connected": connected
+        "status": "unavailable" if breaker["state"] == CircuitBreaker.OPEN else "healthy",
+        "makawai_connected": connection_pool.connected_count() > 0,
+        "circuit_breaker": breaker,
+        "pool": connection_pool.stats(),
+        "keepalive": connection_supervisor.stats()
     }
 
 if __name__ == "__main__":
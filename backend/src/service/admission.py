@@ -0,0 +1,280 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+
+# 优先级类别
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+# 每个类别保留最近多少次排队耗时用于计算 p95
+_WAIT_SAMPLES = 256
+
+
+class AdmissionRejectedError(Exception):
+    """请求未被接纳（排队已满或预计等待超出预算），retry_after 为建议的重试秒数"""
+
+    def __init__(self, reason: str, retry_after: float, priority: str = PRIORITY_INTERACTIVE):
+        super().__init__(f"请求未被接纳: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.priority = priority
+
+
+class PriorityClass:
+    """一个优先级类别的排队状态：按客户端分组的等待者与加权公平调度的进度"""
+
+    def __init__(self, name: str, weight: float, max_wait: float, max_queue: int):
+        if weight <= 0:
+            raise ValueError("weight 必须大于 0")
+        self.name = name
+        self.weight = weight
+        self.max_wait = max_wait
+        # 本类别最多占用的排队位置（同时受全局 max_queue 约束）
+        self.max_queue = max_queue
+        # 客户端 -> 排队中的等待者；字典顺序即类内轮转顺序
+        self.queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.queued = 0
+        # 虚拟完成时间：每分配一个名额前进 1 / weight，总是先服务最小的类别
+        self.pass_value = 0.0
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected: Dict[str, int] = {}
+        self.waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.admitted += 1
+        self.waits.append(seconds)
+        self.wait_sum += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def stats(self) -> Dict[str, object]:
+        recent = sorted(self.waits)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "weight": self.weight,
+            "max_wait": self.max_wait,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "queued_clients": len(self.queues),
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+            "avg_wait_ms": round(self.wait_sum / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 1),
+            "max_wait_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class AdmissionController:
+    """
+    请求准入控制与优先级调度
+    - 同时处理的请求数上限为 max_active，其余请求按优先级类别排队；排队总数（max_queue）、bulk 类别的排队数
+      （bulk_max_queue，应小于 max_queue，剩余位置留给 interactive）与单个客户端的排队数均有上限
+    - 按平均处理耗时预估排队等待，超出该类别等待预算的请求立即拒绝，不让其排到客户端超时
+    - 空出的名额在类别之间按权重加权公平分配（stride 调度）：interactive 权重高，总是先于 bulk 得到名额，
+      bulk 仍按权重比例前进，不会饿死
+    - 同一类别内按客户端轮转分配，一个客户端排再多请求也只占一份
+    - max_active 为 0 时不做限制
+    """
+
+    # 拒绝原因
+    QUEUE_FULL = "queue_full"
+    CLIENT_QUEUE_FULL = "client_queue_full"
+    WAIT_BUDGET = "wait_budget"
+    WAIT_TIMEOUT = "wait_timeout"
+
+    def __init__(
+        self,
+        max_active: int = 8,
+        max_queue: int = 32,
+        max_queue_per_client: int = 4,
+        max_wait: float = 5.0,
+        bulk_max_wait: float = 60.0,
+        bulk_max_queue: int = 24,
+        interactive_weight: float = 8.0,
+        bulk_weight: float = 1.0,
+        service_time_alpha: float = 0.2,
+    ):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.service_time_alpha = service_time_alpha
+        self.classes: Dict[str, PriorityClass] = {
+            PRIORITY_INTERACTIVE: PriorityClass(PRIORITY_INTERACTIVE, interactive_weight, max_wait, max_queue),
+            PRIORITY_BULK: PriorityClass(PRIORITY_BULK, bulk_weight, bulk_max_wait, min(bulk_max_queue, max_queue)),
+        }
+        self._active = 0
+        self._queued = 0
+        # 最近一次分配名额时的虚拟时间，空闲后重新开始排队的类别从这里起算，不能攒下空闲期的份额
+        self._virtual_time = 0.0
+        # 单个请求平均占用名额的秒数（指数滑动平均）
+        self._service_time: Optional[float] = None
+        self._max_queued_seen = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_active > 0
+
+    def _backlogged_weight(self, including: PriorityClass) -> float:
+        return sum(cls.weight for cls in self.classes.values() if cls.queued or cls is including)
+
+    def estimated_wait(self, priority: str = PRIORITY_INTERACTIVE, position: Optional[int] = None) -> float:
+        """
+        排在该类别第 position 位（默认队尾之后）的请求预计等待秒数
+        该类别按权重只分得 weight / 排队类别权重之和 的名额
+        """
+        cls = self.classes[priority]
+        if position is None:
+            position = cls.queued + 1
+        if self._service_time is None:
+            return 0.0
+        share = cls.weight / self._backlogged_weight(cls)
+        return self._service_time * position / (self.max_active * share)
+
+    def _reject(self, cls: PriorityClass, reason: str, retry_after: Optional[float] = None):
+        cls.rejected[reason] = cls.rejected.get(reason, 0) + 1
+        if retry_after is None:
+            retry_after = self.estimated_wait(cls.name)
+        raise AdmissionRejectedError(reason, max(1.0, retry_after), cls.name)
+
+    async def acquire(self, client: str, priority: str = PRIORITY_INTERACTIVE) -> float:
+        """取得处理名额，返回排队等待的秒数；未被接纳时抛出 AdmissionRejectedError"""
+        cls = self.classes[priority]
+        if self._active < self.max_active and self._queued == 0:
+            self._active += 1
+            self._charge(cls)
+            cls.record_wait(0.0)
+            return 0.0
+
+        if self._queued >= self.max_queue or cls.queued >= cls.max_queue:
+            self._reject(cls, self.QUEUE_FULL)
+        queue = cls.queues.get(client)
+        if queue is not None and len(queue) >= self.max_queue_per_client:
+            self._reject(cls, self.CLIENT_QUEUE_FULL)
+        # 类内轮转：该客户端已排队 k 个时，新请求前面每个排队客户端各有约 k + 1 个请求
+        ahead = len(queue) if queue else 0
+        clients = len(cls.queues) + (0 if queue else 1)
+        position = min(cls.queued + 1, (ahead + 1) * clients)
+        estimated = self.estimated_wait(priority, position)
+        if estimated > cls.max_wait:
+            self._reject(cls, self.WAIT_BUDGET, estimated)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        if cls.queued == 0:
+            cls.pass_value = max(cls.pass_value, self._virtual_time)
+        if queue is None:
+            queue = cls.queues[client] = deque()
+        queue.append(waiter)
+        cls.queued += 1
+        cls.queued_total += 1
+        self._queued += 1
+        self._max_queued_seen = max(self._max_queued_seen, self._queued)
+        started = loop.time()
+        try:
+            await asyncio.wait_for(waiter, cls.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已分配但等待者已放弃，归还名额
+                self.release()
+            else:
+                self._discard_waiter(cls, client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(cls, self.WAIT_TIMEOUT)
+            raise
+        waited = loop.time() - started
+        cls.record_wait(waited)
+        return waited
+
+    def _discard_waiter(self, cls: PriorityClass, client: str, waiter: asyncio.Future):
+        queue = cls.queues.get(client)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        cls.queued -= 1
+        self._queued -= 1
+        if not queue:
+            del cls.queues[client]
+
+    def _charge(self, cls: PriorityClass):
+        """类别得到一个名额：虚拟时间推进到该类别的进度，类别进度前进 1 / weight"""
+        cls.pass_value = max(cls.pass_value, self._virtual_time)
+        self._virtual_time = cls.pass_value
+        cls.pass_value += 1.0 / cls.weight
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """按加权公平调度选出类别，再在类别内按客户端轮转取出等待者"""
+        backlogged = [cls for cls in self.classes.values() if cls.queued]
+        if not backlogged:
+            return None
+        cls = min(backlogged, key=lambda item: item.pass_value)
+        self._charge(cls)
+
+        client, queue = next(iter(cls.queues.items()))
+        waiter = queue.popleft()
+        cls.queued -= 1
+        self._queued -= 1
+        if queue:
+            # 本客户端还有等待者，排到轮转末尾
+            cls.queues.move_to_end(client)
+        else:
+            del cls.queues[client]
+        return waiter
+
+    def release(self, service_time: Optional[float] = None):
+        """归还名额并唤醒下一个等待者"""
+        self._active -= 1
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += self.service_time_alpha * (service_time - self._service_time)
+        while self._active < self.max_active:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            self._active += 1
+
+    @asynccontextmanager
+    async def admit(self, client: str, priority: str = PRIORITY_INTERACTIVE):
+        """在名额内执行，yield 排队等待的秒数"""
+        if not self.enabled:
+            yield 0.0
+            return
+        waited = await self.acquire(client, priority)
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, object]:
+        classes = {name: cls.stats() for name, cls in self.classes.items()}
+        rejected: Dict[str, int] = {}
+        for cls in self.classes.values():
+            for reason, count in cls.rejected.items():
+                rejected[reason] = rejected.get(reason, 0) + count
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "max_active": self.max_active,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "max_queue_per_client": self.max_queue_per_client,
+            "max_queued_seen": self._max_queued_seen,
+            "avg_service_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            "admitted": sum(cls.admitted for cls in self.classes.values()),
+            "rejected": rejected,
+            "classes": classes,
+        }
@@ -0,0 +1,403 @@
+import asyncio
+import os
+import re
+import secrets
+import shutil
+import struct
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+from audio.format_detect import (
+    FORMAT_FLAC, FORMAT_MP3, FORMAT_MP4, FORMAT_OGG, FORMAT_WAV, FORMAT_WEBM, detect_format,
+)
+
+
+# 上游返回的带容器音频按原格式提供，无容器的裸 PCM 加 WAV 头后提供
+_CONTENT_TYPES = {
+    FORMAT_WAV: "audio/wav",
+    FORMAT_MP3: "audio/mpeg",
+    FORMAT_OGG: "audio/ogg",
+    FORMAT_WEBM: "audio/webm",
+    FORMAT_FLAC: "audio/flac",
+    FORMAT_MP4: "audio/mp4",
+}
+
+# 可选的转码格式：名称 -> (ffmpeg 输出参数, Content-Type)
+TRANSCODE_FORMATS: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "opus": (("-c:a", "libopus", "-b:a", "24k", "-f", "ogg"), "audio/ogg"),
+    "mp3": (("-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3"), "audio/mpeg"),
+}
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# secrets.token_urlsafe 生成的 result_id 字符集，共享目录中按此校验文件名
+_RESULT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+# 每写入多少条音频清理一次共享目录中过期的文件（包括已退出 worker 留下的文件）
+_SHARED_SWEEP_EVERY = 64
+
+
+class AudioNotFoundError(Exception):
+    """result_id 不存在或音频已过期"""
+
+
+class UnsupportedTranscodeError(Exception):
+    """不支持的转码格式或服务端没有 ffmpeg"""
+
+
+class RangeNotSatisfiableError(Exception):
+    """Range 请求超出音频长度"""
+
+
+def _wav_header(data_size: int, sample_rate: int) -> bytes:
+    """16-bit 单声道 PCM 的 44 字节 WAV 头"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size,
+    )
+
+
+class StoredAudio:
+    """
+    一条翻译结果的合成音频
+    - parts 为依次拼接的数据段（裸 PCM 时为 WAV 头 + PCM），读取时按段切片，不拼接复制
+    - variants 缓存转码后的完整结果，之后的请求（包括 Range）直接复用
+    """
+
+    __slots__ = ("result_id", "parts", "size", "content_type", "expires_at", "variants")
+
+    def __init__(self, result_id: str, parts: List[bytes], content_type: str, expires_at: float):
+        self.result_id = result_id
+        self.parts = parts
+        self.size = sum(len(part) for part in parts)
+        self.content_type = content_type
+        self.expires_at = expires_at
+        self.variants: Dict[str, bytes] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """原始音频与转码结果占用的总字节数"""
+        return self.size + sum(len(data) for data in self.variants.values())
+
+    def iter_range(self, start: int, end: int, chunk_size: int = STREAM_CHUNK_SIZE):
+        """按块输出 [start, end] 闭区间内的字节（memoryview 切片）"""
+        offset = 0
+        for part in self.parts:
+            part_end = offset + len(part)
+            if part_end > start and offset <= end:
+                view = memoryview(part)[max(0, start - offset):min(len(part), end + 1 - offset)]
+                for i in range(0, len(view), chunk_size):
+                    yield view[i:i + chunk_size]
+            offset = part_end
+
+
+class ResultAudioStore:
+    """
+    翻译结果音频的短期存储
+    - 按随机 result_id 寻址，客户端凭 /api/audio/{result_id} 直接取二进制音频，不经 JSON/base64
+    - 条目数与总字节数均有上限，按写入顺序淘汰；过期条目在访问/写入时清理
+    - 多 worker 模式下配置 shared_dir：音频同时写入本机共享目录，
+      请求落到其他 worker 时从共享目录读取（只读，不计入该 worker 的上限）
+    """
+
+    def __init__(
+        self,
+        ttl: float = 120.0,
+        max_entries: int = 256,
+        max_bytes: int = 32 * 1024 * 1024,
+        pcm_sample_rate: int = 16000,
+        shared_dir: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # 上游返回裸 PCM 时的采样率
+        self.pcm_sample_rate = pcm_sample_rate
+        self.shared_dir = shared_dir or None
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, StoredAudio]" = OrderedDict()
+        self._bytes = 0
+        self._stored = 0
+        self._served = 0
+        self._misses = 0
+        self._evictions = 0
+        self._transcodes = 0
+        self._shared_hits = 0
+
+    def put(self, audio_bytes: bytes) -> Optional[str]:
+        """保存音频并返回 result_id；超过字节上限的单条音频不保存"""
+        audio_format = detect_format(audio_bytes)
+        content_type = _CONTENT_TYPES.get(audio_format)
+        if content_type is None:
+            parts = [_wav_header(len(audio_bytes), self.pcm_sample_rate), audio_bytes]
+            content_type = _CONTENT_TYPES[FORMAT_WAV]
+        else:
+            parts = [audio_bytes]
+
+        result_id = secrets.token_urlsafe(12)
+        entry = StoredAudio(result_id, parts, content_type, time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return None
+
+        self._entries[result_id] = entry
+        self._bytes += entry.size
+        self._stored += 1
+        if self.shared_dir:
+            self._write_shared(entry)
+            if self._stored % _SHARED_SWEEP_EVERY == 0:
+                self._sweep_shared()
+        self._evict()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[StoredAudio]:
+        """查询音频，不存在或已过期时返回 None"""
+        entry = self._entries.get(result_id)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(result_id)
+            entry = None
+        if entry is None and result_id not in self._entries:
+            entry = self._load_shared(result_id)
+        if entry is None:
+            self._misses += 1
+        return entry
+
+    def contains(self, result_id: str) -> bool:
+        entry = self._entries.get(result_id)
+        if entry is not None:
+            return entry.expires_at > time.monotonic()
+        return self._shared_remaining(result_id) > 0
+
+    def add_variant(self, entry: StoredAudio, audio_format: str, data: bytes):
+        """缓存转码结果（条目已被淘汰时忽略）"""
+        if audio_format in entry.variants or self._entries.get(entry.result_id) is not entry:
+            return
+        entry.variants[audio_format] = data
+        self._bytes += len(data)
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if oldest.expires_at <= now:
+                self._remove(oldest_key)
+            elif len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(oldest_key)
+                self._evictions += 1
+            else:
+                break
+
+    def _remove(self, result_id: str):
+        entry = self._entries.pop(result_id)
+        self._bytes -= entry.nbytes
+        if self.shared_dir:
+            try:
+                os.unlink(os.path.join(self.shared_dir, result_id))
+            except OSError:
+                pass
+
+    def _write_shared(self, entry: StoredAudio):
+        """原子写入共享目录，文件修改时间即写入时间"""
+        path = os.path.join(self.shared_dir, entry.result_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for part in entry.parts:
+                    f.write(part)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 合成音频写入共享目录失败: {e}")
+
+    def _shared_remaining(self, result_id: str) -> float:
+        """共享目录中音频的剩余有效秒数，不存在时返回 0"""
+        if not self.shared_dir or not _RESULT_ID_PATTERN.match(result_id):
+            return 0.0
+        try:
+            mtime = os.stat(os.path.join(self.shared_dir, result_id)).st_mtime
+        except OSError:
+            return 0.0
+        # 跨进程比较使用墙钟时间
+        return mtime + self.ttl - time.time()
+
+    def _load_shared(self, result_id: str) -> Optional[StoredAudio]:
+        """读取其他 worker 保存的音频"""
+        remaining = self._shared_remaining(result_id)
+        if remaining <= 0:
+            return None
+        try:
+            with open(os.path.join(self.shared_dir, result_id), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        content_type = _CONTENT_TYPES.get(detect_format(data), _CONTENT_TYPES[FORMAT_WAV])
+        self._shared_hits += 1
+        return StoredAudio(result_id, [data], content_type, time.monotonic() + remaining)
+
+    def _sweep_shared(self):
+        now = time.time()
+        try:
+            names = os.listdir(self.shared_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.shared_dir, name)
+            try:
+                if os.stat(path).st_mtime + self.ttl < now:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "stored": self._stored,
+            "served": self._served,
+            "transcodes": self._transcodes,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "shared_hits": self._shared_hits,
+        }
+
+    async def response(
+        self,
+        result_id: str,
+        range_header: Optional[str] = None,
+        audio_format: Optional[str] = None,
+        ffmpeg_binary: str = "ffmpeg",
+    ) -> Response:
+        """
+        构造音频响应
+        - 原始格式或已缓存的转码结果：支持单段 Range（206 / 416）
+        - 首次转码：ffmpeg 边转边以分块传输输出，完成后缓存转码结果
+        """
+        entry = self.get(result_id)
+        if entry is None:
+            raise AudioNotFoundError(result_id)
+
+        if audio_format and audio_format not in entry.variants:
+            if audio_format not in TRANSCODE_FORMATS:
+                raise UnsupportedTranscodeError(f"不支持的音频格式: {audio_format}")
+            if shutil.which(ffmpeg_binary) is None:
+                raise UnsupportedTranscodeError("服务端没有 ffmpeg，无法转码")
+            self._served += 1
+            self._transcodes += 1
+            return StreamingResponse(
+                self._transcode(entry, audio_format, ffmpeg_binary),
+                media_type=TRANSCODE_FORMATS[audio_format][1],
+                headers={"Cache-Control": "private, no-store", "Accept-Ranges": "none"},
+            )
+
+        if audio_format:
+            data = entry.variants[audio_format]
+            source = StoredAudio(entry.result_id, [data], TRANSCODE_FORMATS[audio_format][1], entry.expires_at)
+        else:
+            source = entry
+
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Cache-Control": f"private, max-age={max(0, int(entry.expires_at - time.monotonic()))}",
+        }
+        try:
+            byte_range = parse_range(range_header, source.size)
+        except RangeNotSatisfiableError:
+            headers["Content-Range"] = f"bytes */{source.size}"
+            return Response(status_code=416, headers=headers)
+
+        self._served += 1
+        if byte_range is None:
+            start, end, status_code = 0, source.size - 1, 200
+        else:
+            (start, end), status_code = byte_range, 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{source.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            source.iter_range(start, end),
+            status_code=status_code,
+            media_type=source.content_type,
+            headers=headers,
+        )
+
+    async def _transcode(self, entry: StoredAudio, audio_format: str, ffmpeg_binary: str) -> AsyncIterator[bytes]:
+        """ffmpeg 转码并边转边输出，完整转码后缓存结果"""
+        output_args, _ = TRANSCODE_FORMATS[audio_format]
+        proc = await asyncio.create_subprocess_exec(
+            shutil.which(ffmpeg_binary),
+            "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0", "-ac", "1", *output_args, "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+        async def _feed():
+            try:
+                for chunk in entry.iter_range(0, entry.size - 1):
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+
+        feeder = asyncio.create_task(_feed())
+        output = bytearray()
+        try:
+            while True:
+                data = await proc.stdout.read(STREAM_CHUNK_SIZE)
+                if not data:
+                    break
+                output.extend(data)
+                yield data
+            await feeder
+            if await proc.wait() == 0 and output:
+                self.add_variant(entry, audio_format, bytes(output))
+            else:
+                print(f"⚠️ 音频转码失败 ({audio_format}, exit {proc.returncode})")
+        finally:
+            feeder.cancel()
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 头，返回 [start, end] 闭区间
+    没有 Range、格式不支持、多段请求或结束位置小于起始位置（无效的 Range 头）时返回 None（返回完整内容）；
+    起始位置超出长度时抛出 RangeNotSatisfiableError
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # 后缀形式：最后 N 个字节
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiableError(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(header)
+    if end is None:
+        end = size - 1
+    return start, min(end, size - 1)
@@ -0,0 +1,101 @@
+from typing import Dict, Optional
+
+
+class ChunkDurationController:
+    """
+    根据近期分片的处理耗时推荐录音分片时长
+    - 每个分片的服务端耗时按 latency = overhead + cost × duration 建模（指数衰减加权的最小二乘），
+      overhead 为与时长无关的固定开销（排队、借出连接、解码启动、上游往返），cost 为每秒音频的处理耗时
+    - 分片越短固定开销占比越高：推荐满足 overhead ≤ overhead_ratio × duration 的最短时长
+    - 处理速度必须跟得上录音（latency ≤ duration）：cost < 1 时 duration ≥ overhead / (1 - cost)，否则取上限
+    - 排队等待计入 overhead，服务端负载升高时推荐值随之变大
+    - 结果限制在 [min_ms, max_ms] 并按 step_ms 取整，样本不足时返回 default_ms
+    """
+
+    def __init__(
+        self,
+        min_ms: int = 500,
+        max_ms: int = 4000,
+        default_ms: int = 1500,
+        overhead_ratio: float = 0.25,
+        decay: float = 0.95,
+        min_samples: int = 5,
+        step_ms: int = 100,
+    ):
+        if overhead_ratio <= 0:
+            raise ValueError("overhead_ratio 必须大于 0")
+        self.min_ms = min_ms
+        self.max_ms = max(min_ms, max_ms)
+        self.default_ms = min(self.max_ms, max(min_ms, default_ms))
+        self.overhead_ratio = overhead_ratio
+        self.decay = decay
+        self.min_samples = min_samples
+        self.step_ms = max(1, step_ms)
+        self.samples = 0
+        # 衰减加权的回归累加量：权重、Σx、Σy、Σx²、Σxy（x 为分片秒数，y 为耗时秒数）
+        self._w = 0.0
+        self._x = 0.0
+        self._y = 0.0
+        self._xx = 0.0
+        self._xy = 0.0
+        # 无法区分固定开销与按时长的开销时（分片时长几乎不变）沿用上次的斜率
+        self._cost = 0.0
+        self._overhead: Optional[float] = None
+        # 各部分耗时的滑动平均（秒），只用于展示
+        self._breakdown: Dict[str, float] = {}
+        self._recommended = self.default_ms
+
+    def observe(self, duration: float, latency: float, **breakdown: float):
+        """记录一个分片：音频时长与服务端处理耗时（秒）；breakdown 为各部分耗时，如 decode / queue / upstream"""
+        if duration <= 0 or latency < 0:
+            return
+        self.samples += 1
+        decay = self.decay
+        self._w = self._w * decay + 1.0
+        self._x = self._x * decay + duration
+        self._y = self._y * decay + latency
+        self._xx = self._xx * decay + duration * duration
+        self._xy = self._xy * decay + duration * latency
+        alpha = 1.0 - decay
+        for name, seconds in breakdown.items():
+            previous = self._breakdown.get(name)
+            self._breakdown[name] = seconds if previous is None else previous + alpha * (seconds - previous)
+        self._fit()
+
+    def _fit(self):
+        mean_x = self._x / self._w
+        mean_y = self._y / self._w
+        var_x = self._xx / self._w - mean_x * mean_x
+        # 分片时长的差异小于 50ms 时斜率不可信
+        if var_x > 0.05 ** 2:
+            cov = self._xy / self._w - mean_x * mean_y
+            self._cost = max(0.0, cov / var_x)
+        self._overhead = min(mean_y, max(0.0, mean_y - self._cost * mean_x))
+        if self.samples < self.min_samples:
+            return
+
+        if self._cost >= 1.0:
+            # 处理比录音慢，只能用最长的分片摊薄固定开销
+            target = self.max_ms / 1000
+        else:
+            target = max(self._overhead / self.overhead_ratio, self._overhead / (1.0 - self._cost))
+        recommended = int(round(target * 1000 / self.step_ms)) * self.step_ms
+        self._recommended = min(self.max_ms, max(self.min_ms, recommended))
+
+    def recommended_ms(self) -> int:
+        return self._recommended
+
+    def stats(self) -> Dict[str, object]:
+        mean_latency = self._y / self._w if self._w else None
+        return {
+            "recommended_ms": self._recommended,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "default_ms": self.default_ms,
+            "overhead_ratio": self.overhead_ratio,
+            "samples": self.samples,
+            "overhead_ms": round(self._overhead * 1000, 1) if self._overhead is not None else None,
+            "cost_per_audio_second": round(self._cost, 4),
+            "latency_ms": round(mean_latency * 1000, 1) if mean_latency is not None else None,
+            "breakdown_ms": {name: round(seconds * 1000, 1) for name, seconds in self._breakdown.items()},
+        }
@@ -0,0 +1,451 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 默认延迟分桶（秒），覆盖从毫秒级解码到数十秒的上游超时
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+# 取值来自客户端输入的标签：不在已知取值中的一律记为 "other"，任意输入不能制造无限多的时间序列
+CLIENT_LABELS = ("source_lang", "target_lang")
+OTHER_LABEL_VALUE = "other"
+# 已知语言（空字符串为未区分语言的阶段）；None 表示未配置，全部记为 "other"
+_known_languages: Optional[frozenset] = None
+
+
+def set_known_languages(languages: Iterable[str]):
+    """配置语言标签允许的取值，应在记录指标之前调用"""
+    global _known_languages
+    _known_languages = frozenset(languages) | {""}
+
+
+def language_label(value: str) -> str:
+    if _known_languages is not None and value in _known_languages:
+        return value
+    return OTHER_LABEL_VALUE if value else value
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """指标基类：按标签值分组保存样本"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._client_label_positions = tuple(
+            index for index, name in enumerate(self.labelnames) if name in CLIENT_LABELS
+        )
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+
+    def _label_values(self, args: tuple, kwargs: dict) -> LabelValues:
+        if args and kwargs:
+            raise ValueError("标签只能全部按位置或全部按名称传入")
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in args)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        if self._client_label_positions:
+            values = tuple(
+                language_label(value) if index in self._client_label_positions else value
+                for index, value in enumerate(values)
+            )
+        return values
+
+    def labels(self, *args, **kwargs):
+        values = self._label_values(args, kwargs)
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._new_child()
+                self._children[values] = child
+            return child
+
+    def _default_child(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} 带有标签，请先调用 labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Tuple[str, List[str], List[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class _ValueChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            yield "", list(self.labelnames), list(values), child.value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default_child().dec(amount)
+
+    def set(self, value: float):
+        self._default_child().set(value)
+
+    @contextmanager
+    def track_inprogress(self, *args, **kwargs):
+        """进入时 +1，退出时 -1"""
+        child = self.labels(*args, **kwargs) if (args or kwargs) else self._default_child()
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            yield "", list(self.labelnames), list(values), child.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        bounds = sorted(float(b) for b in buckets)
+        if not bounds or bounds[-1] != math.inf:
+            bounds.append(math.inf)
+        self.buckets = tuple(bounds)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default_child().observe(value)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        names = list(self.labelnames)
+        for values, child in children:
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(child.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", names + ["le"], list(values) + [_format_value(bound)], cumulative
+            yield "_sum", names, list(values), total
+            yield "_count", names, list(values), count
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    - 指标在模块加载时注册，/metrics 请求时按注册顺序输出 Prometheus 文本格式
+    - collector 回调在输出前执行，用于把各组件的 stats() 同步到指标
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ 指标采集失败: {e}")
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+# 翻译流水线各阶段耗时
+STAGE_DURATION = REGISTRY.histogram(
+    "translate_stage_duration_seconds",
+    "Duration of each translate pipeline stage",
+    ("stage", "source_lang", "target_lang"),
+)
+REQUESTS = REGISTRY.counter(
+    "translate_requests_total",
+    "Translate requests by outcome",
+    ("source_lang", "target_lang", "outcome"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "translate_in_flight_requests",
+    "Translate requests currently being processed",
+    ("endpoint",),
+)
+UPSTREAM_RESULTS = REGISTRY.counter(
+    "upstream_results_total",
+    "Upstream receive_result outcomes (success, error, timeout, closed)",
+    ("source_lang", "target_lang", "status"),
+)
+DECODER_PATH = REGISTRY.counter(
+    "audio_decoder_path_total",
+    "Decoder chosen for each uploaded chunk",
+    ("path", "format"),
+)
+VAD_SKIPPED = REGISTRY.counter(
+    "vad_skipped_chunks_total",
+    "Chunks dropped by VAD as silence",
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "result_cache_lookups_total",
+    "Translation result cache lookups",
+    ("result",),
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "admission_wait_seconds",
+    "Time requests spent queued in the admission scheduler by priority class",
+    ("class",),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total",
+    "Requests rejected by the admission controller with 429",
+    ("reason",),
+)
+# 以下指标由 collector 在输出前从各组件的 stats() 同步
+FALLBACK_TONES = REGISTRY.counter(
+    "audio_fallback_tone_total",
+    "Decoded chunks replaced by the synthetic test tone",
+    ("reason",),
+)
+POOL_CONNECTIONS_OPENED = REGISTRY.counter(
+    "upstream_connections_opened_total",
+    "Upstream connections (re)established by the pool",
+    ("source_lang", "target_lang"),
+)
+POOL_STALE_DISCARDS = REGISTRY.counter(
+    "upstream_stale_connections_total",
+    "Idle connections discarded because the health check failed",
+    ("source_lang", "target_lang"),
+)
+POOL_CONNECT_FAILURES = REGISTRY.counter(
+    "upstream_connect_failures_total",
+    "Failed attempts to open an upstream connection",
+    ("source_lang", "target_lang"),
+)
+POOL_CONNECTIONS = REGISTRY.gauge(
+    "upstream_pool_connections",
+    "Upstream pool connections by state",
+    ("source_lang", "target_lang", "state"),
+)
+UPSTREAM_RTT = REGISTRY.gauge(
+    "upstream_ping_rtt_seconds",
+    "Mean keepalive ping round trip time of upstream connections",
+    ("source_lang", "target_lang"),
+)
+UPSTREAM_HEALTHY = REGISTRY.gauge(
+    "upstream_connections_healthy",
+    "Upstream connections by keepalive health",
+    ("source_lang", "target_lang", "health"),
+)
+UPSTREAM_BREAKER_STATE = REGISTRY.gauge(
+    "upstream_circuit_state",
+    "Upstream circuit breaker state (1 for the current state)",
+    ("state",),
+)
+UPSTREAM_BREAKER_REJECTED = REGISTRY.counter(
+    "upstream_circuit_rejected_total",
+    "Upstream calls rejected while the circuit breaker was open",
+)
+DECODE_QUEUE = REGISTRY.gauge(
+    "audio_decode_tasks",
+    "Decode executor tasks by state",
+    ("state",),
+)
+ADMISSION_QUEUE = REGISTRY.gauge(
+    "admission_requests",
+    "Requests held by the admission controller by state (active, queued)",
+    ("state",),
+)
+
+
+# 当前请求各阶段耗时 [(阶段, 秒)]，由中间件创建，用于生成 Server-Timing 响应头
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def begin_request_timing() -> List[Tuple[str, float]]:
+    """为当前请求开始记录阶段耗时，返回记录列表"""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[List[Tuple[str, float]]]:
+    """当前请求已记录的阶段耗时（未开始记录时为 None）"""
+    return _request_timings.get()
+
+
+def merge_timings(timings: List[Tuple[str, float]]) -> Dict[str, float]:
+    """按阶段累加耗时（秒），保持首次出现的顺序"""
+    merged: Dict[str, float] = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    return merged
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """生成 Server-Timing 头：stage;dur=毫秒，同名阶段累加"""
+    merged = merge_timings(timings)
+    if total is not None:
+        merged["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items())
+
+
+def record_stage(stage: str, seconds: float, source_lang: str = "", target_lang: str = ""):
+    """记录一个已测得的阶段耗时（直方图 + 当前请求的 Server-Timing）"""
+    STAGE_DURATION.labels(stage, source_lang, target_lang).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage: str, source_lang: str = "", target_lang: str = ""):
+    """记录一个流水线阶段的耗时（直方图 + 当前请求的 Server-Timing）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, source_lang, target_lang)
+
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as _StackCounter
+from typing import Dict, List, Optional
+
+
+class ProfilerBusyError(Exception):
+    """已有正在进行的采样"""
+
+
+class _SamplingThread(threading.Thread):
+    """按固定间隔采样所有线程的调用栈（不含自身）"""
+
+    def __init__(self, interval: float, max_depth: int):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: "_StackCounter[str]" = _StackCounter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        """调用栈折叠为 "线程;外层;...;内层" 形式（flamegraph.pl / speedscope 可直接读取）"""
+        frames: List[str] = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ProfileSession:
+    """单次采样：在时间窗口内或处理完指定数量的请求后结束"""
+
+    def __init__(self, max_requests: Optional[int]):
+        self.max_requests = max_requests
+        self.requests_seen = 0
+        self.done = asyncio.Event()
+
+    def request_finished(self):
+        self.requests_seen += 1
+        if self.max_requests and self.requests_seen >= self.max_requests:
+            self.done.set()
+
+
+class OnDemandProfiler:
+    """
+    按需采样分析器
+    - 栈采样线程周期性读取 sys._current_frames()，无需以特殊参数重启服务
+    - 同时开启 tracemalloc，结束时返回分配量最高的代码行
+    - 同一时刻只允许一次采样
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, tracemalloc_frames: int = 8):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.tracemalloc_frames = tracemalloc_frames
+        self._session: Optional[ProfileSession] = None
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def request_finished(self):
+        """请求处理完成时调用，用于按请求数结束采样"""
+        if self._session is not None:
+            self._session.request_finished()
+
+    async def profile(
+        self,
+        seconds: float,
+        max_requests: Optional[int] = None,
+        top: int = 25,
+        include_allocations: bool = True,
+    ) -> Dict[str, object]:
+        """采样直至超时或处理完 max_requests 个请求"""
+        if self._session is not None:
+            raise ProfilerBusyError("已有正在进行的采样")
+
+        session = ProfileSession(max_requests)
+        self._session = session
+        sampler = _SamplingThread(self.interval, self.max_depth)
+        started_tracemalloc = False
+        if include_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            started_tracemalloc = True
+
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            try:
+                await asyncio.wait_for(session.done.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            sampler.stop()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            snapshot = tracemalloc.take_snapshot() if include_allocations and tracemalloc.is_tracing() else None
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._session = None
+
+        elapsed = time.perf_counter() - start
+        return {
+            "duration": round(elapsed, 3),
+            "requests": session.requests_seen,
+            "samples": sampler.samples,
+            "interval": self.interval,
+            "collapsed": [f"{stack} {count}" for stack, count in sampler.stacks.most_common()],
+            "top_allocations": self._top_allocations(snapshot, top) if snapshot else [],
+        }
+
+    @staticmethod
+    def _top_allocations(snapshot: "tracemalloc.Snapshot", top: int) -> List[Dict[str, object]]:
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        results = []
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            results.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            })
+        return results
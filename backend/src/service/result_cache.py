@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TranslationResultCache:
+    """
+    翻译结果缓存（按内容寻址）
+    - 键为 PCM 数据与语言对的 BLAKE2b 摘要，相同音频直接返回上次的翻译结果
+    - 内存中按 LRU 淘汰，条目数与总字节数均有上限，过期条目在访问/写入时清理
+    - 可选持久化到本地 SQLite 文件，服务重启后仍可命中
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl: float = 600.0,
+        persist_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persist_path = persist_path or None
+        # key -> (过期时间, 估算字节数, 结果)
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if self.persist_path:
+            self._open_store()
+
+    @staticmethod
+    def make_key(pcm_bytes: bytes, source_lang: str, target_lang: str) -> str:
+        """PCM 与语言对的摘要"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{source_lang}->{target_lang}\0".encode("utf-8"))
+        digest.update(pcm_bytes)
+        return digest.hexdigest()
+
+    def _open_store(self):
+        try:
+            self._db = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            print(f"💾 翻译结果缓存持久化到: {self.persist_path}")
+        except sqlite3.Error as e:
+            print(f"⚠️ 无法打开结果缓存文件 {self.persist_path}: {e}，仅使用内存缓存")
+            self._db = None
+
+    def get(self, key: str) -> Optional[dict]:
+        """查询缓存，未命中或已过期时返回 None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, _, result = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return result
+            self._remove(key)
+            self._expirations += 1
+
+        result = self._load(key, now)
+        if result is not None:
+            self._disk_hits += 1
+            self._hits += 1
+            return result
+
+        self._misses += 1
+        return None
+
+    def put(self, key: str, result: dict):
+        """写入缓存（超过字节上限的单个结果不缓存）"""
+        encoded = json.dumps(result, ensure_ascii=False)
+        size = len(key) + len(encoded.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.time() + self.ttl
+        self._insert(key, expires_at, size, result)
+        if self._db is not None:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, encoded, expires_at),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ 结果缓存写入失败: {e}")
+
+    def _insert(self, key: str, expires_at: float, size: int, result: dict):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, size, result)
+        self._bytes += size
+
+        # 先清理已过期的最久未用条目，再按 LRU 淘汰直到满足上限
+        now = time.time()
+        while self._entries:
+            oldest_key, (oldest_expires, _, _) = next(iter(self._entries.items()))
+            if oldest_expires <= now:
+                self._remove(oldest_key)
+                self._expirations += 1
+            elif len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(oldest_key)
+                self._evictions += 1
+            else:
+                break
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _load(self, key: str, now: float) -> Optional[dict]:
+        """从持久化存储读取，命中时放回内存"""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT result, expires_at FROM results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ 结果缓存读取失败: {e}")
+            return None
+        if row is None:
+            return None
+        encoded, expires_at = row
+        result = json.loads(encoded)
+        self._insert(key, expires_at, len(key) + len(encoded.encode("utf-8")), result)
+        return result
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, object]:
+        """缓存命中统计"""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "persistent": self._db is not None,
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
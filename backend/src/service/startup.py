@@ -0,0 +1,63 @@
+import importlib
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+
+class StartupReport:
+    """
+    进程启动耗时报告
+    - imports：逐个计时导入的重量级依赖（毫秒，含其依赖链）
+    - phases：启动各阶段耗时，每次 mark 记录距上一次 mark 的时间
+    - time_to_ready：从创建报告到开始接受请求的总耗时
+    - warmup：后台预热上游连接的结果，不计入就绪时间
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._last_mark = self._started
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready: Optional[float] = None
+        self.warmup_status = "pending"
+        self.warmup_elapsed: Optional[float] = None
+
+    def timed_import(self, name: str) -> ModuleType:
+        """导入模块并记录耗时；已导入的模块不重复计时"""
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports.setdefault(name, time.perf_counter() - start)
+        return module
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        self._last_mark = now
+
+    def mark_ready(self) -> float:
+        """标记开始接受请求，返回就绪耗时（秒）"""
+        self.mark("lifespan")
+        self.ready = self._last_mark - self._started
+        return self.ready
+
+    def warmup_finished(self, status: str, elapsed: float):
+        self.warmup_status = status
+        self.warmup_elapsed = elapsed
+
+    def stats(self, lazy_imports: Optional[Dict[str, float]] = None) -> Dict[str, object]:
+        def _ms(seconds: float) -> float:
+            return round(seconds * 1000, 1)
+
+        return {
+            "started_at": round(self.started_at, 3),
+            "ready": self.ready is not None,
+            "time_to_ready_ms": _ms(self.ready) if self.ready is not None else None,
+            "phases_ms": {phase: _ms(seconds) for phase, seconds in self.phases.items()},
+            "imports_ms": {name: _ms(seconds) for name, seconds in self.imports.items()},
+            "lazy_imports_ms": {name: _ms(seconds) for name, seconds in (lazy_imports or {}).items()},
+            "warmup": {
+                "status": self.warmup_status,
+                "elapsed_ms": _ms(self.warmup_elapsed) if self.warmup_elapsed is not None else None,
+            },
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import fcntl
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def default_cluster_dir(port: int) -> str:
+    """多 worker 共享目录：优先使用 /dev/shm（内存文件系统）"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"makawai-translate-{port}")
+
+
+def split_quota(total: int, workers: int, slot: int) -> int:
+    """
+    把总配额平均分给各 worker，余数分给序号靠前的 worker，各 worker 之和等于总配额
+    总配额少于 worker 数时抛出 ValueError：每个 worker 至少需要 1 条，向上取整会超出配额
+    """
+    if total < workers:
+        raise ValueError(f"上游连接总配额 {total} 少于 worker 数 {workers}，每个 worker 至少需要 1 条连接")
+    share, remainder = divmod(total, workers)
+    return share + (1 if slot < remainder else 0)
+
+
+class WorkerCluster:
+    """
+    多 worker 模式下的本机协调（各 worker 为独立进程，模块全局对象互不共享）
+    - 槽位：worker 启动时在共享目录中对 slot-N.lock 加 flock 独占锁取得序号，进程退出时内核自动释放，
+      重启的 worker 接管空出的槽位
+    - 状态：各 worker 定期把状态快照原子写入 worker-N.json，任一 worker 读取全部快照汇总
+    """
+
+    def __init__(self, workers: int, directory: str, publish_interval: float = 2.0):
+        self.workers = workers
+        self.directory = directory
+        self.publish_interval = publish_interval
+        self.slot: Optional[int] = None
+        self._lock_file = None
+        self._snapshot: Optional[Callable[[], Dict]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def claim_slot(self) -> int:
+        """取得空闲槽位序号；所有槽位都被占用时抛出 RuntimeError"""
+        os.makedirs(self.directory, exist_ok=True)
+        for slot in range(self.workers):
+            lock_file = open(os.path.join(self.directory, f"slot-{slot}.lock"), "a+")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            self.slot = slot
+            return slot
+        raise RuntimeError(f"{self.directory} 中的 {self.workers} 个 worker 槽位均已被占用")
+
+    def quota(self, total: int) -> int:
+        """本 worker 分得的配额"""
+        return split_quota(total, self.workers, self.slot or 0)
+
+    async def start(self, snapshot: Callable[[], Dict]):
+        """开始定期发布状态快照"""
+        self._snapshot = snapshot
+        self.publish()
+        self._task = asyncio.create_task(self._publish_loop())
+
+    async def _publish_loop(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"⚠️ worker {self.slot} 状态发布失败: {e}")
+
+    def _snapshot_path(self, slot: int) -> str:
+        return os.path.join(self.directory, f"worker-{slot}.json")
+
+    def local_snapshot(self) -> Dict:
+        return {
+            "slot": self.slot,
+            "pid": os.getpid(),
+            "updated_at": time.time(),
+            **self._snapshot(),
+        }
+
+    def publish(self):
+        """原子写入本 worker 的快照（先写临时文件再 rename，读取方不会读到半截内容）"""
+        path = self._snapshot_path(self.slot)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.local_snapshot(), f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def collect(self) -> List[Dict]:
+        """
+        读取所有 worker 的快照（本 worker 使用实时快照）
+        超过 3 个发布周期未更新的快照视为已退出的 worker，不计入
+        """
+        now = time.time()
+        snapshots = []
+        for slot in range(self.workers):
+            if slot == self.slot:
+                snapshot = self.local_snapshot()
+            else:
+                try:
+                    with open(self._snapshot_path(slot)) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if now - snapshot.get("updated_at", 0) > self.publish_interval * 3:
+                    continue
+            snapshot["age"] = round(now - snapshot["updated_at"], 3)
+            snapshots.append(snapshot)
+        return snapshots
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.slot is not None:
+            try:
+                os.unlink(self._snapshot_path(self.slot))
+            except OSError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 后端模块以 backend/src 为导入根目录（与 python src/improved_index.py 启动时一致）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,256 @@
+import asyncio
+
+import pytest
+
+from service.admission import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    AdmissionController,
+    AdmissionRejectedError,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _enqueue(controller, client, priority, order, label):
+    await controller.acquire(client, priority)
+    order.append(label)
+
+
+async def _drain(controller, order, count):
+    """逐个归还名额，按分配顺序收集被唤醒的请求"""
+    for _ in range(count):
+        before = len(order)
+        controller.release()
+        while len(order) == before:
+            await asyncio.sleep(0)
+
+
+def test_admits_directly_below_max_active():
+    async def scenario():
+        controller = AdmissionController(max_active=2)
+        assert await controller.acquire("a") == 0.0
+        assert await controller.acquire("b") == 0.0
+        stats = controller.stats()
+        assert stats["active"] == 2
+        assert stats["queued"] == 0
+
+    _run(scenario())
+
+
+def test_round_robin_between_clients_within_a_class():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queue_per_client=8)
+        await controller.acquire("holder")
+        order = []
+        tasks = [asyncio.create_task(_enqueue(controller, "busy", PRIORITY_INTERACTIVE, order, f"busy{i}")) for i in range(3)]
+        tasks += [asyncio.create_task(_enqueue(controller, "quiet", PRIORITY_INTERACTIVE, order, "quiet0"))]
+        await asyncio.sleep(0)
+
+        await _drain(controller, order, 4)
+        await asyncio.gather(*tasks)
+        # 后到的 quiet 不必等 busy 的全部请求
+        assert order == ["busy0", "quiet0", "busy1", "busy2"]
+
+    _run(scenario())
+
+
+def test_global_queue_cap():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queue=2, max_queue_per_client=8)
+        await controller.acquire("holder")
+        tasks = [asyncio.create_task(controller.acquire(f"c{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("c2")
+        assert rejected.value.reason == AdmissionController.QUEUE_FULL
+        assert rejected.value.retry_after >= 1.0
+        assert controller.stats()["queued"] == 2
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert controller.stats()["queued"] == 0
+
+    _run(scenario())
+
+
+def test_per_client_queue_cap():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queue_per_client=2)
+        await controller.acquire("holder")
+        tasks = [asyncio.create_task(controller.acquire("tab")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("tab")
+        assert rejected.value.reason == AdmissionController.CLIENT_QUEUE_FULL
+        # 其他客户端不受影响
+        tasks.append(asyncio.create_task(controller.acquire("other")))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 3
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    _run(scenario())
+
+
+def test_wait_budget_rejects_before_queueing():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_wait=0.5)
+        async with controller.admit("warm"):
+            pass
+        # 平均处理耗时 2 秒，排队预计超过 0.5 秒的预算
+        controller._service_time = 2.0
+        await controller.acquire("holder")
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("late")
+        assert rejected.value.reason == AdmissionController.WAIT_BUDGET
+        assert rejected.value.retry_after >= 2.0
+        assert controller.stats()["queued"] == 0
+
+    _run(scenario())
+
+
+def test_wait_timeout_removes_waiter():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_wait=0.05)
+        await controller.acquire("holder")
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("slow")
+        assert rejected.value.reason == AdmissionController.WAIT_TIMEOUT
+        stats = controller.stats()
+        assert stats["queued"] == 0
+        assert stats["active"] == 1
+
+        # 超时的等待者不占用名额，下一个请求直接得到名额
+        controller.release()
+        assert await controller.acquire("next") == 0.0
+        assert controller.stats()["active"] == 1
+
+    _run(scenario())
+
+
+def test_cancelled_waiter_is_discarded():
+    async def scenario():
+        controller = AdmissionController(max_active=1)
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("gone"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.stats()["queued"] == 0
+
+        controller.release()
+        assert controller.stats()["active"] == 0
+
+    _run(scenario())
+
+
+def test_slot_granted_to_cancelled_waiter_is_returned():
+    async def scenario():
+        controller = AdmissionController(max_active=1)
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("gone"))
+        await asyncio.sleep(0)
+
+        # 名额已分配给等待者，但等待者在被唤醒前被取消
+        controller.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        else:
+            # 部分 Python 版本的 wait_for 在结果已就绪时忽略取消，此时名额归调用方所有
+            controller.release()
+        stats = controller.stats()
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+
+    _run(scenario())
+
+
+def test_admit_releases_on_error():
+    async def scenario():
+        controller = AdmissionController(max_active=1)
+        with pytest.raises(RuntimeError):
+            async with controller.admit("a"):
+                raise RuntimeError("boom")
+        assert controller.stats()["active"] == 0
+
+    _run(scenario())
+
+
+def test_disabled_when_max_active_is_zero():
+    async def scenario():
+        controller = AdmissionController(max_active=0)
+        assert not controller.enabled
+        async with controller.admit("a") as waited:
+            async with controller.admit("a") as nested:
+                assert waited == nested == 0.0
+        assert controller.stats()["active"] == 0
+
+    _run(scenario())
+
+
+def test_interactive_jumps_ahead_of_queued_bulk_without_starving_it():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queue=64, max_queue_per_client=64, bulk_max_queue=64)
+        await controller.acquire("holder", PRIORITY_BULK)
+        order = []
+        tasks = [asyncio.create_task(_enqueue(controller, "bulk", PRIORITY_BULK, order, f"b{i}")) for i in range(4)]
+        tasks += [
+            asyncio.create_task(_enqueue(controller, "mic", PRIORITY_INTERACTIVE, order, f"i{i}")) for i in range(20)
+        ]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 24
+
+        await _drain(controller, order, 24)
+        await asyncio.gather(*tasks)
+        # 先排队的 bulk 让位给 interactive，但按 8:1 的权重每 9 个名额仍分到一个
+        bulk_positions = [index for index, label in enumerate(order) if label.startswith("b")]
+        assert all(label.startswith("i") for label in order[:9])
+        assert bulk_positions[:2] == [9, 18]
+        assert [label for label in order if label.startswith("b")] == ["b0", "b1", "b2", "b3"]
+
+    _run(scenario())
+
+
+def test_global_queue_cap_and_bulk_cap():
+    async def scenario():
+        controller = AdmissionController(max_active=1, max_queue=3, bulk_max_queue=2, max_queue_per_client=8)
+        await controller.acquire("holder")
+        tasks = [asyncio.create_task(controller.acquire(f"b{i}", PRIORITY_BULK)) for i in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("b2", PRIORITY_BULK)
+        assert rejected.value.reason == AdmissionController.QUEUE_FULL
+        assert rejected.value.priority == PRIORITY_BULK
+
+        # bulk 已满，剩余的位置仍留给 interactive
+        tasks.append(asyncio.create_task(controller.acquire("mic", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 3
+
+        # 排队总数达到 max_queue 后任何类别都被拒绝
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await controller.acquire("mic2", PRIORITY_INTERACTIVE)
+        assert rejected.value.reason == AdmissionController.QUEUE_FULL
+        assert rejected.value.retry_after >= 1.0
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert controller.stats()["queued"] == 0
+
+    _run(scenario())
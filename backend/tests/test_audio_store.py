@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from service.audio_store import RangeNotSatisfiableError, ResultAudioStore, parse_range
+
+
+def test_parse_range_single_ranges():
+    assert parse_range("bytes=2-5", 10) == (2, 5)
+    assert parse_range("bytes=3-", 10) == (3, 9)
+    assert parse_range("bytes=-4", 10) == (6, 9)
+    # 结束位置超出长度时截断
+    assert parse_range("bytes=8-100", 10) == (8, 9)
+    assert parse_range("bytes=-100", 10) == (0, 9)
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-1", "bytes=0-1,4-5", "bytes=abc", "bytes=x-2", "bytes=5-2"])
+def test_parse_range_ignored_headers_serve_full_content(header):
+    assert parse_range(header, 10) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=10-12", "bytes=10-", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, 10)
+
+
+def _status(store, result_id, range_header):
+    return asyncio.run(store.response(result_id, range_header)).status_code
+
+
+def test_response_status_for_range_requests():
+    store = ResultAudioStore()
+    result_id = store.put(b"\x00\x01" * 50)
+    size = store.get(result_id).size
+
+    assert _status(store, result_id, None) == 200
+    assert _status(store, result_id, "bytes=0-9") == 206
+    # 无效的 Range 头忽略，返回完整内容
+    assert _status(store, result_id, "bytes=5-2") == 200
+    assert _status(store, result_id, f"bytes={size}-") == 416
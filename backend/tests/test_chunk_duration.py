@@ -0,0 +1,74 @@
+import pytest
+
+from service.chunk_duration import ChunkDurationController
+
+
+def _feed(controller, overhead, cost, durations=(0.5, 1.0, 1.5, 2.0, 3.0), rounds=4):
+    for _ in range(rounds):
+        for duration in durations:
+            controller.observe(duration, overhead + cost * duration)
+
+
+def test_default_until_enough_samples():
+    controller = ChunkDurationController(default_ms=1500, min_samples=5)
+    for _ in range(4):
+        controller.observe(1.0, 2.0)
+    assert controller.recommended_ms() == 1500
+    controller.observe(1.0, 2.0)
+    assert controller.recommended_ms() != 1500
+
+
+def test_fits_overhead_and_cost():
+    controller = ChunkDurationController()
+    _feed(controller, overhead=0.3, cost=0.1)
+    stats = controller.stats()
+    assert stats["overhead_ms"] == pytest.approx(300, abs=1)
+    assert stats["cost_per_audio_second"] == pytest.approx(0.1, abs=1e-3)
+    # 固定开销不超过分片时长的 25%：0.3 / 0.25 = 1.2 秒
+    assert controller.recommended_ms() == 1200
+
+
+def test_must_keep_up_with_recording():
+    controller = ChunkDurationController(overhead_ratio=0.9)
+    _feed(controller, overhead=0.6, cost=0.5)
+    # overhead / (1 - cost) = 1.2 秒，大于 overhead / ratio
+    assert controller.recommended_ms() == 1200
+
+
+def test_slower_than_realtime_uses_max():
+    controller = ChunkDurationController(max_ms=4000)
+    _feed(controller, overhead=0.1, cost=1.2)
+    assert controller.recommended_ms() == 4000
+
+
+def test_recommendation_is_clamped_and_rounded():
+    controller = ChunkDurationController(min_ms=500, step_ms=100)
+    _feed(controller, overhead=0.01, cost=0.05)
+    assert controller.recommended_ms() == 500
+
+    controller = ChunkDurationController(max_ms=3000)
+    _feed(controller, overhead=2.0, cost=0.1)
+    assert controller.recommended_ms() == 3000
+
+
+def test_constant_duration_attributes_latency_to_overhead():
+    controller = ChunkDurationController()
+    for _ in range(10):
+        controller.observe(1.0, 0.2, decode=0.05, upstream=0.15)
+    stats = controller.stats()
+    assert stats["cost_per_audio_second"] == 0.0
+    assert stats["overhead_ms"] == pytest.approx(200, abs=1)
+    assert stats["breakdown_ms"] == {"decode": 50.0, "upstream": 150.0}
+    assert controller.recommended_ms() == 800
+
+
+def test_invalid_samples_are_ignored():
+    controller = ChunkDurationController()
+    controller.observe(0.0, 1.0)
+    controller.observe(1.0, -1.0)
+    assert controller.stats()["samples"] == 0
+
+
+def test_overhead_ratio_must_be_positive():
+    with pytest.raises(ValueError):
+        ChunkDurationController(overhead_ratio=0)
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from adapter.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _breaker(**kwargs):
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("base_backoff", 10.0)
+    kwargs.setdefault("jitter", 0.0)
+    return CircuitBreaker(**kwargs)
+
+
+def test_trips_after_threshold_and_rejects():
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record_failure()
+        breaker.allow()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.allow()
+    assert 0 < rejected.value.retry_after <= 10.0
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failure_count():
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = _breaker(failure_threshold=1)
+    breaker.record_failure()
+    breaker.opened_until = 0.0
+
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    # 探测被取消时归还名额
+    breaker.release()
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_opens == 0
+    breaker.allow()
+    breaker.allow()
+
+
+def test_half_open_failure_reopens_with_longer_backoff():
+    breaker = _breaker(failure_threshold=1, base_backoff=1.0, max_backoff=3.0)
+    breaker.record_failure()
+    first = breaker.retry_after()
+
+    for expected in (2.0, 3.0):
+        breaker.opened_until = 0.0
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        # 退避时间翻倍，不超过 max_backoff
+        assert breaker.retry_after() == pytest.approx(expected, abs=0.05)
+    assert first == pytest.approx(1.0, abs=0.05)
+    assert breaker.consecutive_opens == 3
+    assert breaker.stats()["total_opens"] == 3
+
+
+def test_jitter_stays_within_backoff():
+    breaker = _breaker(failure_threshold=1, base_backoff=4.0, jitter=0.5)
+    breaker.record_failure()
+    assert 2.0 - 0.05 <= breaker.retry_after() <= 4.0
+
+
+def test_probe_loop_closes_breaker_on_success():
+    async def scenario():
+        calls = []
+
+        async def probe():
+            calls.append(breaker.state)
+            return True
+
+        breaker = _breaker(failure_threshold=1, base_backoff=0.05, probe=probe)
+        breaker.record_failure()
+        await asyncio.wait_for(breaker._probe_task, 1.0)
+        assert calls == [CircuitBreaker.OPEN]
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.consecutive_opens == 0
+
+    _run(scenario())
+
+
+def test_probe_loop_backs_off_when_probe_fails_without_state_change():
+    async def scenario():
+        calls = []
+
+        async def probe():
+            # 探测失败但没有经过 allow / record_failure
+            calls.append(breaker.state)
+            return False
+
+        breaker = _breaker(failure_threshold=1, base_backoff=0.1, max_backoff=10.0, probe=probe)
+        breaker.record_failure()
+        await asyncio.sleep(0.5)
+        await breaker.close()
+        # 0.1 + 0.2 秒后各探测一次，下一次在 0.7 秒；空转时会探测约 8 次
+        assert len(calls) <= 3
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.consecutive_opens >= 2
+
+    _run(scenario())
+
+
+def test_no_probe_task_without_event_loop():
+    async def probe():
+        return True
+
+    breaker = _breaker(failure_threshold=1, probe=probe)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker._probe_task is None
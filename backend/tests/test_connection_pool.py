@@ -0,0 +1,284 @@
+import asyncio
+
+import pytest
+
+from adapter.circuit_breaker import CircuitBreaker, CircuitOpenError
+from adapter.connection_pool import (
+    MakawaiConnectionPool,
+    PoolConnectError,
+    PoolTimeoutError,
+    UnsupportedLanguageError,
+)
+
+
+class FakeClient:
+    """只实现连接池用到的接口，不访问网络"""
+
+    # 设为 False 时 connect 失败
+    accept = True
+    created = 0
+
+    def __init__(self):
+        FakeClient.created += 1
+        self.source_lang = None
+        self.target_lang = None
+        self.healthy = True
+        self.connected = False
+        self.closed = False
+
+    async def connect(self, source_lang, target_lang):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.connected = FakeClient.accept
+        return self.connected
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_client():
+    FakeClient.accept = True
+    FakeClient.created = 0
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _pool_stats(pool, key="zh->en"):
+    return pool.stats()["pools"][key]
+
+
+def test_acquire_release_accounting():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=2, client_factory=FakeClient)
+        first = await pool.acquire("zh", "en")
+        second = await pool.acquire("zh", "en")
+        assert first is not second
+        assert _pool_stats(pool)["size"] == 2
+        assert _pool_stats(pool)["in_use"] == 2
+
+        await pool.release(first)
+        stats = _pool_stats(pool)
+        assert (stats["size"], stats["idle"], stats["in_use"]) == (2, 1, 1)
+
+        # 空闲连接被复用，不新建
+        again = await pool.acquire("zh", "en")
+        assert again is first
+        assert FakeClient.created == 2
+
+        await pool.release(again, discard=True)
+        await pool.release(second)
+        stats = _pool_stats(pool)
+        assert (stats["size"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+        assert first.closed
+
+        await pool.close()
+        assert _pool_stats(pool)["size"] == 0
+        assert second.closed
+
+    _run(scenario())
+
+
+def test_language_pairs_are_counted_separately():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient)
+        await pool.acquire("zh", "en")
+        await pool.acquire("en", "zh")
+        assert _pool_stats(pool, "zh->en")["size"] == 1
+        assert _pool_stats(pool, "en->zh")["size"] == 1
+
+    _run(scenario())
+
+
+def test_acquire_times_out_at_max_size():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, acquire_timeout=0.05, client_factory=FakeClient)
+        client = await pool.acquire("zh", "en")
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire("zh", "en")
+        assert _pool_stats(pool)["waiting"] == 0
+
+        # 归还后等待者立即拿到连接
+        waiter = asyncio.create_task(pool.acquire("zh", "en", timeout=1.0))
+        await asyncio.sleep(0)
+        await pool.release(client)
+        assert await waiter is client
+
+    _run(scenario())
+
+
+def test_failed_connect_frees_the_reserved_slot():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient)
+        FakeClient.accept = False
+        with pytest.raises(PoolConnectError):
+            await pool.acquire("zh", "en")
+        stats = _pool_stats(pool)
+        assert (stats["size"], stats["connect_failures"]) == (0, 1)
+
+        FakeClient.accept = True
+        client = await pool.acquire("zh", "en")
+        assert client.is_connected()
+
+    _run(scenario())
+
+
+def test_stale_idle_connection_is_replaced():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient)
+        client = await pool.acquire("zh", "en")
+        await pool.release(client)
+        client.healthy = False
+
+        fresh = await pool.acquire("zh", "en")
+        assert fresh is not client
+        assert client.closed
+        stats = _pool_stats(pool)
+        assert (stats["size"], stats["stale"]) == (1, 1)
+
+    _run(scenario())
+
+
+def test_connection_context_discards_on_error():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient)
+        with pytest.raises(RuntimeError):
+            async with pool.connection("zh", "en") as client:
+                raise RuntimeError("boom")
+        assert client.closed
+        assert _pool_stats(pool)["size"] == 0
+
+    _run(scenario())
+
+
+def test_evict_idle_respects_min_size():
+    async def scenario():
+        pool = MakawaiConnectionPool(min_size=1, max_size=3, idle_timeout=0.0, client_factory=FakeClient)
+        clients = [await pool.acquire("zh", "en") for _ in range(3)]
+        for client in clients:
+            await pool.release(client)
+        await asyncio.sleep(0.01)
+
+        assert await pool.evict_idle() == 2
+        stats = _pool_stats(pool)
+        assert (stats["size"], stats["idle"]) == (1, 1)
+
+    _run(scenario())
+
+
+def test_probe_opens_a_fresh_connection_even_with_idle_connections():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=0.0, jitter=0.0)
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient, breaker=breaker)
+        client = await pool.acquire("zh", "en")
+        await pool.release(client)
+        breaker.record_failure()
+        await breaker.close()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # 连接池已满：探测仍要真正连接上游，成功的连接因超出 max_size 被关闭
+        created = FakeClient.created
+        assert await pool.probe()
+        assert FakeClient.created == created + 1
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert _pool_stats(pool)["size"] == 1
+
+    _run(scenario())
+
+
+def test_probe_failure_reopens_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=10.0, jitter=0.0)
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient, breaker=breaker)
+        FakeClient.accept = False
+        with pytest.raises(PoolConnectError):
+            await pool.acquire("zh", "en")
+        await breaker.close()
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await pool.acquire("zh", "en")
+
+        breaker.opened_until = 0.0
+        assert not await pool.probe()
+        await breaker.close()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.consecutive_opens == 2
+        assert _pool_stats(pool)["connect_failures"] == 2
+
+    _run(scenario())
+
+
+def test_unsupported_language_pair_creates_no_bucket():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=1, client_factory=FakeClient, languages=["zh", "en"])
+        assert pool.supports("zh", "en")
+        with pytest.raises(UnsupportedLanguageError):
+            await pool.acquire("zh", "xx")
+        assert pool.stats()["pools"] == {}
+        assert FakeClient.created == 0
+        assert not await pool.warmup("xx", "en")
+        assert pool.stats()["pools"] == {}
+
+    _run(scenario())
+
+
+def test_pipelining_prefers_idle_and_new_connections():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=2, pipeline_depth=2, client_factory=FakeClient)
+        first = await pool.acquire("zh", "en")
+        # 还能新建连接时不在 first 上排队
+        second = await pool.acquire("zh", "en")
+        assert second is not first
+        await pool.release(second)
+
+        # 空闲连接优先于共享在用连接
+        assert await pool.acquire("zh", "en") is second
+        # 连接数已满后才共享，且选负载最低的连接
+        third = await pool.acquire("zh", "en")
+        fourth = await pool.acquire("zh", "en")
+        assert {third, fourth} == {first, second}
+        assert _pool_stats(pool)["in_flight"] == 4
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire("zh", "en", timeout=0.05)
+
+    _run(scenario())
+
+
+def test_exclusive_borrow_is_never_shared():
+    async def scenario():
+        pool = MakawaiConnectionPool(max_size=2, pipeline_depth=2, client_factory=FakeClient)
+        exclusive = await pool.acquire("zh", "en", exclusive=True)
+        shared = await pool.acquire("zh", "en")
+        assert shared is not exclusive
+        assert await pool.acquire("zh", "en") is shared
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire("zh", "en", exclusive=True, timeout=0.05)
+
+        await pool.release(exclusive)
+        await pool.release(shared)
+        await pool.release(shared)
+        stats = _pool_stats(pool)
+        assert (stats["idle"], stats["in_use"], stats["in_flight"]) == (2, 0, 0)
+
+    _run(scenario())
+
+
+def test_open_breaker_falls_back_to_sharing():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=10.0, jitter=0.0)
+        pool = MakawaiConnectionPool(max_size=2, pipeline_depth=2, client_factory=FakeClient, breaker=breaker)
+        first = await pool.acquire("zh", "en")
+        breaker.record_failure()
+        await breaker.close()
+        # 熔断中不新建连接，但已建立的连接仍可共享
+        assert await pool.acquire("zh", "en") is first
+        with pytest.raises(CircuitOpenError):
+            await pool.acquire("zh", "en")
+
+    _run(scenario())
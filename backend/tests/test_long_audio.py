@@ -0,0 +1,60 @@
+import numpy as np
+
+from audio.long_audio import plan_segments
+from audio.vad import EnergyVAD
+
+RATE = 16000
+
+
+def _speech(seconds):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (8000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+
+
+def _silence(seconds):
+    return np.zeros(int(RATE * seconds), dtype=np.int16)
+
+
+def _plan(samples, **kwargs):
+    return plan_segments(samples, EnergyVAD(), sample_rate=RATE, **kwargs)
+
+
+def test_silence_produces_no_segments():
+    assert _plan(_silence(5)) == []
+    assert _plan(np.zeros(0, dtype=np.int16)) == []
+
+
+def test_short_gaps_stay_in_one_segment():
+    samples = np.concatenate([_speech(1), _silence(0.1), _speech(1)])
+    assert len(_plan(samples, min_gap_seconds=0.3)) == 1
+
+
+def test_utterances_are_packed_up_to_target():
+    samples = np.concatenate([_silence(1), _speech(2), _silence(1), _speech(2), _silence(1)])
+    merged = _plan(samples, target_seconds=10.0)
+    assert len(merged) == 1
+    start, end = merged[0]
+    # 前导静音不发送，只在语音前保留 padding
+    assert 0.8 * RATE < start < 1.0 * RATE
+    assert end <= len(samples)
+
+    split = _plan(samples, target_seconds=2.5)
+    assert len(split) == 2
+    # 切分点落在两句之间的静音里
+    assert 3 * RATE <= split[0][1] <= split[1][0] <= 4 * RATE
+
+
+def test_long_utterance_is_cut_below_max():
+    samples = np.concatenate([_speech(40), _silence(0.5)])
+    segments = _plan(samples, target_seconds=10.0, max_seconds=15.0)
+    assert len(segments) >= 3
+    assert all(end - start <= 15.0 * RATE for start, end in segments)
+    # 连续切分，不丢失也不重复采样
+    assert all(previous[1] == current[0] for previous, current in zip(segments, segments[1:]))
+    assert segments[0][0] == 0
+    assert segments[-1][1] >= 40 * RATE
+
+
+def test_block_size_does_not_change_the_plan():
+    samples = np.concatenate([_speech(3), _silence(1), _speech(5), _silence(0.5), _speech(2)])
+    assert _plan(samples, target_seconds=4.0, block_frames=7) == _plan(samples, target_seconds=4.0)
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from adapter.improved_makawai_adapter import ImprovedMakawaiClient
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class FakeWebSocket:
+    """每隔 interval 秒返回一条消息；final_after 为 None 时只返回中间结果"""
+
+    open = True
+
+    def __init__(self, interval: float, final_after=None):
+        self.interval = interval
+        self.final_after = final_after
+        self.received = 0
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(bytes(data))
+
+    async def recv(self):
+        await asyncio.sleep(self.interval)
+        self.received += 1
+        is_final = self.final_after is not None and self.received > self.final_after
+        return json.dumps({"translated_text": f"t{self.received}", "original_text": "o", "is_final": is_final})
+
+
+def _client(ws):
+    client = ImprovedMakawaiClient()
+    client.ws = ws
+    return client
+
+
+def test_stream_request_returns_final_with_interim_count():
+    async def scenario():
+        ws = FakeWebSocket(0.01, final_after=3)
+        result = await _client(ws).stream_request(b"\x00\x01" * 2000, frame_size=960, timeout=5.0)
+        assert result["status"] == "success" and result["is_final"]
+        assert result["translation"] == "t4"
+        assert result["interim_results"] == 3
+        assert result["first_result_latency"] is not None
+        # 最后一帧之后发送空的结束标记
+        assert ws.sent[-1] == b""
+
+    _run(scenario())
+
+
+def test_stream_request_deadline_covers_endless_interims():
+    async def scenario():
+        ws = FakeWebSocket(0.02)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await _client(ws).stream_request(b"\x00\x01" * 2000, timeout=0.2)
+        # 每条中间结果都在单条等待时间内到达，仍按总时限结束
+        assert loop.time() - started < 1.0
+        assert result["status"] == "timeout" and result["is_final"]
+        assert result["interim_results"] > 0
+
+    _run(scenario())
+
+
+def test_stream_results_stops_slow_sender_on_deadline():
+    async def scenario():
+        ws = FakeWebSocket(0.02)
+        client = _client(ws)
+        # pace=1.0 时 2 秒音频按实时速度发送，总时限到期时停止发送
+        results = [r async for r in client.stream_results(b"\x00\x01" * 32000, pace=1.0, timeout=0.2)]
+        assert results[-1]["status"] == "timeout"
+        assert all(not r["is_final"] for r in results[:-1])
+        assert b"" not in ws.sent
+        assert not client.is_processing
+
+    _run(scenario())
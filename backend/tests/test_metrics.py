@@ -0,0 +1,32 @@
+import pytest
+
+from service import metrics
+
+
+@pytest.fixture(autouse=True)
+def known_languages(monkeypatch):
+    monkeypatch.setattr(metrics, "_known_languages", None)
+    metrics.set_known_languages(["zh", "en"])
+
+
+def test_unknown_languages_share_one_series():
+    registry = metrics.MetricsRegistry()
+    requests = registry.counter("requests_total", "test", ("source_lang", "target_lang", "outcome"))
+    requests.labels("zh", "en", "success").inc()
+    for index in range(100):
+        requests.labels(f"x{index}", "en", "http_400").inc()
+    requests.labels(target_lang="<script>", source_lang="zh", outcome="http_400").inc()
+
+    lines = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert 'requests_total{source_lang="zh",target_lang="en",outcome="success"} 1' in lines
+    assert 'requests_total{source_lang="other",target_lang="en",outcome="http_400"} 100' in lines
+    assert 'requests_total{source_lang="zh",target_lang="other",outcome="http_400"} 1' in lines
+    assert len(lines) == 3
+
+
+def test_other_labels_and_empty_language_are_kept():
+    registry = metrics.MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "test", ("stage", "source_lang", "target_lang"))
+    stages.labels("decode", "", "").observe(0.1)
+    text = registry.render()
+    assert 'stage="decode",source_lang="",target_lang=""' in text
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from audio.resampler import PolyphaseResampler, resample, resample_int16
+
+
+def _tone(frequency, rate, seconds=0.5, amplitude=10000.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(48000, 16000), (44100, 16000), (8000, 16000), (22050, 16000)])
+def test_output_length(src_rate, dst_rate):
+    samples = _tone(440, src_rate, seconds=0.37)
+    assert len(resample(samples, src_rate, dst_rate)) == -(-len(samples) * dst_rate // src_rate)
+
+
+@pytest.mark.parametrize("src_rate", [48000, 44100])
+def test_streaming_matches_one_shot(src_rate):
+    samples = _tone(440, src_rate)
+    resampler = PolyphaseResampler(src_rate, 16000)
+    # 分片长度不规则，覆盖跨分片的滤波器状态
+    chunks, start = [], 0
+    for size in (1, 7, 480, 1023, 4096, 333):
+        chunks.append(resampler.process(samples[start:start + size]))
+        start += size
+    chunks.append(resampler.process(samples[start:]))
+    chunks.append(resampler.flush())
+    np.testing.assert_allclose(np.concatenate(chunks), resample(samples, src_rate, 16000), atol=1e-2)
+
+
+def test_passband_tone_is_preserved_and_aligned():
+    out = resample(_tone(1000, 48000), 48000, 16000)
+    expected = _tone(1000, 16000)
+    # 去掉首尾的滤波器过渡区
+    middle = slice(200, len(expected) - 200)
+    assert np.max(np.abs(out[middle] - expected[middle])) < 0.01 * 10000
+
+
+def test_tone_above_target_nyquist_is_suppressed():
+    # 12kHz 高于 16kHz 采样率的奈奎斯特频率，步进抽取会把它混叠到 4kHz
+    out = resample(_tone(12000, 48000), 48000, 16000)
+    assert np.sqrt(np.mean(out[200:-200] ** 2)) < 0.01 * 10000
+
+
+def test_same_rate_is_passthrough():
+    samples = np.arange(10, dtype=np.int16)
+    assert resample_int16(samples, 16000, 16000) is samples
+
+
+def test_int16_output_is_clipped():
+    loud = np.full(4800, 32767, dtype=np.int16)
+    out = resample_int16(loud, 48000, 16000)
+    assert out.dtype == np.int16
+    assert out.max() <= 32767
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        PolyphaseResampler(0, 16000)
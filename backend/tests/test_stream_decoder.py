@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from audio import stream_decoder
+from audio.stream_decoder import StreamDecoderRegistry
+
+
+class FakeDecoder:
+    """记录写入顺序的解码器替身，不启动 ffmpeg"""
+
+    instances = []
+
+    def __init__(self, session_id, **kwargs):
+        self.session_id = session_id
+        self.next_index = 0
+        self.last_activity_time = 0.0
+        self.order = asyncio.Condition()
+        self.fed = []
+        self.finished = False
+        FakeDecoder.instances.append(self)
+
+    async def start(self):
+        pass
+
+    def is_alive(self):
+        return not self.finished
+
+    async def feed(self, chunk):
+        self.fed.append(chunk)
+        return chunk
+
+    async def finish(self):
+        self.finished = True
+        return b"|end"
+
+    async def close(self):
+        self.finished = True
+
+
+@pytest.fixture(autouse=True)
+def fake_decoder(monkeypatch):
+    FakeDecoder.instances = []
+    monkeypatch.setattr(stream_decoder, "StreamingWebmDecoder", FakeDecoder)
+
+
+def test_out_of_order_chunks_are_written_in_order():
+    async def scenario():
+        registry = StreamDecoderRegistry(order_timeout=1.0)
+        late = asyncio.create_task(registry.decode_chunk("s", b"b", 1))
+        await asyncio.sleep(0.01)
+        assert await registry.decode_chunk("s", b"a", 0) == b"a"
+        assert await late == b"b"
+        assert FakeDecoder.instances[0].fed == [b"a", b"b"]
+
+    asyncio.run(scenario())
+
+
+def test_chunk_arriving_after_order_timeout_is_dropped():
+    async def scenario():
+        registry = StreamDecoderRegistry(order_timeout=0.05)
+        assert await registry.decode_chunk("s", b"a", 0) == b"a"
+        # 分片 1 缺失：等待超时后写入分片 2
+        assert await registry.decode_chunk("s", b"c", 2) == b"c"
+        # 迟到的分片 1 不能再写入字节流
+        assert await registry.decode_chunk("s", b"b", 1) == b""
+        assert await registry.decode_chunk("s", b"d", 3) == b"d"
+        assert FakeDecoder.instances[0].fed == [b"a", b"c", b"d"]
+        assert registry.stats()["dropped_chunks"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_final_chunk_still_finishes_the_session():
+    async def scenario():
+        registry = StreamDecoderRegistry(order_timeout=0.05)
+        await registry.decode_chunk("s", b"a", 0)
+        await registry.decode_chunk("s", b"c", 2)
+        assert await registry.decode_chunk("s", b"b", 1, final=True) == b"|end"
+        assert FakeDecoder.instances[0].finished
+        assert registry.stats()["active_sessions"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,16 @@
+import pytest
+
+from service.worker_cluster import split_quota
+
+
+def test_split_quota_sums_to_total():
+    shares = [split_quota(10, 4, slot) for slot in range(4)]
+    assert shares == [3, 3, 2, 2]
+    assert sum(shares) == 10
+    assert [split_quota(4, 4, slot) for slot in range(4)] == [1, 1, 1, 1]
+
+
+def test_split_quota_rejects_total_below_workers():
+    # 之前每个 worker 至少分到 1 条，4 个 worker 会实际打开 4 条连接，超出配额 2
+    with pytest.raises(ValueError):
+        split_quota(2, 4, 0)
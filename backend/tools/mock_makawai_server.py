@@ -0,0 +1,224 @@
+"""
+本地模拟 Makawai WebSocket 服务
+返回与 ImprovedMakawaiClient.receive_result 解析一致的消息：
+- 成功: {"translated_text": ..., "original_text": ..., "audio_data": base64}
+- 业务失败: {"result": "failed", "err_msg": ...}
+延迟、失败率、断连与丢包行为均可配置，用于在不访问付费上游的情况下压测服务
+
+用法:
+    cd backend
+    python tools/mock_makawai_server.py --port 8765 --latency-ms 300 --jitter-ms 100 --failure-rate 0.01
+    # 并发处理同一连接上的消息并回显序号（测试流水线模式）
+    python tools/mock_makawai_server.py --concurrent --echo-seq
+    # 分帧流式模式：累积音频帧直到空消息结束标记再回复，期间每 8 帧返回一次中间结果
+    python tools/mock_makawai_server.py --stream --interim-every 8
+    # 另一个终端中让服务连接到模拟上游
+    MAKAWAI_WS_URL=ws://127.0.0.1:8765 MAKAWAI_API_KEY=test python src/improved_index.py
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+
+class MockBehavior:
+    """模拟上游的行为参数"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency_ms / 1000
+        self.jitter = args.jitter_ms / 1000
+        # 每字节附加的处理时间，模拟按音频时长计费/计算的上游
+        self.per_second_audio = args.per_audio_second_ms / 1000
+        self.failure_rate = args.failure_rate
+        self.disconnect_rate = args.disconnect_rate
+        self.drop_rate = args.drop_rate
+        self.audio_bytes = args.audio_bytes
+        self.max_connections = args.max_connections
+        # 同一连接上的多条消息并发处理（配合客户端流水线模式）
+        self.concurrent = args.concurrent
+        # 响应中回显消息序号（连接内从 0 开始），此时允许乱序回复
+        self.echo_seq = args.echo_seq
+        # 流式模式：音频帧累积到结束标记（空消息）后才回复最终结果
+        self.stream = args.stream
+        self.interim_every = args.interim_every
+        self.random = random.Random(args.seed)
+
+    def delay(self, pcm_size: int) -> float:
+        audio_seconds = pcm_size / 2 / 16000
+        jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter + audio_seconds * self.per_second_audio)
+
+
+class MockStats:
+    def __init__(self):
+        self.connections = 0
+        self.active = 0
+        self.messages = 0
+        self.failures = 0
+        self.disconnects = 0
+        self.drops = 0
+        self.started = time.monotonic()
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (f"📊 连接 {self.connections} (活跃 {self.active}) | 消息 {self.messages} "
+                f"({self.messages / elapsed:.1f}/s) | 失败 {self.failures} | 断连 {self.disconnects} | 丢弃 {self.drops}")
+
+
+def _request_path(websocket) -> str:
+    """兼容新旧版本 websockets 的请求路径"""
+    request = getattr(websocket, "request", None)
+    if request is not None:
+        return request.path
+    return getattr(websocket, "path", "/")
+
+
+def _make_handler(behavior: MockBehavior, stats: MockStats):
+    async def handler(websocket, *_):
+        query = parse_qs(urlparse(_request_path(websocket)).query)
+        source_lang = query.get("source_lang", ["zh"])[0]
+        target_lang = query.get("target_lang", ["en"])[0]
+        langs = (source_lang, target_lang)
+
+        if behavior.max_connections and stats.active >= behavior.max_connections:
+            await websocket.close(code=1013, reason="too many connections")
+            return
+
+        stats.connections += 1
+        stats.active += 1
+        tasks = set()
+        previous: asyncio.Future = asyncio.get_running_loop().create_future()
+        previous.set_result(None)
+        try:
+            seq = 0
+            stream_bytes = 0
+            stream_frames = 0
+            async for message in websocket:
+                if behavior.stream:
+                    if message:
+                        stream_bytes += len(message)
+                        stream_frames += 1
+                        if behavior.interim_every and stream_frames % behavior.interim_every == 0:
+                            await _send_interim(websocket, langs, stream_bytes)
+                        continue
+                    # 结束标记：按累积的音频长度回复一次
+                    stats.messages += 1
+                    await _respond(websocket, langs, seq, stream_bytes, None, None)
+                    seq += 1
+                    stream_bytes = stream_frames = 0
+                    continue
+                # 空消息为音频流结束标记
+                if not message:
+                    continue
+                stats.messages += 1
+                if behavior.concurrent:
+                    # 并发处理在途消息；不回显序号时仍按接收顺序回复
+                    done = asyncio.get_running_loop().create_future()
+                    task = asyncio.create_task(_respond(websocket, langs, seq, len(message), previous, done))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    previous = done
+                else:
+                    await _respond(websocket, langs, seq, len(message), None, None)
+                seq += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            stats.active -= 1
+
+    async def _respond(websocket, langs, seq: int, size: int, previous, done):
+        try:
+            await asyncio.sleep(behavior.delay(size))
+            if previous is not None and not behavior.echo_seq:
+                await previous
+            await _send_response(websocket, langs, seq, size)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if done is not None and not done.done():
+                done.set_result(None)
+
+    async def _send_interim(websocket, langs, size: int):
+        response = {
+            "translated_text": f"[{langs[0]}->{langs[1]}] {size // 2} samples so far",
+            "original_text": "",
+            "is_final": False,
+        }
+        await websocket.send(json.dumps(response))
+
+    async def _send_response(websocket, langs, seq: int, size: int):
+        roll = behavior.random.random()
+        if roll < behavior.disconnect_rate:
+            stats.disconnects += 1
+            await websocket.close(code=1011, reason="mock disconnect")
+            return
+        roll -= behavior.disconnect_rate
+        if roll < behavior.drop_rate:
+            # 不回复，客户端将等待至超时
+            stats.drops += 1
+            return
+        roll -= behavior.drop_rate
+        if roll < behavior.failure_rate:
+            stats.failures += 1
+            response = {"result": "failed", "err_msg": "mock failure"}
+        else:
+            response = {
+                "translated_text": f"[{langs[0]}->{langs[1]}] {size // 2} samples",
+                "original_text": f"mock #{seq}",
+            }
+            if behavior.audio_bytes:
+                response["audio_data"] = base64.b64encode(bytes(behavior.audio_bytes)).decode("ascii")
+        if behavior.echo_seq:
+            response["seq"] = seq
+        if behavior.stream:
+            response["is_final"] = True
+        await websocket.send(json.dumps(response))
+
+    return handler
+
+
+async def _report(stats: MockStats, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(stats.line())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="本地模拟 Makawai WebSocket 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="每条消息的基础处理延迟")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="延迟的随机抖动范围（±）")
+    parser.add_argument("--per-audio-second-ms", type=float, default=0.0, help="每秒音频额外增加的延迟")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="返回 result=failed 的比例")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="收到消息后直接断开连接的比例")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="不回复（触发客户端超时）的比例")
+    parser.add_argument("--audio-bytes", type=int, default=0, help="响应中 audio_data 的字节数，0 表示不返回")
+    parser.add_argument("--concurrent", action="store_true", help="同一连接上的消息并发处理（默认逐条处理）")
+    parser.add_argument("--echo-seq", action="store_true", help="响应携带 seq 序号字段，并发时允许乱序回复")
+    parser.add_argument("--stream", action="store_true", help="分帧流式模式：累积音频直到空消息结束标记后回复")
+    parser.add_argument("--interim-every", type=int, default=0, help="流式模式下每收到 N 帧返回一次中间结果，0 表示不返回")
+    parser.add_argument("--max-connections", type=int, default=0, help="并发连接上限，0 表示不限制")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="统计输出间隔（秒）")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    behavior = MockBehavior(args)
+    stats = MockStats()
+    async with websockets.serve(_make_handler(behavior, stats), args.host, args.port, max_size=None):
+        print(f"🧪 模拟 Makawai 服务已启动: ws://{args.host}:{args.port}")
+        await _report(stats, args.report_interval)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass